@@ -0,0 +1,447 @@
+"""Offline end-to-end benchmark of PDF processing and report generation.
+
+Generates a synthetic land-record corpus, runs process_pdf and
+generate_report on it with local stand-ins for Google Translate and the
+WatsonX/IAM endpoints, and reports throughput, per-page latency, peak
+memory and per-stage time. Needs Tesseract with the kan and eng
+languages, but no network.
+
+    python benchmark.py --pages 24 --runs 3
+    python benchmark.py --save-baseline
+    python benchmark.py --baseline benchmark_baseline.json --fail-on-regression
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+# Page kinds of the synthetic corpus, repeated in this order
+PAGE_KINDS = ["digital_en", "digital_kn", "scanned_clean", "scanned_noisy", "blank", "mixed"]
+
+# Fonts with Kannada glyphs looked for when --kannada-font is not given
+KANNADA_FONT_PATTERNS = [
+    "/usr/share/fonts/**/*Kannada*.tt[fc]",
+    "/usr/share/fonts/**/*Kannada*.otf",
+    "/usr/share/fonts/**/*kannada*.ttf",
+]
+
+KANNADA_WORDS = [
+    "ಸರ್ವೆ ನಂಬರ್", "ಗ್ರಾಮ", "ಹೋಬಳಿ", "ತಾಲ್ಲೂಕು", "ಜಿಲ್ಲೆ", "ಮಾಲೀಕರು", "ವಿಸ್ತೀರ್ಣ", "ಎಕರೆ",
+    "ಗುಂಟೆ", "ಖಾತೆ", "ಪಹಣಿ", "ಕ್ರಯ ಪತ್ರ", "ನೋಂದಣಿ", "ದಿನಾಂಕ", "ಹಕ್ಕು", "ಬೆಳೆ", "ನೀರಾವರಿ",
+]
+VILLAGES = ["Hosahalli", "Kengeri", "Yelahanka", "Doddaballapur", "Anekal", "Hoskote", "Nelamangala"]
+OWNERS = ["Ramappa", "Lakshmamma", "Siddegowda", "Manjunath", "Gowramma", "Basavaraju", "Nagaraj"]
+ENTRIES = ["Sale deed registered", "Mutation by inheritance", "Partition among legal heirs",
+           "Mortgage in favour of bank", "Release of mortgage", "Gift deed", "Khata transfer"]
+
+# Benchmark figures compared with a baseline, and whether higher is better
+COMPARED = {
+    "pages_per_second": True,
+    "page_latency_p50": False,
+    "page_latency_p95": False,
+    "process_seconds": False,
+    "report_seconds": False,
+    "peak_rss_mb": False,
+}
+
+def find_kannada_font(path: Optional[str]) -> Optional[str]:
+    if path:
+        return path
+    for pattern in KANNADA_FONT_PATTERNS:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if matches:
+            return matches[0]
+    return None
+
+def english_lines(rng: random.Random, count: int) -> List[str]:
+    lines = []
+    for _ in range(count):
+        lines.append(
+            f"Sy. No. {rng.randint(1, 400)}/{rng.randint(1, 9)}  {rng.choice(VILLAGES)}  "
+            f"{rng.choice(OWNERS)}  {rng.randint(0, 12)} acres {rng.randint(0, 39)} guntas  "
+            f"{rng.choice(ENTRIES)} on {rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1960, 2023)}"
+        )
+    return lines
+
+def kannada_lines(rng: random.Random, count: int) -> List[str]:
+    return [" ".join(rng.choice(KANNADA_WORDS) for _ in range(6)) + f" {rng.randint(1, 400)}"
+            for _ in range(count)]
+
+def write_text(page, lines: List[str], top: float, font: Optional[str] = None, size: float = 10):
+    """Lines of text from top down; glyphs are placed without shaping, which is enough for OCR load"""
+    kwargs = {"fontfile": font, "fontname": "kannada"} if font else {"fontname": "helv"}
+    y = top
+    for line in lines:
+        page.insert_text((50, y), line, fontsize=size, **kwargs)
+        y += size * 1.6
+
+def scan_of(page_pdf: fitz.Document, rng: random.Random, dpi: int, noise: float, angle: float,
+            blur: int = 0) -> bytes:
+    """PNG of a page as a scanner would produce it: grayscale, skewed, noisy"""
+    pix = page_pdf[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width].astype(np.float32)
+    h, w = img.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    img = cv2.warpAffine(img, matrix, (w, h), borderValue=245)
+    # Off-white paper, sensor noise and dust specks
+    np_rng = np.random.default_rng(rng.randint(0, 2 ** 32 - 1))
+    img = img * 0.92 + np_rng.normal(0, noise, img.shape)
+    specks = np_rng.random(img.shape) < noise / 4000
+    img[specks] = 40
+    if blur:
+        img = cv2.GaussianBlur(img, (blur, blur), 0)
+    ok, png = cv2.imencode(".png", np.clip(img, 0, 255).astype(np.uint8))
+    return png.tobytes()
+
+def source_page(rng: random.Random, kannada_font: Optional[str]) -> fitz.Document:
+    """One-page digital record used as the original of scanned pages"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    write_text(page, ["RECORD OF RIGHTS, TENANCY AND CROPS"], 60, size=14)
+    if kannada_font:
+        write_text(page, kannada_lines(rng, 12), 100, kannada_font, size=12)
+        write_text(page, english_lines(rng, 14), 420)
+    else:
+        write_text(page, english_lines(rng, 30), 100)
+    return doc
+
+def build_corpus(path: str, pages: int, seed: int, kannada_font: Optional[str]) -> Dict[str, int]:
+    """Write the synthetic PDF and return how many pages of each kind it has"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    kinds: Dict[str, int] = {}
+    for i in range(pages):
+        kind = PAGE_KINDS[i % len(PAGE_KINDS)]
+        if kind == "digital_kn" and not kannada_font:
+            kind = "digital_en"
+        kinds[kind] = kinds.get(kind, 0) + 1
+        page = doc.new_page(width=595, height=842)
+        rect = page.rect
+
+        if kind == "digital_en":
+            write_text(page, ["RECORD OF RIGHTS, TENANCY AND CROPS"], 60, size=14)
+            write_text(page, english_lines(rng, 40), 100)
+        elif kind == "digital_kn":
+            write_text(page, kannada_lines(rng, 36), 60, kannada_font, size=12)
+        elif kind in ("scanned_clean", "scanned_noisy"):
+            with source_page(rng, kannada_font) as original:
+                if kind == "scanned_clean":
+                    png = scan_of(original, rng, dpi=300, noise=3, angle=rng.uniform(-0.5, 0.5))
+                else:
+                    png = scan_of(original, rng, dpi=150, noise=18, angle=rng.uniform(-2, 2), blur=3)
+            page.insert_image(rect, stream=png)
+        elif kind == "blank":
+            with fitz.open() as empty:
+                empty.new_page(width=595, height=842)
+                page.insert_image(rect, stream=scan_of(empty, rng, dpi=200, noise=3, angle=0))
+        else:
+            # Typed header over a scanned, stamped extract
+            write_text(page, english_lines(rng, 6), 60)
+            with source_page(rng, kannada_font) as original:
+                png = scan_of(original, rng, dpi=200, noise=8, angle=rng.uniform(-1, 1))
+            page.insert_image(fitz.Rect(40, 200, rect.width - 40, rect.height - 40), stream=png)
+
+    doc.set_metadata({"title": f"Synthetic land records (seed {seed})", "creationDate": "", "modDate": ""})
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return kinds
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """IAM token and WatsonX generation endpoints answering with canned Markdown"""
+    latency = 0.0
+    tokens_per_second = 200.0
+    output_tokens = 400
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def _report(self, prompt: str) -> str:
+        rng = random.Random(len(prompt))
+        rows = "\n".join(f"| {rng.randint(1, 400)} | {rng.choice(OWNERS)} | {rng.choice(ENTRIES)} |"
+                         for _ in range(8))
+        text = f"## Title Summary\n\n| Sy. No. | Owner | Entry |\n|---|---|---|\n{rows}\n\n"
+        filler = "The chain of title is continuous for the period examined. "
+        while len(text) < self.output_tokens * 4:
+            text += filler
+        return text
+
+    def do_POST(self):
+        body = self._body()
+        if self.path.startswith("/identity/token"):
+            self._json({"access_token": "benchmark", "expires_in": 3600})
+            return
+
+        text = self._report(body.get("input", ""))
+        time.sleep(self.latency)
+        if "generation_stream" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            step = 40
+            for i in range(0, len(text), step):
+                time.sleep(step / 4 / self.tokens_per_second)
+                event = {"results": [{"generated_text": text[i:i + step]}]}
+                self.wfile.write(f"id: {i}\nevent: message\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            return
+
+        time.sleep(len(text) / 4 / self.tokens_per_second)
+        self._json({"results": [{"generated_text": text}]})
+
+    def _json(self, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_stand_in(latency: float, tokens_per_second: float) -> ThreadingHTTPServer:
+    StandInHandler.latency = latency
+    StandInHandler.tokens_per_second = tokens_per_second
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, name="watsonx-stand-in", daemon=True).start()
+    return server
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class RSSSampler:
+    """Peak resident memory while running; ru_maxrss would also count corpus generation and imports"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.baseline = current_rss()
+        self.peak = self.baseline or 0
+        self.thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def start(self):
+        if self.baseline is not None:
+            self.thread.start()
+
+    def stop(self):
+        if self.baseline is None:
+            # Without /proc only the process-wide high-water mark is known; ru_maxrss is in kilobytes on Linux
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss() or 0)
+
+def directory_state(path: str) -> Dict[str, int]:
+    """Modification time of each entry of a directory"""
+    return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(path)}
+
+def add_timings(total: Dict[str, float], timings: Optional[Dict[str, Dict[str, float]]], prefix: str):
+    for stage, t in (timings or {}).items():
+        total[f"{prefix}.{stage}"] = total.get(f"{prefix}.{stage}", 0.0) + t["seconds"]
+
+def run_benchmark(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="ocr-benchmark-")
+    corpus_path = os.path.join(workdir, "corpus.pdf")
+    kannada_font = find_kannada_font(args.kannada_font)
+    if not kannada_font:
+        print("No Kannada font found; Kannada pages are replaced by English ones (use --kannada-font)")
+    kinds = build_corpus(corpus_path, args.pages, args.seed, kannada_font)
+
+    server = start_stand_in(args.llm_latency, args.llm_tokens_per_second)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # The application reads its configuration when it is imported. Every path it takes from
+    # the environment points into the work directory, and the directories it creates
+    # relative to the working directory (uploads, images, temp, outputs) are made there too
+    os.environ.update({
+        "API_KEY": "benchmark",
+        "PROJECT_ID": "benchmark",
+        "WATSONX_IAM_URL": f"{base_url}/identity/token",
+        "WATSONX_URL": f"{base_url}/ml/v1/text/generation?version=2024-01-15",
+        "WATSONX_STREAM_URL": f"{base_url}/ml/v1/text/generation_stream?version=2024-01-15",
+        "TRANSLATION_PROVIDER": "local",
+        "SESSION_STORE": "sqlite",
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+        "JOB_DB_PATH": os.path.join(workdir, "sessions.db"),
+        "METRICS_DB_PATH": os.path.join(workdir, "sessions.db"),
+        "OCR_CACHE_DIR": os.path.join(workdir, "ocr-cache"),
+        "OCR_CACHE_MAX_MB": "512" if args.warm_cache else "0",
+        "REPORT_CACHE_DIR": os.path.join(workdir, "reports"),
+        "SEARCH_DB_PATH": os.path.join(workdir, "search.db"),
+    })
+    os.chdir(workdir)
+    import main
+    from translation import LocalTranslationProvider
+    main.translation_service.provider = LocalTranslationProvider(args.translate_latency)
+
+    # Corpus generation and imports are not part of the measurement
+    memory = RSSSampler()
+    memory.start()
+
+    latencies: List[float] = []
+    process_seconds: List[float] = []
+    report_seconds: List[float] = []
+    stages: Dict[str, float] = {}
+    for run in range(args.runs):
+        # Every run starts cold, apart from the OCR cache when --warm-cache is given
+        main.translation_service.cache.clear()
+        session_id = f"benchmark-{run}"
+
+        start = time.perf_counter()
+        main.process_pdf(session_id, corpus_path, None, args.profile)
+        process_seconds.append(time.perf_counter() - start)
+        fields = main.session_store.get(session_id, ["status", "message", "processing_timings"])
+        if fields["status"] != "ready_for_review":
+            raise SystemExit(f"Processing failed: {fields['message']}")
+
+        start = time.perf_counter()
+        main.generate_report(session_id, "Benchmark Client")
+        report_seconds.append(time.perf_counter() - start)
+        report = main.session_store.get(session_id, ["status", "message", "report_timings"])
+        if report["status"] not in ("completed", "completed_with_warning"):
+            raise SystemExit(f"Report generation failed: {report['message']}")
+
+        latencies.extend(info.get("elapsed_seconds", 0.0)
+                         for info in main.session_store.get_pages(session_id, "page_info").values())
+        add_timings(stages, fields.get("processing_timings"), "processing")
+        add_timings(stages, report.get("report_timings"), "report")
+        print(f"run {run + 1}/{args.runs}: processing {process_seconds[-1]:.2f}s, report {report_seconds[-1]:.2f}s")
+
+    memory.stop()
+    # OCR workers are separate processes; their peak is known once they exit
+    if main.ocr_pool is not None:
+        main.ocr_pool.shutdown()
+    server.shutdown()
+
+    median_process = statistics.median(process_seconds)
+    return {
+        "corpus": {"pages": args.pages, "seed": args.seed, "kinds": kinds, "profile": args.profile,
+                   "kannada_font": bool(kannada_font), "warm_cache": args.warm_cache},
+        "stand_ins": {"llm_latency": args.llm_latency, "llm_tokens_per_second": args.llm_tokens_per_second,
+                      "translate_latency": args.translate_latency},
+        "runs": args.runs,
+        "pages_per_second": round(args.pages / median_process, 3),
+        "page_latency_p50": round(percentile(latencies, 0.5), 3),
+        "page_latency_p95": round(percentile(latencies, 0.95), 3),
+        "process_seconds": round(median_process, 3),
+        "report_seconds": round(statistics.median(report_seconds), 3),
+        "baseline_rss_mb": round((memory.baseline or 0) / (1024 * 1024), 1),
+        "peak_rss_mb": round(memory.peak / (1024 * 1024), 1),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_ocr_worker_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "stage_seconds": {stage: round(seconds / args.runs, 3) for stage, seconds in sorted(stages.items())},
+    }
+
+def print_result(result: Dict[str, Any]):
+    print(f"\n{result['corpus']['pages']} pages {result['corpus']['kinds']}, {result['runs']} run(s)")
+    for key in ("pages_per_second", "page_latency_p50", "page_latency_p95", "process_seconds",
+                "report_seconds", "baseline_rss_mb", "peak_rss_mb", "peak_ocr_worker_rss_mb"):
+        print(f"  {key:<24} {result[key]}")
+    print("  time per stage, seconds per run (summed over pages and threads):")
+    for stage, seconds in result["stage_seconds"].items():
+        print(f"    {stage:<32} {seconds}")
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the change against the baseline and return the figures that regressed"""
+    if baseline.get("corpus") != result["corpus"] or baseline.get("stand_ins") != result["stand_ins"]:
+        print("\nWarning: the baseline was measured with a different corpus or stand-in settings")
+    regressions = []
+    print(f"\n  {'':<24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, higher_is_better in COMPARED.items():
+        old, new = baseline.get(key), result[key]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(key)
+        print(f"  {key:<24} {old:>10} {new:>10} {change:>+8.1%}{flag}")
+    return regressions
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=24, help="pages in the synthetic corpus")
+    parser.add_argument("--runs", type=int, default=3, help="times to process the corpus; medians are reported")
+    parser.add_argument("--seed", type=int, default=1, help="corpus random seed")
+    parser.add_argument("--profile", default="auto", help="OCR preprocessing profile")
+    parser.add_argument("--kannada-font", help="TTF/OTF font with Kannada glyphs")
+    parser.add_argument("--warm-cache", action="store_true", help="keep the OCR cache between runs")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stand-in WatsonX latency per call, seconds")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200, help="stand-in WatsonX output rate")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="stand-in translation latency per request")
+    parser.add_argument("--output", help="write the result as JSON to this file")
+    parser.add_argument("--baseline", help="compare with a result saved earlier")
+    parser.add_argument("--save-baseline", nargs="?", const="benchmark_baseline.json",
+                        help="save the result as the baseline (default benchmark_baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    # Paths are taken relative to where the benchmark was started, not its work directory
+    for name in ("output", "baseline", "save_baseline", "kannada_font"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    start_dir = os.getcwd()
+    before = directory_state(start_dir)
+    try:
+        result = run_benchmark(args)
+    finally:
+        os.chdir(start_dir)
+    changed = sorted(name for name, mtime in directory_state(start_dir).items() if before.get(name) != mtime)
+    if changed:
+        raise SystemExit(f"The benchmark changed files in {start_dir}: {', '.join(changed)}")
+    print_result(result)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+            print(f"\nSaved {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
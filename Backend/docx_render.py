@@ -0,0 +1,134 @@
+import hashlib
+import os
+import re
+import threading
+from typing import List, Tuple
+
+from docx import Document
+from docx.shared import Pt
+
+# Inline emphasis understood by the renderer: **bold**, __bold__ and *italic*
+INLINE_PATTERN = re.compile(r"(\*\*.+?\*\*|__.+?__|(?<![\w*])\*(?!\s).+?(?<!\s)\*(?![\w*]))")
+TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+BULLET = re.compile(r"^(\s*)[-*+•]\s+(.*)$")
+NUMBERED = re.compile(r"^(\s*)\d+[.)]\s+(.*)$")
+RULE = re.compile(r"^(\*\s*){3,}$|^(-\s*){3,}$|^(_\s*){3,}$")
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def add_inline(paragraph, text: str, bold: bool = False):
+    """Add text to a paragraph, turning Markdown emphasis into bold and italic runs"""
+    text = re.sub(r"<br\s*/?>", "\n", text)
+    for part in INLINE_PATTERN.split(text):
+        if not part:
+            continue
+        if (part.startswith("**") and part.endswith("**") or part.startswith("__") and part.endswith("__")) and len(part) > 4:
+            paragraph.add_run(part[2:-2]).bold = True
+        elif part.startswith("*") and part.endswith("*") and len(part) > 2:
+            run = paragraph.add_run(part[1:-1])
+            run.italic = True
+            run.bold = bold or None
+        else:
+            run = paragraph.add_run(part.replace("`", ""))
+            run.bold = bold or None
+
+def split_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+def add_table(doc, lines: List[str]):
+    """One bordered table from consecutive Markdown table lines; the first row is the header"""
+    rows = [split_row(line) for line in lines if not TABLE_SEPARATOR.match(line.strip())]
+    if not rows:
+        return
+    has_header = len(lines) > 1 and TABLE_SEPARATOR.match(lines[1].strip()) is not None
+    cols = max(len(row) for row in rows)
+    table = doc.add_table(rows=len(rows), cols=cols)
+    table.style = "Table Grid"
+    for r, row in enumerate(rows):
+        for c in range(cols):
+            cell = table.cell(r, c)
+            add_inline(cell.paragraphs[0], row[c] if c < len(row) else "", bold=has_header and r == 0)
+
+def render_docx(markdown: str, docx_path: str):
+    """Render the report Markdown subset (headings, tables, lists, emphasis) to a DOCX file"""
+    doc = Document()
+    style = doc.styles["Normal"]
+    style.font.name = "Calibri"
+    style.font.size = Pt(11)
+
+    blocks: List[Tuple[str, List[str]]] = []
+    for line in markdown.splitlines():
+        stripped = line.strip()
+        kind = "table" if stripped.startswith("|") else "text" if stripped else "blank"
+        if blocks and blocks[-1][0] == kind and kind != "blank":
+            blocks[-1][1].append(line)
+        else:
+            blocks.append((kind, [line]))
+
+    for kind, lines in blocks:
+        if kind == "table":
+            add_table(doc, lines)
+            continue
+        if kind == "blank":
+            continue
+
+        # Consecutive plain lines are one paragraph, as in Markdown
+        paragraph_lines: List[str] = []
+
+        def flush():
+            if paragraph_lines:
+                add_inline(doc.add_paragraph(), " ".join(paragraph_lines))
+                paragraph_lines.clear()
+
+        for line in lines:
+            stripped = line.strip()
+            heading = HEADING.match(stripped)
+            bullet = BULLET.match(line)
+            numbered = NUMBERED.match(line)
+            if heading:
+                flush()
+                doc.add_heading(re.sub(r"\*\*|__", "", heading.group(2)), level=len(heading.group(1)))
+            elif RULE.match(stripped):
+                flush()
+            elif bullet or numbered:
+                flush()
+                match = bullet or numbered
+                nested = len(match.group(1).expandtabs(4)) >= 2
+                style_name = "List Bullet" if bullet else "List Number"
+                add_inline(doc.add_paragraph(style=f"{style_name} 2" if nested else style_name), match.group(2))
+            elif stripped.startswith(">"):
+                flush()
+                add_inline(doc.add_paragraph(style="Quote"), stripped.lstrip("> "))
+            else:
+                paragraph_lines.append(stripped)
+        flush()
+
+    tmp_path = f"{docx_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    doc.save(tmp_path)
+    os.replace(tmp_path, docx_path)
+
+def report_markdown_path(markdown: str, directory: str) -> str:
+    """Markdown file for a report, written once per distinct report text"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{content_hash(markdown)}.md")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        os.replace(tmp_path, path)
+    return path
+
+def report_docx_path(markdown: str, directory: str) -> str:
+    """DOCX file for a report, rendered once per distinct report text"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{content_hash(markdown)}.docx")
+    if not os.path.exists(path):
+        render_docx(markdown, path)
+    return path
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from PIL import Image
+
+# Longest edge, in pixels, of the reduced images served for ?size=
+IMAGE_SIZES = {
+    "thumbnail": 240,
+    "preview": 1024,
+}
+
+# Page images never change once rendered, so clients may keep them for a day
+CACHE_CONTROL = "private, max-age=86400"
+
+def derived_image_path(source_path: str, size: str) -> str:
+    """Path of a reduced WebP copy of a page image, creating it on first use"""
+    directory = os.path.join(os.path.dirname(source_path), "derived")
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    path = os.path.join(directory, f"{name}_{size}.webp")
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    with Image.open(source_path) as img:
+        img = img.convert("RGB")
+        img.thumbnail((IMAGE_SIZES[size], IMAGE_SIZES[size]), Image.LANCZOS)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        img.save(tmp_path, "WEBP", quality=80, method=4)
+    os.replace(tmp_path, path)
+    return path
+
+def file_etag(path: str) -> str:
+    """Weak validator built from the file's size and modification time"""
+    st = os.stat(path)
+    digest = hashlib.md5(f"{st.st_mtime_ns}-{st.st_size}".encode()).hexdigest()
+    return f'"{digest}"'
+
+def not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Whether the client's cached copy is still current"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def image_response(request: Request, path: str, size: Optional[str] = None) -> Response:
+    """Stream a page image from disk with caching headers"""
+    media_type = "image/png"
+    if size and size != "full":
+        path = derived_image_path(path, size)
+        media_type = "image/webp"
+
+    etag = file_etag(path)
+    last_modified = os.path.getmtime(path)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,218 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+class QueueFullError(Exception):
+    """Raised when admission control rejects a new job"""
+
+class JobCancelled(Exception):
+    """Raised inside a job when its session has been cancelled"""
+
+class JobQueue:
+    """Persistent priority queue of jobs stored in SQLite.
+
+    Lower priority values run first; jobs with equal priority run in
+    submission order. Any process with access to the database file can
+    enqueue jobs or claim them, and claiming is atomic.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            args TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            worker TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status_priority ON jobs (status, priority, job_id);
+        CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, status);
+    """
+
+    def __init__(self, path: str, max_queued: int = 100):
+        self.path = path
+        self.max_queued = max_queued
+        self.local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def enqueue(self, session_id: str, kind: str, args: Dict[str, Any], priority: int) -> int:
+        """Add a job, rejecting it if too many jobs are already waiting"""
+        with self._transaction() as conn:
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError(f"{queued} jobs are already waiting")
+            # A session only ever has one live job; earlier ones were abandoned by a dead worker
+            conn.execute(
+                "UPDATE jobs SET status = 'abandoned', finished_at = ? "
+                "WHERE session_id = ? AND status IN ('queued', 'running')",
+                (time.time(), session_id)
+            )
+            cursor = conn.execute(
+                "INSERT INTO jobs (session_id, kind, args, priority, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (session_id, kind, json.dumps(args), priority, time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the most urgent queued job, or None if there is nothing to do"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id, session_id, kind, args FROM jobs WHERE status = 'queued' "
+                "ORDER BY priority, job_id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE job_id = ?",
+                (worker, time.time(), row[0])
+            )
+        return {"job_id": row[0], "session_id": row[1], "kind": row[2], "args": json.loads(row[3])}
+
+    def finish(self, job_id: int, status: str, error: Optional[str] = None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ? AND status = 'running'",
+                (status, error, time.time(), job_id)
+            )
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancel a session's queued job; returns False if none was waiting"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE session_id = ? AND status = 'queued'",
+                (time.time(), session_id)
+            )
+            return cursor.rowcount > 0
+
+    def position(self, session_id: str) -> Optional[int]:
+        """1-based place of a session's queued job in line, or None if it is not waiting"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT job_id, priority FROM jobs WHERE session_id = ? AND status = 'queued'", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND (priority < ? OR (priority = ? AND job_id < ?))",
+            (row[1], row[1], row[0])
+        ).fetchone()[0]
+        return ahead + 1
+
+    def depth(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE status IN ('queued', 'running') GROUP BY status"
+        ).fetchall()
+        counts = {"queued": 0, "running": 0}
+        counts.update(dict(rows))
+        return counts
+
+def worker_loop(queue_path: str, worker: str, run_job: Callable[[str, str, Dict[str, Any]], str],
+                stop: Optional[Any] = None, poll_interval: float = 0.5):
+    """Claim and run jobs until stop is set"""
+    queue = JobQueue(queue_path)
+    while stop is None or not stop.is_set():
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            status = run_job(job["kind"], job["session_id"], job["args"])
+            queue.finish(job["job_id"], status or "done")
+        except Exception:
+            queue.finish(job["job_id"], "failed", traceback.format_exc())
+
+def _process_worker(queue_path: str, worker: str, stop):
+    # Imported here so only worker processes load the processing code
+    from main import run_job
+    worker_loop(queue_path, worker, run_job, stop)
+
+class WorkerPool:
+    """Fixed set of job workers.
+
+    Workers are separate processes so OCR and report generation never
+    compete with the API for the GIL. With use_processes=False they are
+    threads, which is only meant for the in-memory session store.
+    """
+
+    def __init__(self, queue_path: str, workers: int, use_processes: bool = True,
+                 run_job: Optional[Callable] = None):
+        self.queue_path = queue_path
+        self.workers = workers
+        self.use_processes = use_processes
+        self.run_job = run_job
+        self.handles: List[Any] = []
+        self.stop = None
+
+    def start(self):
+        if self.use_processes:
+            ctx = multiprocessing.get_context("spawn")
+            self.stop = ctx.Event()
+            for i in range(self.workers):
+                worker = f"{os.getpid()}-{i}"
+                p = ctx.Process(target=_process_worker, args=(self.queue_path, worker, self.stop),
+                                name=f"job-worker-{i}")
+                p.start()
+                self.handles.append(p)
+        else:
+            self.stop = threading.Event()
+            for i in range(self.workers):
+                worker = f"{os.getpid()}-thread-{i}"
+                t = threading.Thread(target=worker_loop, args=(self.queue_path, worker, self.run_job, self.stop),
+                                     name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self.handles.append(t)
+
+    def shutdown(self, timeout: float = 10):
+        if self.stop is None:
+            return
+        self.stop.set()
+        for handle in self.handles:
+            handle.join(timeout)
+            if self.use_processes and handle.is_alive():
+                handle.terminate()
+        self.handles = []
+
+if __name__ == "__main__":
+    # Standalone workers, for deployments that run the API with JOB_WORKERS=0
+    from main import JOB_DB_PATH, JOB_WORKERS
+
+    pool = WorkerPool(JOB_DB_PATH, max(1, JOB_WORKERS))
+    pool.start()
+    try:
+        for handle in pool.handles:
+            handle.join()
+    except KeyboardInterrupt:
+        pool.shutdown()
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+class OutputMemo:
+    """LLM outputs of one session, keyed by a hash of everything that determines them.
+
+    Outputs are saved to the session store as they are produced, so an
+    interrupted report keeps them too. finish() keeps only the entries used
+    by the current generation, dropping outputs of chunks that changed.
+    """
+
+    def __init__(self, store, session_id: str, model_id: str, field: str = "llm_outputs"):
+        self.store = store
+        self.session_id = session_id
+        self.model_id = model_id
+        self.field = field
+        self.previous: Dict[str, str] = (store.get(session_id, [field]) or {}).get(field) or {}
+        self.current: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.reused = 0
+        self.generated = 0
+
+    def key(self, prompt: str, parameters: Dict[str, Any], text: str) -> str:
+        payload = json.dumps([self.model_id, parameters, prompt, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            value = self.current.get(key, self.previous.get(key))
+            if value is not None:
+                self.current[key] = value
+                self.reused += 1
+            return value
+
+    def put(self, key: str, value: str):
+        with self.lock:
+            self.current[key] = value
+            self.generated += 1
+            self.store.update(self.session_id, {self.field: {**self.previous, **self.current}})
+
+    def finish(self):
+        with self.lock:
+            self.store.update(self.session_id, {self.field: self.current})
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"reused": self.reused, "generated": self.generated}
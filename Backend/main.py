@@ -1,6 +1,6 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Response
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
@@ -8,26 +8,39 @@ import os
 import shutil
 import uuid
 import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
-import io
-import base64
+import hashlib
+import threading
+import multiprocessing
+import asyncio
 import json
-import requests
-from googletrans import Translator
-import tempfile
-import pypandoc
+import sqlite3
 from dotenv import load_dotenv
 import time
+import zipfile
+from contextlib import ExitStack
 from pathlib import Path
-import cv2
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Load environment variables
 load_dotenv()
 
-# Set Tesseract executable path - update this path to match your Tesseract installation
-pytesseract.pytesseract.tesseract_cmd = r'C:\Users\PRAKASH.R\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
+# OCR helpers read TESSERACT_CMD, so import them after loading .env
+from ocr import ocr_page, ocr_failed, engine_version, get_engine, profile_cache_params, pixmap_gray, page_content, OCR_LANG, PROFILE_CHOICES
+from ocr_cache import OCRCache
+from pipeline import Pipeline
+from metrics import Metrics, StageTimer, DEPTH_BUCKETS
+from tracing import TraceRecorder, load_trace
+from search import SearchIndex, SEARCH_KINDS
+from text_layer import classify_page
+from images import image_response, not_modified, IMAGE_SIZES
+from session_store import create_session_store
+from jobs import JobQueue, WorkerPool, QueueFullError, JobCancelled
+from translation import TranslationService, create_provider
+from uploads import ChunkedUploads, UploadError, save_stream
+from watsonx import WatsonXClient
+from llm_memo import OutputMemo
+from docx_render import report_markdown_path, report_docx_path, content_hash
+from report_planner import estimate_tokens, input_budget, plan_chunks, pack_texts, format_chunk
 
 app = FastAPI(title="Fox Mandal OCR-AI API")
 
@@ -50,6 +63,83 @@ os.makedirs("outputs", exist_ok=True)
 API_KEY = os.getenv("API_KEY")
 PROJECT_ID = os.getenv("PROJECT_ID")
 
+# WatsonX endpoints (override to point at a mock server) and request limits
+WATSONX_IAM_URL = os.getenv("WATSONX_IAM_URL", "https://iam.cloud.ibm.com/identity/token")
+WATSONX_URL = os.getenv("WATSONX_URL", "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation?version=2024-01-15")
+# Streaming endpoint used to show the report while it is written ("" to disable streaming)
+WATSONX_STREAM_URL = os.getenv("WATSONX_STREAM_URL", WATSONX_URL.replace("/text/generation?", "/text/generation_stream?"))
+WATSONX_MODEL_ID = os.getenv("WATSONX_MODEL_ID", "meta-llama/llama-3-3-70b-instruct")
+# Chunks sent to WatsonX at the same time by each job worker
+WATSONX_CONCURRENCY = max(1, int(os.getenv("WATSONX_CONCURRENCY", 4)))
+WATSONX_TIMEOUT = float(os.getenv("WATSONX_TIMEOUT", 300))
+WATSONX_RETRIES = int(os.getenv("WATSONX_RETRIES", 3))
+# Model context window and output budget used to size report chunks
+WATSONX_CONTEXT_TOKENS = int(os.getenv("WATSONX_CONTEXT_TOKENS", 131072))
+WATSONX_MAX_NEW_TOKENS = int(os.getenv("WATSONX_MAX_NEW_TOKENS", 8100))
+
+# "map_reduce" extracts facts per chunk and writes one report from them; "concat" writes a report per chunk
+REPORT_MODE = os.getenv("REPORT_MODE", "map_reduce")
+# Output budget of each per-chunk extraction and merge call
+REPORT_MAP_MAX_NEW_TOKENS = int(os.getenv("REPORT_MAP_MAX_NEW_TOKENS", 4096))
+# Rendered reports (Markdown and DOCX), named by a hash of the report text
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join("outputs", "reports"))
+# Minimum seconds between saves of the partially written report
+REPORT_PARTIAL_INTERVAL = float(os.getenv("REPORT_PARTIAL_INTERVAL", 0.5))
+
+# Job worker processes running process_pdf / generate_report (0 = run workers separately with jobs.py)
+JOB_WORKERS = max(0, int(os.getenv("JOB_WORKERS", 2)))
+# Jobs allowed to wait in the queue before uploads are rejected
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", 100))
+# Lower runs first, so report generation goes ahead of bulk OCR
+JOB_PRIORITIES = {"generate_report": 0, "process_pdf": 10}
+# Number of OCR processes per job worker; by default the cores are split between job workers
+OCR_WORKERS = max(1, int(os.getenv("OCR_WORKERS", (os.cpu_count() or 1) // max(1, JOB_WORKERS))))
+# Number of threads translating OCR output
+TRANSLATE_WORKERS = max(1, int(os.getenv("TRANSLATE_WORKERS", 4)))
+# Pages allowed to wait between two pipeline stages
+PIPELINE_QUEUE_SIZE = max(1, int(os.getenv("PIPELINE_QUEUE_SIZE", 2 * OCR_WORKERS)))
+# On-disk OCR result cache; set OCR_CACHE_MAX_MB=0 to disable
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join("cache", "ocr"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 512))
+# Translation backend ("google", or "local" for offline runs) and its limits
+TRANSLATION_PROVIDER = os.getenv("TRANSLATION_PROVIDER", "google")
+TRANSLATE_CONCURRENCY = max(1, int(os.getenv("TRANSLATE_CONCURRENCY", 4)))
+TRANSLATE_RATE_LIMIT = float(os.getenv("TRANSLATE_RATE_LIMIT", 5))
+TRANSLATE_BATCH_CHARS = int(os.getenv("TRANSLATE_BATCH_CHARS", 4000))
+# Longest a page may wait for its translation, in seconds
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", 300))
+# Use the embedded text of born-digital pages instead of running OCR
+TEXT_LAYER_FAST_PATH = os.getenv("TEXT_LAYER_FAST_PATH", "true").lower() == "true"
+# Skip OCR and translation of blank and near-blank pages
+BLANK_PAGE_DETECTION = os.getenv("BLANK_PAGE_DETECTION", "true").lower() == "true"
+# Most PDFs accepted in one bulk upload, counting those inside ZIP archives
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", 200))
+# Upload limits, and the part size suggested to clients of resumable uploads
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", 1024))
+# Most data stored for one bulk upload, after unpacking ZIP archives
+BULK_MAX_MB = int(os.getenv("BULK_MAX_MB", 4 * UPLOAD_MAX_MB))
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", 3000))
+UPLOAD_CHUNK_MB = int(os.getenv("UPLOAD_CHUNK_MB", 8))
+# Session storage ("sqlite", or "memory" for tests) and the SQLite database path
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+# Sessions whose worker has not reported progress for this long are resumed
+SESSION_STALE_SECONDS = int(os.getenv("SESSION_STALE_SECONDS", 300))
+# Job queue database; shares the session database unless set
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", SESSION_DB_PATH)
+# Metrics database, written by every API and worker process; shares the job database unless set
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH", JOB_DB_PATH)
+# Pages returned by a /pages range request without an end, and the most allowed in one request
+PAGE_RANGE_DEFAULT = int(os.getenv("PAGE_RANGE_DEFAULT", 20))
+PAGE_RANGE_MAX = int(os.getenv("PAGE_RANGE_MAX", 100))
+# Full-text search index over page text of every session, and the most hits returned by one search
+SEARCH_DB_PATH = os.getenv("SEARCH_DB_PATH", "search.db")
+SEARCH_LIMIT_MAX = int(os.getenv("SEARCH_LIMIT_MAX", 100))
+# Built frontend served at /; resolved from this file so it does not depend on the working directory
+FRONTEND_BUILD_DIR = os.getenv("FRONTEND_BUILD_DIR", str(Path(__file__).resolve().parent.parent / "frontend" / "build"))
+# How often the event stream checks a session for changes, in seconds
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", 0.5))
+
 # Prompt for the WatsonX AI
 LEGAL_PROMPT = '''You are a Senior Legal Associate at a top-tier Indian law firm (e.g., Fox Mandal & Associates), specializing in property due diligence and land title verification.
 
@@ -171,6 +261,29 @@ Firm name
 Contact info (phone + email)
 '''
 
+# Map step of map-reduce reports: pull the facts a title report needs out of one chunk
+EXTRACTION_PROMPT = '''You are assisting a Senior Legal Associate who is preparing a "Report on Title" for Indian agricultural or urban land.
+
+The input is one part of a larger bundle of OCR-extracted and translated land records (RTCs, Mutation Registers, Deeds, Encumbrance Certificates and similar). Another step will combine your notes with notes from the other parts, so do not write the report itself.
+
+Extract, as concise Markdown bullet points grouped under these headings, every fact in the input relevant to:
+- Lands: survey numbers, extents, A-Kharab, village, taluk, district, boundaries
+- Documents: description, date, document number, issuing authority
+- Title: title holders by period, mutations, sales, gifts, partitions, inheritance, and the document each relies on
+- Encumbrances: mortgages, charges, liens, with periods and document details
+- Restrictions: land ceiling, grant / Inam / SC-ST lands, alienation restrictions, PTCL, tenancy, acquisition endorsements
+- Family: members, relationships, ages, marital status, and the source of the family tree
+- Litigation and verifications
+
+Cite the page label (e.g. [Page 12]) after each fact. Use only the data found in the input; do not infer or assume facts. Omit headings with nothing to report.
+'''
+
+# Merge step for bundles whose extractions are still too large for one report call
+MERGE_PROMPT = '''You are assisting a Senior Legal Associate who is preparing a "Report on Title". The input is several sets of notes extracted from consecutive parts of one bundle of land records.
+
+Combine them into a single set of notes under the same headings. Keep every distinct fact and its page citations, remove exact duplicates, keep title and encumbrance entries in chronological order, and do not add facts that are not in the notes.
+'''
+
 class ProcessingStatus(BaseModel):
     session_id: str
     status: str
@@ -179,16 +292,30 @@ class ProcessingStatus(BaseModel):
     current_stage: str
     total_pages: int
     processed_pages: int
+    queue_position: Optional[int] = None
+    stage_timings: Optional[Dict[str, Any]] = None
     final_output: Optional[str] = None
 
 class ProcessingResponse(BaseModel):
     session_id: str
     message: str
+    reused_from: Optional[str] = None
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    size: int
+    sha256: Optional[str] = None
+
+class BulkUploadResponse(ProcessingResponse):
+    documents: List[Dict[str, Any]]
+    skipped: List[str]
+    total_pages: int
 
 class PageData(BaseModel):
     page_number: int
     raw_text: str
     translated_text: str
+    content: str = "text"
 
 class PageUpdateRequest(BaseModel):
     page_number: int
@@ -198,108 +325,454 @@ class ReportRequest(BaseModel):
     session_id: str
     client_name: Optional[str] = None
 
-# In-memory storage for process tracking
-processing_status = {}
+# Fields a /pages range request can select, and the page values they come from
+PAGE_FIELDS = {
+    "raw_text": "extracted_pages",
+    "translated_text": "translated_pages",
+    "edited_text": "edited_pages",
+    "image": "image_paths",
+    "info": "page_info",
+}
 
-def get_ibm_access_token(api_key):
-    """Get IBM WatsonX access token"""
-    url = "https://iam.cloud.ibm.com/identity/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
-        "apikey": api_key
-    }
-    response = requests.post(url, headers=headers, data=data)
-    return response.json()["access_token"]
-
-def preprocess_image(pil_image):
-    """Preprocess image to improve OCR quality"""
-    img = np.array(pil_image.convert("RGB"))
-    img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    img = cv2.resize(img, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR)
-    img = cv2.fastNlMeansDenoising(img, h=30)
-    kernel = np.array([[0, -1, 0],
-                       [-1, 5,-1],
-                       [0, -1, 0]])
-    img = cv2.filter2D(img, -1, kernel)
-    img = cv2.adaptiveThreshold(img, 255,
-                                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                cv2.THRESH_BINARY, 35, 15)
-    return Image.fromarray(img)
-
-def extract_text_from_image(image: Image.Image):
-    """Extract text from image using OCR"""
+# Session fields reported by /status and the event stream
+STATUS_FIELDS = ["status", "message", "progress", "current_stage", "total_pages", "processed_pages",
+                 "processing_timings", "report_timings"]
+
+# Session state shared by every API and worker process
+session_store = create_session_store(SESSION_STORE, SESSION_DB_PATH)
+
+# Persistent queue feeding the job worker pool
+job_queue = JobQueue(JOB_DB_PATH, max_queued=JOB_QUEUE_MAX)
+
+# Resumable uploads in progress, shared by every API process through the disk
+chunked_uploads = ChunkedUploads(os.path.join("uploads", "partial"), UPLOAD_MAX_MB * 1024 * 1024, UPLOAD_CHUNK_MB * 1024 * 1024)
+
+# Page text of every session, indexed as pages are published or edited
+search_index = SearchIndex(SEARCH_DB_PATH)
+
+def index_page_text(session_id: str, page_number: int, texts: Dict[str, Optional[str]]):
+    """Update the search index; a failure only affects search, never the session"""
     try:
-        # Preprocess image
-        processed_img = preprocess_image(image)
-        
-        # Perform OCR with Tesseract
-        extracted_text = pytesseract.image_to_string(processed_img, lang='kan+eng')
-        return extracted_text
+        search_index.index_page(session_id, page_number, texts)
     except Exception as e:
-        return f"[OCR failed: {str(e)}]"
+        print(f"Indexing page {page_number} of session {session_id} failed: {e}")
+
+def index_session_text(session_id: str):
+    """Index every published page of a session"""
+    pages = {kind: session_store.get_pages(session_id, kind) for kind in SEARCH_KINDS}
+    for key, translated in pages["translated_pages"].items():
+        edited = pages["edited_pages"].get(key)
+        index_page_text(session_id, page_number_of(key), {
+            "extracted_pages": pages["extracted_pages"].get(key),
+            "translated_pages": translated,
+            "edited_pages": edited if edited != translated else None
+        })
+
+# Stage timings, page counters and external call outcomes, combined across processes for /metrics
+metrics = Metrics(METRICS_DB_PATH, prefix="ocr_ai_")
+metrics.describe("stage_seconds", "Time spent in each stage of processing, report generation, downloads and searches")
+metrics.describe("page_seconds", "Time from starting a page to publishing it, including time spent queued")
+metrics.describe("pages_total", "Pages processed, by how their text was obtained")
+metrics.describe("page_errors_total", "Pages whose OCR or translation failed")
+metrics.describe("pipeline_queue_depth", "Pages waiting for a pipeline stage when it takes the next one")
+metrics.describe("external_request_seconds", "Latency of calls to external services")
+metrics.describe("external_requests_total", "Calls to external services, by outcome")
+metrics.describe("downloads_total", "Report downloads, by file type and whether the file was already rendered")
+metrics.describe("cache_lookups_total", "OCR and translation cache lookups, by result")
+metrics.describe("cache_evictions_total", "Entries evicted from the OCR cache")
+
+def external_request_observer(service: str):
+    """on_request callback recording latency and outcome of one external service's calls"""
+    def observe(seconds: float, ok: bool):
+        metrics.observe("external_request_seconds", seconds, {"service": service})
+        metrics.inc("external_requests_total", {"service": service, "outcome": "ok" if ok else "error"})
+    return observe
+
+def cache_lookup_observer(cache: str):
+    """on_lookup callback counting one cache's hits and misses"""
+    def observe(hit: bool):
+        metrics.inc("cache_lookups_total", {"cache": cache, "result": "hit" if hit else "miss"})
+    return observe
+
+# OCR results keyed by page pixels, shared by every session
+ocr_cache = OCRCache(
+    OCR_CACHE_DIR,
+    OCR_CACHE_MAX_MB * 1024 * 1024,
+    on_lookup=cache_lookup_observer("ocr"),
+    on_evict=lambda count: metrics.inc("cache_evictions_total", {"cache": "ocr"}, count)
+)
+
+# Batched, cached translation shared by every session
+translation_service = TranslationService(
+    create_provider(TRANSLATION_PROVIDER),
+    batch_chars=TRANSLATE_BATCH_CHARS,
+    concurrency=TRANSLATE_CONCURRENCY,
+    rate_limit=TRANSLATE_RATE_LIMIT,
+    timeout=TRANSLATE_TIMEOUT,
+    on_request=external_request_observer("translate"),
+    on_lookup=cache_lookup_observer("translate")
+)
+
+# Pooled WatsonX client; each process caches its own IAM token
+watsonx_client = WatsonXClient(
+    API_KEY,
+    PROJECT_ID,
+    WATSONX_MODEL_ID,
+    WATSONX_IAM_URL,
+    WATSONX_URL,
+    concurrency=WATSONX_CONCURRENCY,
+    timeout=WATSONX_TIMEOUT,
+    retries=WATSONX_RETRIES,
+    stream_url=WATSONX_STREAM_URL or None,
+    on_request=external_request_observer("watsonx")
+)
+
+# Shared process pool for OCR, created on first use
+ocr_pool = None
+
+# Threads writing page images to disk while rendering and OCR continue
+image_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-writer")
+
+def write_page_image(pix, image_path: str):
+    """Save a rendered page as PNG in the background; returns a future"""
+    def write():
+        tmp_path = f"{image_path}.{os.getpid()}.tmp.png"
+        pix.save(tmp_path)
+        os.replace(tmp_path, image_path)
+    return image_writer.submit(write)
+
+def get_ocr_pool():
+    """Get the shared OCR process pool, creating it if needed"""
+    global ocr_pool
+    if ocr_pool is None:
+        # Each worker loads its OCR engine once, before its first page
+        # Job workers run several threads by now, and forking those can inherit held locks
+        ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=get_engine,
+                                       mp_context=multiprocessing.get_context("spawn"))
+    return ocr_pool
 
 def translate_text(text: str, src='kn', dest='en'):
     """Translate text from one language to another"""
-    translator = Translator()
     try:
-        translated = translator.translate(text, src=src, dest=dest).text
-        return translated
+        return translation_service.translate(text, src=src, dest=dest)
     except Exception as e:
         return f"[Translation failed: {str(e)}]"
 
-def chunk_text(text_dict: Dict[str, str], chunk_size=15):
-    """Split text into manageable chunks for AI processing"""
-    pages = list(text_dict.items())
-    return [dict(pages[i:i + chunk_size]) for i in range(0, len(pages), chunk_size)]
-
-def send_chunk_to_watsonx(chunk_text: str, access_token: str):
-    """Send text chunk to WatsonX AI for processing"""
-    url = "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation?version=2024-01-15"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-        "Authorization": f"Bearer {access_token}"
-    }
-
-    payload = {
-        "input": LEGAL_PROMPT + chunk_text,
-        "parameters": {
-            "decoding_method": "greedy",
-            "max_new_tokens": 8100,
-            "min_new_tokens": 0,
-            "stop_sequences": [],
-            "repetition_penalty": 1
-        },
-        "model_id": "meta-llama/llama-3-3-70b-instruct",
-        "project_id": PROJECT_ID
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
+def page_number_of(page_key: str) -> int:
+    """Page number from a "Page N" key"""
+    return int(page_key.rsplit(" ", 1)[-1])
+
+# Generation parameters used for every report call
+WATSONX_PARAMETERS = {
+    "decoding_method": "greedy",
+    "max_new_tokens": WATSONX_MAX_NEW_TOKENS,
+    "min_new_tokens": 0,
+    "stop_sequences": [],
+    "repetition_penalty": 1
+}
+
+# Parameters for the extraction and merge calls of map-reduce reports
+WATSONX_MAP_PARAMETERS = {**WATSONX_PARAMETERS, "max_new_tokens": REPORT_MAP_MAX_NEW_TOKENS}
+
+def send_chunks_to_watsonx(chunks: List[str], prompt: str = LEGAL_PROMPT,
+                           parameters: Dict[str, Any] = WATSONX_PARAMETERS, on_result=None,
+                           on_partial=None, memo: Optional[OutputMemo] = None,
+                           trace: Optional[TraceRecorder] = None) -> List[str]:
+    """Send text chunks to WatsonX AI concurrently, returning outputs in chunk order.
+
+    Chunks whose output is already in memo are not sent again; their
+    callbacks fire straight away. New outputs are added to memo. With a
+    trace, each call is recorded as a span on the thread that made it.
+    """
+    keys = [memo.key(prompt, parameters, chunk) if memo else None for chunk in chunks]
+    outputs = [memo.get(key) if memo else None for key in keys]
+    missing = [i for i, output in enumerate(outputs) if output is None]
+    failed = set()
+    started = {}
+
+    def start(index):
+        started[index] = (time.time(), threading.get_ident(), threading.current_thread().name)
+
+    def fallback(index, e):
+        failed.add(missing[index])
+        return f"[WatsonX response error: {str(e)}]"
+
+    def finished(index, output):
+        i = missing[index]
+        outputs[i] = output
+        if trace is not None and index in started:
+            at, tid, thread_name = started[index]
+            trace.span("llm_chunk", "report", at, time.time() - at, pid=os.getpid(), tid=tid,
+                       thread_name=thread_name, chunk=i, failed=i in failed or None)
+        if memo and i not in failed:
+            memo.put(keys[i], output)
+        if on_result:
+            on_result(i, output)
+
+    for i, output in enumerate(outputs):
+        if output is not None:
+            if on_partial:
+                on_partial(i, output)
+            if on_result:
+                on_result(i, output)
+
+    watsonx_client.generate_many(
+        [prompt + chunks[i] for i in missing],
+        parameters,
+        on_result=finished,
+        fallback=fallback,
+        on_start=start if trace is not None else None,
+        on_partial=(lambda index, text: on_partial(missing[index], text)) if on_partial else None
+    )
+    return outputs
+
+def report_pages(session_id: str) -> Dict[str, str]:
+    """Reviewed page text keyed by the label the report sees; bulk uploads also name the source document.
+
+    Blank pages are left out unless a reviewer typed text into them.
+    """
+    edited_pages = session_store.get_pages(session_id, "edited_pages")
+    page_info = session_store.get_pages(session_id, "page_info")
+    edited_pages = {key: text for key, text in edited_pages.items()
+                    if (page_info.get(key) or {}).get("source") != "skipped" or text.strip()}
+    documents = (session_store.get(session_id, ["documents"]) or {}).get("documents") or []
+    if len(documents) <= 1:
+        return edited_pages
+    
+    labelled = {}
+    for key, text in edited_pages.items():
+        info = page_info.get(key) or {}
+        if "document" in info:
+            key = f"{key} ({info['document']}, p. {info['document_page']})"
+        labelled[key] = text
+    return labelled
+
+def report_progress(session_id: str, stage: str, label: str, count: int, start: float, end: float):
+    """Callback for send_chunks_to_watsonx that advances progress from start to end as calls finish"""
+    session_store.update(session_id, {
+        "message": f"{label} 0 of {count}",
+        "progress": start,
+        "current_stage": stage
+    })
+    finished = []
+
+    def done(index, output):
+        if cancel_requested(session_id):
+            raise JobCancelled("Report generation cancelled")
+        finished.append(index)
+        session_store.update(session_id, {
+            "message": f"{label} {len(finished)} of {count}",
+            "progress": start + (end - start) * len(finished) / count
+        })
+    return done
+
+def report_streamer(session_id: str, count: int, on_result=None, client_name: Optional[str] = None):
+    """on_partial and on_result callbacks that save the report written so far as partial_report"""
+    texts = [""] * count
+    complete = [False] * count
+    lock = threading.Lock()
+    last_saved = [0.0]
+
+    def save(force=False):
+        now = time.monotonic()
+        if not force and now - last_saved[0] < REPORT_PARTIAL_INTERVAL:
+            return
+        last_saved[0] = now
+        # Finished chunks at the start plus the one being written, so the text only grows
+        shown = []
+        for text, done in zip(texts, complete):
+            if text:
+                shown.append(text)
+            if not done:
+                break
+        report = "\n\n".join(shown)
+        if client_name:
+            report = report.replace("[Client Name]", client_name)
+        session_store.update(session_id, {"partial_report": report})
+
+    def partial(index, text):
+        with lock:
+            texts[index] = text
+            save()
+
+    def finished(index, text):
+        with lock:
+            texts[index] = text
+            complete[index] = True
+            save(force=True)
+        if on_result:
+            on_result(index, text)
+    return partial, finished
+
+def write_report(session_id: str, edited_pages: Dict[str, str], client_name: Optional[str] = None,
+                 memo: Optional[OutputMemo] = None, timer: Optional[StageTimer] = None) -> str:
+    """Turn the reviewed pages into report Markdown, packing pages to fit the model context.
+
+    Bundles that fit in one call are written directly. Larger ones either
+    get one report per chunk ("concat") or have their facts extracted per
+    chunk, merged until they fit, and written up in a single final call
+    ("map_reduce"). Report text is saved to the session as it streams in.
+    Chunk boundaries are kept from the previous report where possible, so
+    after an edit only the chunks containing changed pages miss the memo.
+    """
+    timer = timer or StageTimer(metrics, "report")
+    plans = (session_store.get(session_id, ["report_plans"]) or {}).get("report_plans") or {}
+    report_budget = input_budget(WATSONX_CONTEXT_TOKENS, LEGAL_PROMPT, WATSONX_MAX_NEW_TOKENS)
+    with timer.stage("plan_chunks"):
+        chunks = plan_chunks(edited_pages, report_budget, plans.get("report"))
+    plans["report"] = [list(c) for c in chunks]
+
+    if len(chunks) <= 1 or REPORT_MODE != "map_reduce":
+        done = report_progress(session_id, "processing_chunks", "Processed chunk", len(chunks), 0.2, 0.8)
+        partial, done = report_streamer(session_id, len(chunks), done, client_name)
+        session_store.update(session_id, {"report_plans": plans})
+        with timer.stage("watsonx_report"):
+            return "\n\n".join(send_chunks_to_watsonx([format_chunk(c) for c in chunks], on_result=done,
+                                                       on_partial=partial, memo=memo, trace=timer.trace))
+
+    # Map: extract the relevant facts from each chunk
+    map_budget = input_budget(WATSONX_CONTEXT_TOKENS, EXTRACTION_PROMPT, REPORT_MAP_MAX_NEW_TOKENS)
+    with timer.stage("plan_chunks"):
+        map_chunks = plan_chunks(edited_pages, map_budget, plans.get("map"))
+    plans["map"] = [list(c) for c in map_chunks]
+    session_store.update(session_id, {"report_plans": plans})
+    done = report_progress(session_id, "extracting_facts", "Extracted facts from chunk", len(map_chunks), 0.2, 0.6)
+    with timer.stage("watsonx_map"):
+        notes = send_chunks_to_watsonx([format_chunk(c) for c in map_chunks], EXTRACTION_PROMPT,
+                                       WATSONX_MAP_PARAMETERS, on_result=done, memo=memo, trace=timer.trace)
+
+    # Reduce: merge neighbouring notes until they fit in the final call
+    merge_budget = input_budget(WATSONX_CONTEXT_TOKENS, MERGE_PROMPT, REPORT_MAP_MAX_NEW_TOKENS)
+    while estimate_tokens("\n\n".join(notes)) > report_budget:
+        groups = pack_texts(notes, merge_budget)
+        if len(groups) == len(notes):
+            # Every note fills a call on its own; merging cannot shrink them further
+            break
+        done = report_progress(session_id, "merging_facts", "Merged group", len(groups), 0.6, 0.7)
+        with timer.stage("watsonx_merge"):
+            notes = send_chunks_to_watsonx(["\n\n".join(g) for g in groups], MERGE_PROMPT,
+                                           WATSONX_MAP_PARAMETERS, on_result=done, memo=memo, trace=timer.trace)
+
+    # Final pass: one report from all of the notes
+    if cancel_requested(session_id):
+        raise JobCancelled("Report generation cancelled")
+    session_store.update(session_id, {
+        "message": "Writing report",
+        "progress": 0.7,
+        "current_stage": "writing_report"
+    })
+    partial, done = report_streamer(session_id, 1, client_name=client_name)
+    with timer.stage("watsonx_final"):
+        return send_chunks_to_watsonx(["\n\n".join(notes)], on_result=done, on_partial=partial, memo=memo, trace=timer.trace)[0]
+
+def estimate_source_dpi(page) -> Optional[float]:
+    """Resolution of the largest image on a page, or None if it has no images"""
+    best_area, dpi = 0.0, None
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        area = (x1 - x0) * (y1 - y0)
+        if area > best_area and x1 > x0:
+            best_area = area
+            dpi = info["width"] / ((x1 - x0) / 72)
+    return dpi
+
+def cancel_requested(session_id: str) -> bool:
+    """Whether the user asked to stop this session's running job"""
+    fields = session_store.get(session_id, ["cancel_requested"]) or {}
+    return bool(fields.get("cancel_requested"))
+
+def mark_cancelled(session_id: str):
+    """Record that a session's job stopped because it was cancelled"""
+    session_store.update(session_id, {
+        "status": "cancelled",
+        "message": "Cancelled by user",
+        "progress": 0,
+        "current_stage": "cancelled"
+    })
+
+def run_job(kind: str, session_id: str, args: Dict[str, Any]) -> str:
+    """Run a queued job inside a job worker and return its final job status"""
+    if kind == "process_pdf":
+        process_pdf(session_id, args["file_path"], None, args.get("profile", "auto"))
+    elif kind == "generate_report":
+        generate_report(session_id, args.get("client_name"))
+    else:
+        raise ValueError(f"Unknown job kind: {kind}")
+    
+    status = (session_store.get(session_id, ["status"]) or {}).get("status")
+    return {"cancelled": "cancelled", "error": "failed"}.get(status, "done")
 
+def enqueue_job(session_id: str, kind: str, args: Dict[str, Any]):
+    """Queue work for the job workers, applying admission control"""
+    session_store.update(session_id, {"cancel_requested": False})
     try:
-        result = response.json()
-        return result["results"][0]["generated_text"]
-    except Exception as e:
-        return f"[WatsonX response error: {str(e)} - Raw: {response.text}]"
-
-def process_pdf(session_id: str, file_path: str, background_tasks: BackgroundTasks):
-    """Process PDF file in background"""
+        job_queue.enqueue(session_id, kind, args, JOB_PRIORITIES[kind])
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again in a few minutes",
+            headers={"Retry-After": "60"}
+        )
+    session_store.update(session_id, {
+        "status": "queued",
+        "message": "Waiting for a free worker",
+        "current_stage": "queued"
+    })
+
+def start_heartbeat(session_id: str) -> threading.Event:
+    """Keep a session's heartbeat fresh while this process works on it; set the returned event to stop"""
+    stop = threading.Event()
+    
+    def beat():
+        while not stop.wait(30):
+            session_store.update(session_id, {"heartbeat": time.time()})
+    
+    session_store.update(session_id, {"heartbeat": time.time()})
+    threading.Thread(target=beat, name=f"heartbeat-{session_id}", daemon=True).start()
+    return stop
+
+def trace_path(session_id: str) -> str:
+    return os.path.join("temp", session_id, "trace.jsonl")
+
+def session_trace(session_id: str) -> Optional[TraceRecorder]:
+    """Span recorder for a job of a session with tracing switched on, otherwise None"""
+    if not (session_store.get(session_id, ["trace"]) or {}).get("trace"):
+        return None
+    return TraceRecorder(trace_path(session_id), "Job worker")
+
+def create_processing_session(session_id: str, file_path: Optional[str], profile: str = "auto",
+                              documents: Optional[List[Dict[str, Any]]] = None):
+    """Initialize status tracking for an uploaded PDF, or for the documents of a bulk upload"""
+    session_store.create(session_id, {
+        "status": "queued",
+        "message": "Waiting to start PDF processing",
+        "progress": 0.0,
+        "current_stage": "initialization",
+        "total_pages": sum(d.get("page_count", 0) for d in documents or []),
+        "processed_pages": 0,
+        "preprocess_profile": profile,
+        "file_path": file_path,
+        "documents": documents,
+        "heartbeat": time.time(),
+        "final_output": None
+    })
+
+def session_documents(session_id: str, file_path: Optional[str]) -> List[Dict[str, Any]]:
+    """PDFs making up a session, in page order"""
+    documents = (session_store.get(session_id, ["documents"]) or {}).get("documents")
+    return documents or [{"filename": os.path.basename(file_path), "file_path": file_path}]
+
+def process_pdf(session_id: str, file_path: Optional[str], background_tasks: Optional[BackgroundTasks] = None, profile: str = "auto"):
+    """Process the session's PDF, or every PDF of a bulk upload, in background"""
+    # A resumed session keeps the pages it already finished
+    if not session_store.exists(session_id):
+        create_processing_session(session_id, file_path, profile)
+    
+    heartbeat = start_heartbeat(session_id)
+    # Timings carry on from before a restart, like the finished pages
+    trace = session_trace(session_id)
+    timer = StageTimer(metrics, "processing", (session_store.get(session_id, ["processing_timings"]) or {}).get("processing_timings"), trace)
     try:
-        # Initialize status tracking
-        processing_status[session_id] = {
-            "status": "processing",
-            "message": "Starting PDF processing",
-            "progress": 0.0,
-            "current_stage": "initialization",
-            "total_pages": 0,
-            "processed_pages": 0,
-            "extracted_pages": {},
-            "translated_pages": {},
-            "edited_pages": {},
-            "pdf_images": {},
-            "final_output": None
-        }
         
         # Create session directory for this processing job
         session_dir = os.path.join("temp", session_id)
@@ -307,70 +780,207 @@ def process_pdf(session_id: str, file_path: str, background_tasks: BackgroundTas
         images_dir = os.path.join("images", session_id)
         os.makedirs(images_dir, exist_ok=True)
         
+        documents = session_documents(session_id, file_path)
+        
         # Update status
-        processing_status[session_id].update({
-            "message": "Opening PDF document",
+        session_store.update(session_id, {
+            "status": "processing",
+            "message": "Opening PDF document" if len(documents) == 1 else f"Opening {len(documents)} PDF documents",
             "progress": 0.05,
             "current_stage": "pdf_loading"
         })
         
-        # Extract pages and preload images
-        extracted_pages = {}
-        translated_pages = {}
-        pdf_images = {}
-        
-        with fitz.open(file_path) as doc:
-            total_pages = len(doc)
-            processing_status[session_id]["total_pages"] = total_pages
+        with ExitStack() as stack:
+            docs = [stack.enter_context(fitz.open(d["file_path"])) for d in documents]
             
-            for page_num in range(total_pages):
-                # Update progress
-                processing_status[session_id].update({
-                    "message": f"Processing page {page_num+1} of {total_pages}",
-                    "progress": 0.1 + (0.7 * (page_num / total_pages)),
-                    "current_stage": "ocr_translation",
-                    "processed_pages": page_num
-                })
-                
-                # Get page
-                page = doc.load_page(page_num)
+            # Pages of all documents share one numbering, in upload order
+            first_pages = []
+            total_pages = 0
+            for doc in docs:
+                first_pages.append(total_pages)
+                total_pages += len(doc)
+            
+            # Pages published before a restart are not processed again
+            done_pages = {page_number_of(k) for k in session_store.get_pages(session_id, "extracted_pages")}
+            session_store.update(session_id, {"total_pages": total_pages, "processed_pages": len(done_pages)})
+            
+            def render_pages():
+                """Render stage: rasterise pages one at a time"""
+                for doc_index, doc in enumerate(docs):
+                    yield from render_document(doc_index, doc)
+            
+            def render_document(doc_index, doc):
+                for local_num in range(len(doc)):
+                    page_num = first_pages[doc_index] + local_num
+                    if page_num + 1 in done_pages:
+                        continue
+                    if cancel_requested(session_id):
+                        raise JobCancelled("Processing cancelled")
+                    
+                    # Get page
+                    with timer.stage("load_page", page=page_num + 1):
+                        page = doc.load_page(local_num)
+                    
+                    image_path = os.path.join(images_dir, f"page_{page_num + 1}.png")
+                    item = {
+                        "page_num": page_num,
+                        "image_path": image_path,
+                        "started": time.perf_counter(),
+                        "started_at": time.time(),
+                        # Where the page came from, so reviewers and the report can cite it
+                        "provenance": {
+                            "document": documents[doc_index]["filename"],
+                            "document_index": doc_index,
+                            "document_page": local_num + 1
+                        }
+                    }
+                    
+                    # Born-digital pages carry usable text, so they skip OCR entirely
+                    if TEXT_LAYER_FAST_PATH:
+                        with timer.stage("text_layer", page=page_num + 1):
+                            usable, text, layer_info = classify_page(page)
+                        if usable:
+                            # Only rendered for display, so keep the colour
+                            with timer.stage("render", page=page_num + 1):
+                                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+                            item["image_write"] = write_page_image(pix, image_path)
+                            item["raw_text"] = text
+                            item["info"] = {"source": "text_layer", **layer_info}
+                            yield item
+                            continue
+                        item["text_layer"] = layer_info
+                    
+                    # OCR only needs grayscale; its samples go to OpenCV without being encoded or copied
+                    with timer.stage("render", page=page_num + 1):
+                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), colorspace=fitz.csGRAY)
+                    
+                    # Blank backs and separator sheets have nothing to read; they are kept for review only
+                    if BLANK_PAGE_DETECTION:
+                        with timer.stage("blank_check", page=page_num + 1):
+                            content = page_content(pixmap_gray(pix))
+                        if content["content"] != "text":
+                            item["image_write"] = write_page_image(pix, image_path)
+                            item["raw_text"] = item["translated_text"] = ""
+                            item["info"] = {"source": "skipped", **content}
+                            yield item
+                            continue
+                    
+                    # The array is a view of the pixmap's memory, so the item keeps the pixmap alive
+                    item["pixmap"] = pix
+                    item["gray"] = pixmap_gray(pix)
+                    # The same pixmap is the display image, written once in the background
+                    item["image_write"] = write_page_image(pix, image_path)
+                    
+                    # Hash the raw pixels so identical pages hit the OCR cache
+                    with timer.stage("pixel_hash", page=page_num + 1):
+                        pixel_hash = hashlib.sha256(pix.samples_mv)
+                        pixel_hash.update(f"{pix.width}x{pix.height}x{pix.n}".encode())
+                        item["pixel_hash"] = pixel_hash.hexdigest()
+                    item["source_dpi"] = estimate_source_dpi(page) if profile == "auto" else None
+                    yield item
+            
+            def ocr_stage(item):
+                """Preprocess and OCR stage, run in the OCR process pool"""
+                if "raw_text" in item:
+                    return item
                 
-                # Render page to image for OCR
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                img_bytes = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_bytes))
+                # Keep the classifier's reason for sending the page to OCR
+                reason = item.get("text_layer", {}).get("reason")
                 
-                # Save image for future reference
-                image_path = os.path.join(images_dir, f"page_{page_num+1}.png")
-                img.save(image_path)
+                cache_key = OCRCache.make_key(item["pixel_hash"], profile_cache_params(profile, item["source_dpi"]), OCR_LANG, engine_version())
+                with timer.stage("ocr_cache", page=item["page_num"] + 1):
+                    cached_text = ocr_cache.get(cache_key)
+                if cached_text is not None:
+                    del item["gray"], item["pixmap"]
+                    item["raw_text"] = cached_text
+                    item["info"] = {"source": "ocr", "reason": reason, "profile": profile, "ocr_cache": True}
+                    return item
                 
-                # Convert to base64 for frontend
-                img_base64 = base64.b64encode(img_bytes).decode()
-                pdf_images[page_num] = img_base64
+                submitted = time.time()
+                _, item["raw_text"], used_profile, confidence, work = get_ocr_pool().submit(
+                    ocr_page, item["page_num"], item["gray"], profile, item["source_dpi"]
+                ).result()
+                # Until the worker started on the page, it was waiting for a free worker
+                page = item["page_num"] + 1
+                timer.add("ocr_pool_wait", max(0.0, work["stages"][0][1] - submitted), submitted, page=page)
+                for stage, started, seconds in work["stages"]:
+                    timer.add(stage, seconds, started, page=page, pid=work["pid"], tid=work["tid"],
+                              thread_name=work["thread"], process_name="OCR worker")
+                del item["gray"], item["pixmap"]
+                item["info"] = {"source": "ocr", "reason": reason, "profile": used_profile, "ocr_cache": False, **confidence}
+                if not ocr_failed(item["raw_text"]):
+                    ocr_cache.put(cache_key, item["raw_text"])
+                return item
+            
+            def translate_stage(item):
+                """Translate stage"""
+                if "translated_text" in item:
+                    return item
+                with timer.stage("translate", page=item["page_num"] + 1):
+                    item["translated_text"] = translate_text(item["raw_text"], src='kn', dest='en')
+                return item
+            
+            def publish(item):
+                """Make a finished page available for review right away"""
+                # The image must be on disk before its path is published
+                with timer.stage("image_write_wait", page=item["page_num"] + 1):
+                    item["image_write"].result()
                 
-                # Perform OCR
-                extracted_text = extract_text_from_image(img)
-                extracted_pages[f"Page {page_num+1}"] = extracted_text
+                info = {**item["info"], "elapsed_seconds": round(time.perf_counter() - item["started"], 3)}
+                metrics.observe("page_seconds", info["elapsed_seconds"])
+                if trace is not None:
+                    trace.async_span(f"Page {item['page_num'] + 1}", "page", item["started_at"], info["elapsed_seconds"],
+                                     item["page_num"] + 1, source=info["source"])
+                metrics.inc("pages_total", {"source": "ocr_cache" if info.get("ocr_cache") else info["source"]})
+                if info["source"] == "ocr" and ocr_failed(item["raw_text"]):
+                    metrics.inc("page_errors_total", {"stage": "ocr"})
+                if "[Translation failed:" in item["translated_text"]:
+                    metrics.inc("page_errors_total", {"stage": "translate"})
                 
-                # Translate text
-                translated_text = translate_text(extracted_text, src='kn', dest='en')
-                translated_pages[f"Page {page_num+1}"] = translated_text
+                session_store.set_page(session_id, item["page_num"] + 1, {
+                    "image_paths": item["image_path"],
+                    "extracted_pages": item["raw_text"],
+                    "translated_pages": item["translated_text"],
+                    "edited_pages": item["translated_text"],
+                    "page_info": {**info, **item["provenance"]}
+                }, keep_existing=("edited_pages",))
+                # Edited text is indexed only once a reviewer changes it
+                index_page_text(session_id, item["page_num"] + 1, {
+                    "extracted_pages": item["raw_text"],
+                    "translated_pages": item["translated_text"]
+                })
                 
-                # Add small delay to avoid overwhelming resources
-                time.sleep(0.1)
+                # Pages finish out of order, so progress counts completed pages
+                processed = session_store.increment(session_id, "processed_pages")
+                session_store.update(session_id, {
+                    "message": f"Processed {processed} of {total_pages} pages",
+                    "progress": 0.1 + (0.7 * (processed / total_pages)),
+                    "current_stage": "ocr_translation",
+                    "processing_timings": timer.snapshot()
+                })
+            
+            pipeline = Pipeline(
+                [
+                    ("ocr", ocr_stage, OCR_WORKERS),
+                    ("translate", translate_stage, TRANSLATE_WORKERS),
+                ],
+                queue_size=PIPELINE_QUEUE_SIZE,
+                monitor=lambda stage, depth: metrics.observe("pipeline_queue_depth", depth, {"stage": stage}, DEPTH_BUCKETS)
+            )
+            pipeline.run(render_pages(), publish, source_name="render")
         
         # Update status
-        processing_status[session_id].update({
+        session_store.update(session_id, {
             "message": "OCR and translation completed",
             "progress": 0.8,
             "current_stage": "completed",
-            "processed_pages": total_pages,
-            "extracted_pages": extracted_pages,
-            "translated_pages": translated_pages,
-            "edited_pages": {k: v for k, v in translated_pages.items()},
-            "pdf_images": pdf_images
+            "processed_pages": total_pages
         })
         
+        extracted_pages = session_store.get_pages(session_id, "extracted_pages")
+        translated_pages = session_store.get_pages(session_id, "translated_pages")
+        image_paths = session_store.get_pages(session_id, "image_paths")
+        
         # Save results to files for persistence
         with open(os.path.join(session_dir, "extracted_pages.json"), "w", encoding="utf-8") as f:
             json.dump(extracted_pages, f, ensure_ascii=False, indent=2)
@@ -378,219 +988,392 @@ def process_pdf(session_id: str, file_path: str, background_tasks: BackgroundTas
         with open(os.path.join(session_dir, "translated_pages.json"), "w", encoding="utf-8") as f:
             json.dump(translated_pages, f, ensure_ascii=False, indent=2)
             
-        with open(os.path.join(session_dir, "pdf_images.json"), "w", encoding="utf-8") as f:
-            json.dump(pdf_images, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(session_dir, "image_paths.json"), "w", encoding="utf-8") as f:
+            json.dump(image_paths, f, ensure_ascii=False, indent=2)
         
         # Final update
-        processing_status[session_id].update({
+        session_store.update(session_id, {
             "status": "ready_for_review",
             "message": "PDF processing complete! Ready for quality review.",
             "progress": 1.0,
-            "current_stage": "waiting_for_review"
+            "current_stage": "waiting_for_review",
+            "processing_timings": timer.snapshot()
         })
         
     except Exception as e:
+        if cancel_requested(session_id):
+            mark_cancelled(session_id)
+            return
+        
         # Update status on error
-        processing_status[session_id].update({
+        session_store.update(session_id, {
             "status": "error",
             "message": f"Error processing PDF: {str(e)}",
             "progress": 0,
-            "current_stage": "error"
+            "current_stage": "error",
+            "processing_timings": timer.snapshot()
         })
+    finally:
+        heartbeat.set()
+        metrics.flush()
+        if trace is not None:
+            trace.flush()
 
 
         
 def generate_report(session_id: str, client_name: Optional[str] = None):
     """Generate final report using WatsonX AI"""
+    heartbeat = start_heartbeat(session_id)
+    trace = session_trace(session_id)
+    timer = StageTimer(metrics, "report", trace=trace)
     try:
         # Update status
-        processing_status[session_id].update({
+        session_store.update(session_id, {
             "status": "generating_report",
             "message": "Starting report generation",
             "progress": 0.0,
-            "current_stage": "starting_report"
+            "current_stage": "starting_report",
+            "client_name": client_name,
+            "partial_report": "",
+            "report_timings": {}
         })
 
-        session_dir = os.path.join("temp", session_id)
-        output_dir = os.path.join("outputs", session_id)
-        os.makedirs(output_dir, exist_ok=True)
-
         # Get edited pages
-        edited_pages = processing_status[session_id]["edited_pages"]
+        with timer.stage("load_pages"):
+            edited_pages = report_pages(session_id)
 
-        # Get IBM WatsonX token
-        processing_status[session_id].update({
+        # Get IBM WatsonX token, so bad credentials fail the job instead of every chunk
+        session_store.update(session_id, {
             "message": "Getting IBM WatsonX token",
             "progress": 0.1,
-            "current_stage": "getting_token"
+            "current_stage": "getting_token",
+            "report_timings": timer.snapshot()
         })
+        with timer.stage("watsonx_token"):
+            watsonx_client.access_token()
 
-        token = get_ibm_access_token(API_KEY)
-
-        # Chunk text for processing
-        text_chunks = chunk_text(edited_pages, chunk_size=90)
-        watsonx_outputs = []
-
-        for i, chunk in enumerate(text_chunks):
-            processing_status[session_id].update({
-                "message": f"Processing chunk {i+1} of {len(text_chunks)}",
-                "progress": 0.2 + (0.6 * (i / len(text_chunks))),
-                "current_stage": "processing_chunks"
-            })
-
-            combined_text = "\n".join(chunk.values())
-            result = send_chunk_to_watsonx(combined_text, token)
-            watsonx_outputs.append(result)
-
-        final_output = "\n\n".join(watsonx_outputs)
+        # Outputs of chunks that did not change since the last report are reused
+        memo = OutputMemo(session_store, session_id, WATSONX_MODEL_ID)
+        final_output = write_report(session_id, edited_pages, client_name, memo, timer)
+        memo.finish()
 
         if client_name:
             final_output = final_output.replace("[Client Name]", client_name)
 
         # Save Markdown output
-        markdown_path = os.path.join(output_dir, "report.md")
-        with open(markdown_path, "w", encoding="utf-8") as f:
-            f.write(final_output)
+        with timer.stage("markdown_write"):
+            markdown_path = report_markdown_path(final_output, REPORT_CACHE_DIR)
 
         # Update before DOCX step
-        processing_status[session_id].update({
+        session_store.update(session_id, {
             "message": "Generating Word document",
             "progress": 0.9,
-            "current_stage": "generating_docx"
+            "current_stage": "generating_docx",
+            "report_timings": timer.snapshot()
         })
 
-        # Multiple approaches for DOCX conversion
-        docx_path = os.path.join(output_dir, "report.docx")
-        conversion_successful = False
-
-        # Approach 1: Pypandoc
+        # Render the DOCX now so downloads are served from disk
+        docx_path = None
         try:
-            # Ensure pandoc is available
-            try:
-                pypandoc.download_pandoc()
-            except:
-                pass
-
-            pypandoc.convert_file(
-                markdown_path,
-                'docx',
-                outputfile=docx_path,
-                extra_args=['--standalone', '--wrap=preserve']
-            )
-            
-            if os.path.exists(docx_path) and os.path.getsize(docx_path) > 0:
-                conversion_successful = True
-        except Exception as pandoc_error:
-            print(f"Pypandoc conversion failed: {pandoc_error}")
-
-        # Approach 2: python-docx if Pypandoc fails
-        if not conversion_successful:
-            try:
-                from docx import Document
-                from docx.shared import Pt
-                
-                # Create a new Document
-                doc = Document()
-                
-                # Set default font and size
-                style = doc.styles['Normal']
-                font = style.font
-                font.name = 'Calibri'
-                font.size = Pt(11)
-                
-                # Read markdown and convert to docx
-                with open(markdown_path, 'r', encoding='utf-8') as md_file:
-                    lines = md_file.readlines()
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('# '):
-                        # Heading 1
-                        doc.add_heading(line[2:], level=1)
-                    elif line.startswith('## '):
-                        # Heading 2
-                        doc.add_heading(line[3:], level=2)
-                    elif line.startswith('### '):
-                        # Heading 3
-                        doc.add_heading(line[4:], level=3)
-                    elif line.startswith('| '):
-                        # Table handling (basic)
-                        # You might want to enhance this for more complex tables
-                        cells = line.strip('|').split('|')
-                        table = doc.add_table(rows=1, cols=len(cells))
-                        row = table.rows[0]
-                        for i, cell in enumerate(cells):
-                            row.cells[i].text = cell.strip()
-                    else:
-                        # Regular paragraph
-                        if line:
-                            doc.add_paragraph(line)
-                
-                # Save the document
-                doc.save(docx_path)
-                
-                if os.path.exists(docx_path) and os.path.getsize(docx_path) > 0:
-                    conversion_successful = True
-            except ImportError:
-                print("python-docx not installed")
-            except Exception as docx_error:
-                print(f"python-docx conversion failed: {docx_error}")
-
-        # Approach 3: Fallback plain text
-        if not conversion_successful:
-            try:
-                with open(docx_path.replace('.docx', '.txt'), 'w', encoding='utf-8') as f:
-                    f.write(final_output)
-                print("Fallback to plain text conversion")
-            except Exception as text_error:
-                print(f"Text conversion failed: {text_error}")
+            with timer.stage("docx_render"):
+                docx_path = report_docx_path(final_output, REPORT_CACHE_DIR)
+            conversion_successful = True
+        except Exception as docx_error:
+            print(f"DOCX rendering failed: {docx_error}")
+            conversion_successful = False
 
         # Update status
-        processing_status[session_id].update({
+        session_store.update(session_id, {
             "status": "completed" if conversion_successful else "completed_with_warning",
             "message": "Report generation complete!" if conversion_successful else "Report generated with conversion issues",
             "progress": 1.0,
             "current_stage": "completed",
             "final_output": final_output,
             "markdown_path": markdown_path,
-            "docx_path": docx_path if conversion_successful else None
+            "docx_path": docx_path,
+            "report_hash": content_hash(final_output),
+            "llm_calls": memo.stats(),
+            "report_timings": timer.snapshot()
         })
 
     except Exception as e:
-        processing_status[session_id].update({
+        if cancel_requested(session_id):
+            mark_cancelled(session_id)
+            return
+        
+        session_store.update(session_id, {
             "status": "error",
             "message": f"Error generating report: {str(e)}",
             "progress": 0,
-            "current_stage": "error"
+            "current_stage": "error",
+            "report_timings": timer.snapshot()
         })
+    finally:
+        heartbeat.set()
+        metrics.flush()
+        if trace is not None:
+            trace.flush()
 
 
-@app.post("/upload", response_model=ProcessingResponse)
-async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Upload PDF file for processing"""
-    # Generate unique session ID
+def pdf_page_count(file_path: str) -> int:
+    """Number of pages in a PDF, or 0 if it cannot be opened"""
+    try:
+        with fitz.open(file_path) as doc:
+            return len(doc) if doc.is_pdf else 0
+    except Exception:
+        return 0
+
+def find_processed_session(content_hash: str, profile: str) -> Optional[str]:
+    """A session that already processed identical content with the same profile"""
+    for session_id in session_store.find("content_hash", content_hash):
+        fields = session_store.get(session_id, ["status", "preprocess_profile"]) or {}
+        if fields.get("preprocess_profile") == profile and fields.get("status") in (
+                "ready_for_review", "completed", "completed_with_warning"):
+            return session_id
+    return None
+
+def clone_processed_session(source_id: str, session_id: str, file_path: str, profile: str):
+    """New session reusing the processing results of source_id, ready for a fresh review"""
+    total_pages = (session_store.get(source_id, ["total_pages"]) or {}).get("total_pages", 0)
+    create_processing_session(session_id, file_path, profile)
+    kinds = ("image_paths", "extracted_pages", "translated_pages", "page_info")
+    pages = {kind: session_store.get_pages(source_id, kind) for kind in kinds}
+    for key in pages["extracted_pages"]:
+        values = {kind: pages[kind][key] for kind in kinds if key in pages[kind]}
+        values["edited_pages"] = values.get("translated_pages", "")
+        session_store.set_page(session_id, page_number_of(key), values)
+    index_session_text(session_id)
+    session_store.update(session_id, {
+        "status": "ready_for_review",
+        "message": "Identical document was already processed; results reused. Ready for quality review.",
+        "progress": 1.0,
+        "current_stage": "waiting_for_review",
+        "total_pages": total_pages,
+        "processed_pages": total_pages,
+        "reused_from": source_id
+    })
+
+def start_uploaded_pdf(file_path: str, filename: str, content_hash: str, profile: str,
+                       trace: bool = False) -> Dict[str, Any]:
+    """Validate a stored upload and start processing it, or reuse an identical earlier session"""
+    page_count = pdf_page_count(file_path)
+    if page_count == 0:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail=f"{filename} is not a readable PDF")
+    if page_count > UPLOAD_MAX_PAGES:
+        os.remove(file_path)
+        raise HTTPException(status_code=413, detail=f"{filename} has {page_count} pages; the limit is {UPLOAD_MAX_PAGES}")
+    
     session_id = str(uuid.uuid4())
     
-    # Create file path
-    file_path = os.path.join("uploads", f"{session_id}_{file.filename}")
+    # Identical content was already processed; skip straight to review
+    source_id = find_processed_session(content_hash, profile)
+    if source_id:
+        clone_processed_session(source_id, session_id, file_path, profile)
+        session_store.update(session_id, {"content_hash": content_hash, "trace": trace})
+        return {"session_id": session_id, "message": "Identical document already processed. Results reused.", "reused_from": source_id}
     
-    # Save uploaded file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Register the session so /status works before processing starts
+    create_processing_session(session_id, file_path, profile)
+    session_store.update(session_id, {"content_hash": content_hash, "total_pages": page_count, "trace": trace})
     
-    # Start processing in background
-    background_tasks.add_task(process_pdf, session_id, file_path, background_tasks)
+    # Hand processing to the job workers
+    try:
+        enqueue_job(session_id, "process_pdf", {"file_path": file_path, "profile": profile})
+    except HTTPException:
+        session_store.update(session_id, {"status": "error", "message": "Server is busy, please upload again later", "current_stage": "error"})
+        raise
     
     return {"session_id": session_id, "message": "PDF upload successful. Processing started."}
 
-@app.get("/status/{session_id}", response_model=ProcessingStatus)
-async def get_status(session_id: str):
-    """Get current processing status"""
-    if session_id not in processing_status:
-        raise HTTPException(status_code=404, detail="Processing session not found")
+def check_upload_admission(profile: str):
+    """Reject an upload early, before storing the file, if it cannot be processed"""
+    if profile not in PROFILE_CHOICES:
+        raise HTTPException(status_code=400, detail=f"Invalid preprocessing profile. Choose one of: {', '.join(PROFILE_CHOICES)}")
+    
+    if job_queue.depth()["queued"] >= JOB_QUEUE_MAX:
+        raise HTTPException(status_code=503, detail="Server is busy, please try again in a few minutes", headers={"Retry-After": "60"})
+
+@app.post("/upload", response_model=ProcessingResponse)
+def upload_pdf(file: UploadFile = File(...), profile: str = Form("auto"), trace: bool = Form(False)):
+    """Upload PDF file for processing; trace records spans of its jobs for /trace"""
+    check_upload_admission(profile)
     
-    status_data = processing_status[session_id]
+    # Stream the upload to disk, hashing it on the way
+    file_path = os.path.join("uploads", f"{uuid.uuid4()}_{os.path.basename(file.filename or 'upload.pdf')}")
+    try:
+        _, content_hash = save_stream(file.file, file_path, UPLOAD_MAX_MB * 1024 * 1024)
+    except UploadError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    return start_uploaded_pdf(file_path, file.filename, content_hash, profile, trace)
+
+@app.post("/uploads", response_model=dict)
+def create_upload(data: UploadCreateRequest):
+    """Start a resumable upload; send the file in parts with PUT /uploads/{upload_id}"""
+    try:
+        return chunked_uploads.create(data.filename, data.size, data.sha256)
+    except UploadError as e:
+        raise HTTPException(status_code=413 if data.size > 0 else 400, detail=str(e))
+
+@app.get("/uploads/{upload_id}", response_model=dict)
+def get_upload(upload_id: str):
+    """Progress of a resumable upload; a client resumes from the returned offset"""
+    try:
+        return chunked_uploads.status(upload_id)
+    except (KeyError, UploadError):
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+@app.put("/uploads/{upload_id}", response_model=dict)
+async def upload_part(request: Request, upload_id: str, offset: int):
+    """Append one part of a resumable upload, starting at offset"""
+    max_part = 2 * UPLOAD_CHUNK_MB * 1024 * 1024
+    too_large = HTTPException(status_code=413, detail=f"Parts may be at most {2 * UPLOAD_CHUNK_MB} MB")
+    if int(request.headers.get("content-length") or 0) > max_part:
+        raise too_large
+    # Read the body as it arrives so an oversized part is refused before it is all in memory
+    blocks, size = [], 0
+    async for block in request.stream():
+        size += len(block)
+        if size > max_part:
+            raise too_large
+        blocks.append(block)
+    data = b"".join(blocks)
+    try:
+        new_offset = await asyncio.to_thread(chunked_uploads.append, upload_id, offset, data)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadError as e:
+        # The client resends from the offset in the current status
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"upload_id": upload_id, "offset": new_offset}
+
+@app.post("/uploads/{upload_id}/complete", response_model=ProcessingResponse)
+def complete_upload(upload_id: str, profile: str = Form("auto"), trace: bool = Form(False)):
+    """Finish a resumable upload and start processing the PDF"""
+    check_upload_admission(profile)
+    try:
+        file_path, filename, content_hash = chunked_uploads.complete(
+            upload_id, os.path.join("uploads", f"{uuid.uuid4()}_{upload_id}.pdf")
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return start_uploaded_pdf(file_path, filename, content_hash, profile, trace)
+
+def save_bulk_upload(session_id: str, files: List[UploadFile]):
+    """Store the PDFs of a bulk upload, unpacking ZIP archives.
+
+    Returns the documents, in upload order with ZIP members sorted by
+    name, and the names of files that were not readable PDFs. Every file
+    and ZIP member is held to the same size and page limits as /upload,
+    and the upload as a whole to BULK_MAX_MB and UPLOAD_MAX_PAGES.
+    """
+    upload_dir = os.path.join("uploads", session_id)
+    os.makedirs(upload_dir, exist_ok=True)
+    documents = []
+    skipped = []
+    file_limit = UPLOAD_MAX_MB * 1024 * 1024
+    remaining = [BULK_MAX_MB * 1024 * 1024]
+    
+    def store(name, source, path, counted=True):
+        """Stream one file to disk within the per-file and, if counted, the whole-upload size limits"""
+        limit = min(file_limit, remaining[0]) if counted else file_limit
+        try:
+            size, _ = save_stream(source, path, limit)
+        except UploadError as e:
+            if limit < file_limit:
+                raise HTTPException(status_code=413, detail=f"A bulk upload may contain at most {BULK_MAX_MB} MB of PDFs")
+            raise HTTPException(status_code=413, detail=f"{name}: {e}")
+        if counted:
+            remaining[0] -= size
+    
+    def add(name, source):
+        if len(documents) >= BULK_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"A bulk upload may contain at most {BULK_MAX_FILES} PDFs")
+        # Stored under a generated name, so archive paths cannot escape the upload directory
+        safe_name = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in os.path.basename(name))
+        path = os.path.join(upload_dir, f"{len(documents):04d}_{safe_name}")
+        store(name, source, path)
+        page_count = pdf_page_count(path)
+        if page_count == 0:
+            os.remove(path)
+            skipped.append(name)
+            return
+        if page_count > UPLOAD_MAX_PAGES:
+            raise HTTPException(status_code=413, detail=f"{name} has {page_count} pages; the limit is {UPLOAD_MAX_PAGES}")
+        # All documents are processed as one session
+        total_pages = sum(d["page_count"] for d in documents) + page_count
+        if total_pages > UPLOAD_MAX_PAGES:
+            raise HTTPException(status_code=413, detail=f"A bulk upload may contain at most {UPLOAD_MAX_PAGES} pages in total")
+        documents.append({"filename": name, "file_path": path, "page_count": page_count})
+    
+    for upload in files:
+        name = upload.filename or "upload.pdf"
+        if not name.lower().endswith(".zip"):
+            add(name, upload.file)
+            continue
+        
+        # The archive itself only needs to fit the per-file limit; what it unpacks to is counted
+        archive_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.zip")
+        store(name, upload.file, archive_path, counted=False)
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                members = sorted(archive.infolist(), key=lambda m: m.filename)
+                for member in members:
+                    if member.is_dir() or member.filename.startswith("__MACOSX/"):
+                        continue
+                    if not member.filename.lower().endswith(".pdf"):
+                        skipped.append(f"{name}/{member.filename}")
+                        continue
+                    # Declared sizes can lie, so store() still enforces the limits while unpacking
+                    if member.file_size > min(file_limit, remaining[0]):
+                        raise HTTPException(status_code=413, detail=f"{name}/{member.filename} is larger than the upload limits allow")
+                    with archive.open(member) as source:
+                        add(f"{name}/{member.filename}", source)
+        except zipfile.BadZipFile:
+            skipped.append(name)
+        finally:
+            os.remove(archive_path)
+    
+    return documents, skipped
+
+@app.post("/upload/bulk", response_model=BulkUploadResponse)
+def upload_bulk(files: List[UploadFile] = File(...), profile: str = Form("auto"), trace: bool = Form(False)):
+    """Upload many PDFs, or ZIP archives of PDFs, as one session"""
+    check_upload_admission(profile)
+    
+    session_id = str(uuid.uuid4())
+    try:
+        documents, skipped = save_bulk_upload(session_id, files)
+    except HTTPException:
+        shutil.rmtree(os.path.join("uploads", session_id), ignore_errors=True)
+        raise
+    if not documents:
+        shutil.rmtree(os.path.join("uploads", session_id), ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No readable PDF files were uploaded")
+    
+    # All documents go through one processing job, so their pages share the pipeline
+    create_processing_session(session_id, None, profile, documents)
+    session_store.update(session_id, {"trace": trace})
+    try:
+        enqueue_job(session_id, "process_pdf", {"file_path": None, "profile": profile})
+    except HTTPException:
+        session_store.update(session_id, {"status": "error", "message": "Server is busy, please upload again later", "current_stage": "error"})
+        raise
     
+    return {
+        "session_id": session_id,
+        "message": f"{len(documents)} PDFs uploaded. Processing started.",
+        "documents": [{"filename": d["filename"], "page_count": d["page_count"]} for d in documents],
+        "skipped": skipped,
+        "total_pages": sum(d["page_count"] for d in documents)
+    }
+
+def status_payload(session_id: str, status_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Progress fields shared by /status and the event stream"""
     return {
         "session_id": session_id,
         "status": status_data.get("status", "unknown"),
@@ -599,218 +1382,509 @@ async def get_status(session_id: str):
         "current_stage": status_data.get("current_stage", "unknown"),
         "total_pages": status_data.get("total_pages", 0),
         "processed_pages": status_data.get("processed_pages", 0),
+        "queue_position": job_queue.position(session_id) if status_data.get("status") == "queued" else None,
+        "stage_timings": {
+            "processing": status_data.get("processing_timings") or {},
+            "report": status_data.get("report_timings") or {}
+        }
+    }
+
+@app.get("/status/{session_id}", response_model=ProcessingStatus)
+def get_status(session_id: str, include_report: bool = True):
+    """Get current processing status"""
+    keys = STATUS_FIELDS + ["final_output"] if include_report else STATUS_FIELDS
+    status_data = session_store.get(session_id, keys)
+    if status_data is None:
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    
+    return {
+        **status_payload(session_id, status_data),
         "final_output": status_data.get("final_output", None)  # Include the final report content
     }
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def read_session_events(session_id: str, last_version: Any):
+    """Session state the event stream sends, or None if unchanged since last_version"""
+    version = session_store.version(session_id)
+    if version == last_version:
+        return version, None
+    payload = status_payload(session_id, session_store.get(session_id, STATUS_FIELDS) or {})
+    state = {"payload": payload, "pages": session_store.page_numbers(session_id, "extracted_pages")}
+    if payload["status"] == "generating_report":
+        state["partial_report"] = (session_store.get(session_id, ["partial_report"]) or {}).get("partial_report") or ""
+    if payload["status"] in ("completed", "completed_with_warning"):
+        state["final_output"] = (session_store.get(session_id, ["final_output"]) or {}).get("final_output")
+    return version, state
+
+async def status_events(request: Request, session_id: str):
+    """Yield progress, page and report events as the session changes"""
+    last_version = None
+    last_payload = None
+    sent_pages = set()
+    sent_report = 0
+    last_sent = time.monotonic()
+    
+    while not await request.is_disconnected():
+        # Store reads block, so they run off the event loop
+        version, state = await asyncio.to_thread(read_session_events, session_id, last_version)
+        if state is not None:
+            last_version = version
+            payload = state["payload"]
+            
+            for page_number in state["pages"]:
+                if page_number not in sent_pages:
+                    sent_pages.add(page_number)
+                    yield sse_event("page", {"page_number": page_number})
+                    last_sent = time.monotonic()
+            
+            # Report text streamed so far; offset 0 means the client should start over
+            if payload["status"] == "generating_report":
+                partial = state["partial_report"]
+                if len(partial) < sent_report:
+                    sent_report = 0
+                if len(partial) > sent_report:
+                    yield sse_event("report_delta", {"offset": sent_report, "text": partial[sent_report:]})
+                    sent_report = len(partial)
+                    last_sent = time.monotonic()
+            
+            # The report body is large, so it is sent once, when it is final
+            if payload["status"] in ("completed", "completed_with_warning"):
+                yield sse_event("report", {"final_output": state["final_output"]})
+            
+            if payload != last_payload:
+                last_payload = payload
+                yield sse_event("progress", payload)
+                last_sent = time.monotonic()
+            
+            if payload["status"] in ("completed", "completed_with_warning", "error", "cancelled"):
+                return
+        elif time.monotonic() - last_sent > 15:
+            # Comment line keeps proxies from closing an idle stream
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+@app.get("/events/{session_id}")
+def stream_status(request: Request, session_id: str):
+    """Stream status changes as server-sent events"""
+    if not session_store.exists(session_id):
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    
+    return StreamingResponse(
+        status_events(request, session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/report/{session_id}")
+def get_partial_report(session_id: str, offset: int = 0):
+    """Report Markdown written so far, from offset onwards"""
+    report_data = session_store.get(session_id, ["status", "partial_report", "final_output"])
+    if report_data is None:
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    
+    complete = report_data.get("status") in ("completed", "completed_with_warning")
+    text = (report_data.get("final_output") if complete else None) or report_data.get("partial_report") or ""
+    # The stream restarted, or the final report differs; send everything again
+    reset = offset > len(text)
+    if reset:
+        offset = 0
+    
+    return {
+        "session_id": session_id,
+        "status": report_data.get("status", "unknown"),
+        "offset": offset,
+        "text": text[offset:],
+        "length": len(text),
+        "reset": reset,
+        "complete": complete
+    }
+
+@app.get("/pages/{session_id}")
+def get_page_range(request: Request, session_id: str, start: int = 1, end: Optional[int] = None,
+                   fields: Optional[str] = None):
+    """Get data for pages start to end in one response.
+
+    fields is a comma-separated subset of raw_text, translated_text,
+    edited_text, image (URLs of the full image and its reduced sizes) and
+    info; all of them by default. Pages that are still processing are
+    left out. The response carries an ETag, so a client refreshing a
+    window of pages gets 304 Not Modified until one of them changes.
+    """
+    status_data = session_store.get(session_id, ["total_pages"])
+    if status_data is None:
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(PAGE_FIELDS)
+    unknown = [f for f in selected if f not in PAGE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(PAGE_FIELDS)}")
+    
+    if end is None:
+        end = start + PAGE_RANGE_DEFAULT - 1
+    if start < 1 or end < start:
+        raise HTTPException(status_code=400, detail="Invalid page range")
+    if end - start + 1 > PAGE_RANGE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PAGE_RANGE_MAX} pages can be requested at once")
+    
+    # A page exists once its extracted text is published
+    kinds = {PAGE_FIELDS[f] for f in selected} | {"extracted_pages"}
+    pages = []
+    for number, values in session_store.get_page_range(session_id, kinds, start, end).items():
+        if "extracted_pages" not in values:
+            continue
+        page = {"page_number": number}
+        for field in selected:
+            if field == "image":
+                url = f"/image/{session_id}/{number}"
+                page["image"] = {"url": url, **{size: f"{url}?size={size}" for size in IMAGE_SIZES}} if values.get("image_paths") else None
+            elif field == "info":
+                page["info"] = values.get("page_info") or {}
+            else:
+                page[field] = values.get(PAGE_FIELDS[field]) or ""
+        pages.append(page)
+    
+    total_pages = status_data.get("total_pages") or 0
+    content = json.dumps({
+        "session_id": session_id,
+        "start": start,
+        "end": end,
+        "total_pages": total_pages,
+        "pages": pages,
+        "next_start": end + 1 if end < total_pages else None
+    }, ensure_ascii=False)
+    
+    etag = f'"{hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    # Only the ETag decides; the data has no meaningful modification time
+    if not_modified(request, etag, time.time()):
+        return Response(status_code=304, headers=headers)
+    return Response(content, media_type="application/json", headers=headers)
+
+@app.get("/search")
+def search_pages(q: str, session_id: Optional[str] = None, kinds: Optional[str] = None,
+                 limit: int = 20, offset: int = 0):
+    """Search page text across sessions.
+
+    Every word must appear on a page; "quoted phrases" match exactly and a
+    trailing * matches word prefixes. kinds is a comma-separated subset of
+    extracted, translated and edited. Hits are pages, best first, with a
+    snippet of each kind of text that matched.
+    """
+    started = time.perf_counter()
+    selected = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+    unknown = [k for k in selected or [] if k not in SEARCH_KINDS.values()]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kinds: {', '.join(unknown)}. Choose from: {', '.join(SEARCH_KINDS.values())}")
+    if not 1 <= limit <= SEARCH_LIMIT_MAX or offset < 0:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SEARCH_LIMIT_MAX}")
+    
+    try:
+        hits = search_index.search(q, session_id=session_id, kinds=selected, limit=limit, offset=offset)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+    
+    # Which document of the session each page came from
+    for hit in hits:
+        info = session_store.get_page(hit["session_id"], "page_info", hit["page_number"]) or {}
+        hit["document"] = info.get("document")
+        hit["document_page"] = info.get("document_page")
+    
+    metrics.observe("stage_seconds", time.perf_counter() - started, {"job": "search", "stage": "query"})
+    return {
+        "query": q,
+        "hits": hits,
+        "offset": offset,
+        "next_offset": offset + limit if len(hits) == limit else None,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
 @app.get("/pages/{session_id}/{page_number}", response_model=PageData)
-async def get_page_data(session_id: str, page_number: int):
+def get_page_data(session_id: str, page_number: int):
     """Get data for a specific page"""
-    if session_id not in processing_status:
+    if not session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Processing session not found")
     
-    status_data = processing_status[session_id]
-    page_key = f"Page {page_number}"
+    raw_text = session_store.get_page(session_id, "extracted_pages", page_number)
     
-    if page_key not in status_data.get("extracted_pages", {}):
+    if raw_text is None:
         raise HTTPException(status_code=404, detail=f"Page {page_number} not found")
     
+    info = session_store.get_page(session_id, "page_info", page_number) or {}
     return {
         "page_number": page_number,
-        "raw_text": status_data["extracted_pages"].get(page_key, ""),
-        "translated_text": status_data["translated_pages"].get(page_key, "")
+        "raw_text": raw_text,
+        "translated_text": session_store.get_page(session_id, "translated_pages", page_number) or "",
+        "content": info.get("content", "text")
     }
 
 @app.get("/image/{session_id}/{page_number}")
-async def get_page_image(session_id: str, page_number: int):
+def get_page_image(request: Request, session_id: str, page_number: int, size: str = "full"):
     """Get image for a specific page"""
-    if session_id not in processing_status:
+    if not session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Processing session not found")
     
-    status_data = processing_status[session_id]
+    if size != "full" and size not in IMAGE_SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid size. Choose one of: full, {', '.join(IMAGE_SIZES)}")
+    
+    image_path = session_store.get_page(session_id, "image_paths", page_number)
     
-    if int(page_number)-1 not in status_data.get("pdf_images", {}):
+    if not image_path or not os.path.exists(image_path):
         raise HTTPException(status_code=404, detail=f"Image for page {page_number} not found")
     
-    # Return base64 encoded image
-    return {"image": status_data["pdf_images"].get(int(page_number)-1, "")}
+    # Stream the file from disk; reduced sizes are generated once and cached
+    return image_response(request, image_path, size)
 
 @app.put("/update-page/{session_id}", response_model=dict)
-async def update_page_text(session_id: str, data: PageUpdateRequest):
+def update_page_text(session_id: str, data: PageUpdateRequest):
     """Update edited text for a page"""
-    if session_id not in processing_status:
+    if not session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Processing session not found")
     
-    page_key = f"Page {data.page_number}"
-    processing_status[session_id]["edited_pages"][page_key] = data.edited_text
+    session_store.set_page(session_id, data.page_number, {"edited_pages": data.edited_text})
+    translated = session_store.get_page(session_id, "translated_pages", data.page_number)
+    index_page_text(session_id, data.page_number, {
+        "edited_pages": data.edited_text if data.edited_text != translated else None
+    })
     
     # Save updated edited pages
     session_dir = os.path.join("temp", session_id)
+    os.makedirs(session_dir, exist_ok=True)
     with open(os.path.join(session_dir, "edited_pages.json"), "w", encoding="utf-8") as f:
-        json.dump(processing_status[session_id]["edited_pages"], f, ensure_ascii=False, indent=2)
+        json.dump(session_store.get_pages(session_id, "edited_pages"), f, ensure_ascii=False, indent=2)
     
     return {"status": "success", "message": f"Page {data.page_number} updated successfully"}
 
 @app.post("/generate-report/{session_id}", response_model=dict)
-async def start_report_generation(data: ReportRequest, background_tasks: BackgroundTasks):
+def start_report_generation(data: ReportRequest):
     """Start report generation process"""
     session_id = data.session_id
     
-    if session_id not in processing_status:
+    status_data = session_store.get(session_id, ["status"])
+    if status_data is None:
         raise HTTPException(status_code=404, detail="Processing session not found")
     
-    # Start report generation in background
-    background_tasks.add_task(generate_report, session_id, data.client_name)
+    if status_data.get("status") in ("queued", "processing", "generating_report"):
+        raise HTTPException(status_code=409, detail="This session already has a job in progress")
+    
+    # Queue report generation ahead of any waiting OCR jobs
+    enqueue_job(session_id, "generate_report", {"client_name": data.client_name})
     
     return {"status": "success", "message": "Report generation started"}
 
+@app.post("/cancel/{session_id}", response_model=dict)
+def cancel_session(session_id: str):
+    """Cancel a queued or running job"""
+    status_data = session_store.get(session_id, ["status"])
+    if status_data is None:
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    
+    if job_queue.cancel(session_id):
+        mark_cancelled(session_id)
+        return {"status": "success", "message": "Queued job cancelled"}
+    
+    if status_data.get("status") in ("processing", "generating_report"):
+        # The worker checks this flag between pages and chunks
+        session_store.update(session_id, {"cancel_requested": True, "message": "Cancelling..."})
+        return {"status": "success", "message": "Cancellation requested"}
+    
+    raise HTTPException(status_code=409, detail="Nothing to cancel for this session")
+
+@app.get("/jobs/stats", response_model=dict)
+def get_job_stats():
+    """Get job queue depth"""
+    return {**job_queue.depth(), "max_queued": JOB_QUEUE_MAX, "workers": JOB_WORKERS}
+
 @app.get("/download/{session_id}/{file_type}")
-async def download_file(session_id: str, file_type: str):
+def download_file(request: Request, session_id: str, file_type: str):
     """Download generated report file"""
-    if session_id not in processing_status:
+    status_data = session_store.get(session_id, ["final_output"])
+    if status_data is None:
         raise HTTPException(status_code=404, detail="Processing session not found")
     
-    status_data = processing_status[session_id]
+    if file_type not in ("markdown", "docx"):
+        raise HTTPException(status_code=400, detail="Invalid file type requested")
     
-    if file_type == "markdown":
-        # Get the final output directly from status data
-        final_output = status_data.get("final_output")
-        if not final_output:
-            raise HTTPException(status_code=404, detail="No markdown content available")
-        
-        # Create a temporary file to store the markdown content
-        temp_dir = os.path.join("temp", session_id)
-        os.makedirs(temp_dir, exist_ok=True)
-        markdown_path = os.path.join(temp_dir, "report.md")
-        
-        # Write the content to the file
-        with open(markdown_path, 'w', encoding='utf-8') as f:
-            f.write(final_output)
-        
-        # Update the status with the markdown path
-        status_data["markdown_path"] = markdown_path
-        
-        # Return the file
-        return FileResponse(
-            path=markdown_path,
-            media_type="text/markdown",
-            filename="report.md",
-            content_disposition_type="attachment"
-        )
-        
-    elif file_type == "docx":
-        # First ensure we have the markdown content
-        final_output = status_data.get("final_output")
-        if not final_output:
-            raise HTTPException(status_code=404, detail="No content available for conversion")
-        
-        # Create output directory
-        output_dir = os.path.join("outputs", session_id)
-        os.makedirs(output_dir, exist_ok=True)
-        docx_path = os.path.join(output_dir, "report.docx")
-        
-        try:
-            # Ensure pandoc is available
-            try:
-                pypandoc.download_pandoc()
-            except:
-                pass
-            
-            # Create a temporary markdown file
-            temp_dir = os.path.join("temp", session_id)
-            os.makedirs(temp_dir, exist_ok=True)
-            temp_md_path = os.path.join(temp_dir, "temp_report.md")
-            
-            # Write the content to temporary markdown file
-            with open(temp_md_path, 'w', encoding='utf-8') as f:
-                f.write(final_output)
-            
-            # Convert markdown to DOCX with improved formatting
-            pypandoc.convert_file(
-                temp_md_path,
-                'docx',
-                outputfile=docx_path,
-                extra_args=[
-                    '--standalone',
-                    '--toc',
-                    '--toc-depth=3',
-                    '--highlight-style=tango',
-                    '--wrap=none',
-                    '--dpi=300',
-                    '--reference-doc=template.docx'  # Optional: use a template if available
-                ]
-            )
-            
-            # Update the status
-            status_data["docx_path"] = docx_path
+    final_output = status_data.get("final_output")
+    if not final_output:
+        raise HTTPException(status_code=404, detail="No report content available")
+    
+    # Files are named by content hash, so they are only rendered when the report text changes
+    extension = "md" if file_type == "markdown" else "docx"
+    cached = os.path.exists(os.path.join(REPORT_CACHE_DIR, f"{content_hash(final_output)}.{extension}"))
+    try:
+        with metrics.timer("stage_seconds", {"job": "download", "stage": file_type}):
+            if file_type == "markdown":
+                path = report_markdown_path(final_output, REPORT_CACHE_DIR)
+                media_type, filename = "text/markdown", "report.md"
+            else:
+                path = report_docx_path(final_output, REPORT_CACHE_DIR)
+                media_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                filename = "report.docx"
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate {file_type}: {str(e)}")
+    metrics.inc("downloads_total", {"type": file_type, "cached": str(cached).lower()})
+    
+    etag = f'"{content_hash(final_output)[:32]}-{file_type}"'
+    last_modified = os.path.getmtime(path)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(
+        path=path,
+        media_type=media_type,
+        filename=filename,
+        content_disposition_type="attachment",
+        headers=headers
+    )
+
+@app.put("/trace/{session_id}", response_model=dict)
+def set_session_tracing(session_id: str, enabled: bool = True):
+    """Switch span tracing on or off for the session's next jobs"""
+    if not session_store.exists(session_id):
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    session_store.update(session_id, {"trace": enabled})
+    return {"session_id": session_id, "trace": enabled}
+
+@app.get("/trace/{session_id}")
+def download_trace(session_id: str):
+    """Download the session's spans as Chrome trace-event JSON, for chrome://tracing or Perfetto"""
+    if not session_store.exists(session_id):
+        raise HTTPException(status_code=404, detail="Processing session not found")
+    
+    path = trace_path(session_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No trace recorded; enable tracing before processing or report generation")
+    
+    return Response(
+        json.dumps(load_trace(path)),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="trace-{session_id}.json"'}
+    )
+
+@app.get("/metrics")
+def get_metrics():
+    """Stage latencies, page counters, queue depths and external call outcomes in Prometheus text format"""
+    gauges = [("jobs", "Jobs in the job queue, by status", {"status": status}, count)
+              for status, count in job_queue.depth().items()]
+    return Response(metrics.render(gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def counter_totals(name: str, by: str, **match) -> Dict[str, float]:
+    """A counter's totals across every process, by the value of one label"""
+    totals: Dict[str, float] = {}
+    for labels, value in metrics.totals(name):
+        if all(labels.get(k) == v for k, v in match.items()):
+            totals[labels.get(by, "")] = totals.get(labels.get(by, ""), 0) + value
+    return totals
+
+def cache_stats(cache: str) -> Dict[str, Any]:
+    """Hit/miss counters of a cache, summed over the job workers that use it"""
+    lookups = counter_totals("cache_lookups_total", "result", cache=cache)
+    hits, misses = int(lookups.get("hit", 0)), int(lookups.get("miss", 0))
+    return {"hits": hits, "misses": misses, "hit_rate": (hits / (hits + misses)) if hits + misses else 0.0}
+
+@app.get("/ocr-cache/stats", response_model=dict)
+def get_ocr_cache_stats():
+    """Get OCR cache hit/miss counters"""
+    disk = ocr_cache.stats()
+    return {
+        "enabled": disk["enabled"],
+        **cache_stats("ocr"),
+        "evictions": int(sum(counter_totals("cache_evictions_total", "cache").values())),
+        "size_bytes": disk["size_bytes"],
+        "max_bytes": disk["max_bytes"]
+    }
+
+@app.get("/translation/stats", response_model=dict)
+def get_translation_stats():
+    """Get translation cache and request counters"""
+    requests_by_outcome = counter_totals("external_requests_total", "outcome", service="translate")
+    return {
+        "provider": translation_service.provider.name,
+        **cache_stats("translate"),
+        "requests": int(sum(requests_by_outcome.values())),
+        "failures": int(requests_by_outcome.get("error", 0))
+    }
+
+def resume_stale_sessions():
+    """Restart sessions whose worker stopped reporting progress, e.g. after a restart"""
+    now = time.time()
+    for status in ("processing", "generating_report"):
+        for session_id in session_store.find("status", status):
+            fields = session_store.get(session_id, ["heartbeat", "file_path", "preprocess_profile", "client_name"]) or {}
+            heartbeat = fields.get("heartbeat") or 0
+            if now - heartbeat < SESSION_STALE_SECONDS:
+                continue
             
-            # Return the file
-            return FileResponse(
-                path=docx_path,
-                media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                filename="report.docx",
-                content_disposition_type="attachment"
-            )
+            # Claim the session so only one server process resumes it
+            if not session_store.compare_and_set(session_id, "heartbeat", heartbeat, now):
+                continue
             
-        except Exception as e:
-            # If pandoc conversion fails, try alternative method
             try:
-                from docx import Document
-                from docx.shared import Pt
-                
-                # Create a new Document
-                doc = Document()
-                
-                # Set default font and size
-                style = doc.styles['Normal']
-                font = style.font
-                font.name = 'Calibri'
-                font.size = Pt(11)
-                
-                # Split content into lines and process
-                lines = final_output.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith('# '):
-                        doc.add_heading(line[2:], level=1)
-                    elif line.startswith('## '):
-                        doc.add_heading(line[3:], level=2)
-                    elif line.startswith('### '):
-                        doc.add_heading(line[4:], level=3)
-                    elif line.startswith('| '):
-                        # Handle tables
-                        cells = line.strip('|').split('|')
-                        table = doc.add_table(rows=1, cols=len(cells))
-                        row = table.rows[0]
-                        for i, cell in enumerate(cells):
-                            row.cells[i].text = cell.strip()
-                    else:
-                        if line:
-                            doc.add_paragraph(line)
-                
-                # Save the document
-                doc.save(docx_path)
-                
-                # Update the status
-                status_data["docx_path"] = docx_path
-                
-                # Return the file
-                return FileResponse(
-                    path=docx_path,
-                    media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    filename="report.docx",
-                    content_disposition_type="attachment"
-                )
-                
-            except Exception as docx_error:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to generate DOCX: {str(e)}. Alternative method also failed: {str(docx_error)}"
-                )
-    else:
-        raise HTTPException(status_code=400, detail="Invalid file type requested")
+                if status == "generating_report":
+                    enqueue_job(session_id, "generate_report", {"client_name": fields.get("client_name")})
+                else:
+                    enqueue_job(session_id, "process_pdf", {"file_path": fields.get("file_path"), "profile": fields.get("preprocess_profile", "auto")})
+            except HTTPException:
+                # Queue is full; the session stays stale and is retried on the next pass
+                pass
 
-# Mount static files for frontend
-app.mount("/", StaticFiles(directory="../frontend/build", html=True), name="frontend")
+def watch_stale_sessions():
+    """Periodically resume abandoned sessions"""
+    while True:
+        try:
+            resume_stale_sessions()
+        except Exception as e:
+            print(f"Resuming sessions failed: {e}")
+        time.sleep(60)
+
+# Job workers; the in-memory session store only works with in-process workers
+job_workers = WorkerPool(JOB_DB_PATH, JOB_WORKERS, use_processes=SESSION_STORE != "memory", run_job=run_job)
+
+@app.on_event("startup")
+def start_session_watcher():
+    """Resume sessions interrupted by a restart"""
+    threading.Thread(target=watch_stale_sessions, name="session-watcher", daemon=True).start()
+
+def index_existing_sessions():
+    """Index sessions processed before the search index existed"""
+    for status in ("ready_for_review", "generating_report", "completed", "completed_with_warning"):
+        for session_id in session_store.find("status", status):
+            try:
+                if not search_index.is_indexed(session_id):
+                    index_session_text(session_id)
+            except Exception as e:
+                print(f"Indexing session {session_id} failed: {e}")
+
+@app.on_event("startup")
+def start_search_backfill():
+    """Bring the search index up to date in the background"""
+    threading.Thread(target=index_existing_sessions, name="search-backfill", daemon=True).start()
+
+@app.on_event("startup")
+def start_job_workers():
+    """Start the job worker pool"""
+    job_workers.start()
+
+@app.on_event("shutdown")
+def shutdown_ocr_pool():
+    """Stop OCR worker processes when the server exits"""
+    if ocr_pool is not None:
+        ocr_pool.shutdown(cancel_futures=True)
+
+@app.on_event("shutdown")
+def shutdown_job_workers():
+    """Stop job workers when the server exits"""
+    job_workers.shutdown()
+
+# Mount static files for frontend, when it has been built
+if os.path.isdir(FRONTEND_BUILD_DIR):
+    app.mount("/", StaticFiles(directory=FRONTEND_BUILD_DIR, html=True), name="frontend")
 
 if __name__ == "__main__":
     import uvicorn
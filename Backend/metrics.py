@@ -0,0 +1,204 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Upper bounds of the queue depth histogram buckets
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+def _labels(labels: Optional[Dict[str, Any]]) -> str:
+    return json.dumps({k: str(v) for k, v in (labels or {}).items()}, sort_keys=True)
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+class Metrics:
+    """Counters and histograms shared by every API and worker process.
+
+    Each process adds observations to in-memory totals and writes the
+    increments to SQLite at most every ``flush_interval`` seconds, so
+    recording on the hot path is a dictionary update. render() reads the
+    combined totals of all processes in the Prometheus text format.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metrics (
+            family TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (name, labels)
+        );
+    """
+
+    def __init__(self, path: str, prefix: str = "", flush_interval: float = 5.0):
+        self.path = path
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # (family, kind, series name, labels) -> increment not yet written
+        self.pending: Dict[Tuple[str, str, str, str], float] = {}
+        self.help: Dict[str, str] = {}
+        self.last_flush = time.monotonic()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.local.conn = conn
+        return conn
+
+    def describe(self, name: str, help_text: str):
+        """Help text shown for a metric family"""
+        self.help[self.prefix + name] = help_text
+
+    def _add(self, entries: List[Tuple[str, str, str, str, float]]):
+        with self.lock:
+            for family, kind, name, labels, amount in entries:
+                key = (family, kind, name, labels)
+                self.pending[key] = self.pending.get(key, 0.0) + amount
+            due = time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, amount: float = 1):
+        """Add amount to a counter"""
+        family = self.prefix + name
+        self._add([(family, "counter", family, _labels(labels), amount)])
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None,
+                buckets: Iterable[float] = LATENCY_BUCKETS):
+        """Record one value in a histogram"""
+        family = self.prefix + name
+        labels = dict(labels or {})
+        # Every bucket gets a row, even at zero, so each series has the full set of bounds
+        entries = [(family, "histogram", f"{family}_bucket", _labels({**labels, "le": _format_value(bound)}),
+                    1 if value <= bound else 0)
+                   for bound in buckets]
+        entries.append((family, "histogram", f"{family}_bucket", _labels({**labels, "le": "+Inf"}), 1))
+        entries.append((family, "histogram", f"{family}_sum", _labels(labels), value))
+        entries.append((family, "histogram", f"{family}_count", _labels(labels), 1))
+        self._add(entries)
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, Any]] = None):
+        """Observe the duration of a block, including blocks that raise"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def flush(self):
+        """Write this process's increments to the shared table"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            self._connection().executemany(
+                "INSERT INTO metrics (family, kind, name, labels, value) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                [(*key, amount) for key, amount in pending.items()]
+            )
+        except sqlite3.Error as e:
+            print(f"Writing metrics failed: {e}")
+            # Keep the increments for the next flush
+            with self.lock:
+                for key, amount in pending.items():
+                    self.pending[key] = self.pending.get(key, 0.0) + amount
+
+    def totals(self, name: str) -> List[Tuple[Dict[str, str], float]]:
+        """Labels and value of every series of a counter, combined across processes"""
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT labels, value FROM metrics WHERE name = ?", (self.prefix + name,)
+        ).fetchall()
+        return [(json.loads(labels), value) for labels, value in rows]
+
+    def render(self, gauges: Optional[List[Tuple[str, str, Dict[str, Any], float]]] = None) -> str:
+        """All metrics in the Prometheus text format; gauges are (name, help, labels, value) read at scrape time"""
+        self.flush()
+        rows = self._connection().execute("SELECT family, kind, name, labels, value FROM metrics").fetchall()
+
+        families: Dict[str, Tuple[str, List[Tuple[str, Dict[str, str], float]]]] = {}
+        for family, kind, name, labels, value in rows:
+            families.setdefault(family, (kind, []))[1].append((name, json.loads(labels), value))
+        for name, help_text, labels, value in gauges or []:
+            family = self.prefix + name
+            self.help.setdefault(family, help_text)
+            families.setdefault(family, ("gauge", []))[1].append((family, {k: str(v) for k, v in labels.items()}, value))
+
+        def order(sample):
+            name, labels, _ = sample
+            le = labels.get("le")
+            bound = float("inf") if le == "+Inf" else float(le) if le is not None else 0.0
+            rest = sorted((k, v) for k, v in labels.items() if k != "le")
+            return rest, name, bound
+
+        lines = []
+        for family in sorted(families):
+            kind, samples = families[family]
+            if family in self.help:
+                lines.append(f"# HELP {family} {self.help[family]}")
+            lines.append(f"# TYPE {family} {kind}")
+            for name, labels, value in sorted(samples, key=order):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+class StageTimer:
+    """Stage durations of one job, kept for the session and recorded in the shared histograms.
+
+    With a trace (a tracing.TraceRecorder), every stage run is also recorded as a span.
+    """
+
+    def __init__(self, metrics: Metrics, job: str, totals: Optional[Dict[str, Dict[str, float]]] = None,
+                 trace=None):
+        self.metrics = metrics
+        self.job = job
+        self.trace = trace
+        self.lock = threading.Lock()
+        self.totals = {stage: dict(t) for stage, t in (totals or {}).items()}
+
+    def add(self, stage: str, seconds: float, start: Optional[float] = None, **span):
+        """Count one run of a stage; start (a time.time() timestamp) and span details are for the trace"""
+        self.metrics.observe("stage_seconds", seconds, {"job": self.job, "stage": stage})
+        with self.lock:
+            total = self.totals.setdefault(stage, {"seconds": 0.0, "count": 0})
+            total["seconds"] += seconds
+            total["count"] += 1
+        if self.trace is not None:
+            self.trace.span(stage, self.job, time.time() - seconds if start is None else start, seconds, **span)
+
+    @contextmanager
+    def stage(self, name: str, **span):
+        """Time a block as one run of a stage"""
+        start, wall = time.perf_counter(), time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, wall, **span)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Total seconds and runs per stage"""
+        with self.lock:
+            return {stage: {"seconds": round(t["seconds"], 3), "count": t["count"]}
+                    for stage, t in self.totals.items()}
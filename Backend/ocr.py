@@ -0,0 +1,315 @@
+import io
+import os
+from functools import lru_cache
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+import pytesseract
+from PIL import Image
+import cv2
+import numpy as np
+
+# Set Tesseract executable path - update this path to match your Tesseract installation
+pytesseract.pytesseract.tesseract_cmd = os.getenv(
+    "TESSERACT_CMD", r'C:\Users\PRAKASH.R\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
+)
+
+# Tesseract language string used for all land records
+OCR_LANG = 'kan+eng'
+
+# OCR backend: "tesserocr" keeps one initialised Tesseract per process, "pytesseract"
+# runs the tesseract executable per page, "auto" uses tesserocr when it is installed
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+
+# Word confidences per page: "auto" collects them only with tesserocr, which reports them
+# alongside the text; with pytesseract they take a second Tesseract run, so "true" opts in
+OCR_CONFIDENCES = os.getenv("OCR_CONFIDENCES", "auto").lower()
+
+# Words recognised with less confidence than this (0-100) are counted as doubtful
+LOW_CONFIDENCE = 60
+
+# Named preprocessing profiles; their parameters are part of the OCR cache key
+PREPROCESS_PROFILES = {
+    # Current full path: NL-means denoising before sharpening and thresholding
+    "accurate": {
+        "scale": 1.5,
+        "denoise": "nlmeans",
+        "denoise_h": 30,
+        "threshold_block": 35,
+        "threshold_c": 15,
+    },
+    # Clean scans and digital pages: a 3x3 Gaussian blur instead of NL-means
+    "fast": {
+        "scale": 1.5,
+        "denoise": "gaussian",
+        "blur_ksize": 3,
+        "threshold_block": 35,
+        "threshold_c": 15,
+    },
+}
+
+# Thresholds used by the "auto" profile to decide when a page needs "accurate"
+AUTO_PROFILE_RULES = {
+    "max_noise_sigma": 6.0,
+    "min_contrast": 90,
+    "min_source_dpi": 200,
+}
+
+PROFILE_CHOICES = ["auto"] + list(PREPROCESS_PROFILES)
+
+# Thresholds for pages with nothing to read (blank backs, separator sheets, lone stamps).
+# Ink is counted on every "step"-th pixel, away from the scan edges given by "margin",
+# and is anything "ink_delta" darker than the paper
+BLANK_PAGE_RULES = {
+    "margin": 0.05,
+    "step": 4,
+    "ink_delta": 60,
+    "min_line_ink": 0.01,
+    "max_blank_ink": 0.002,
+    "max_near_blank_ink": 0.02,
+    "max_near_blank_lines": 2,
+}
+
+def profile_cache_params(profile: str, source_dpi: Optional[float] = None):
+    """Parameters that determine OCR output for a profile choice.
+
+    "auto" also depends on the page's source_dpi, which choose_profile uses.
+    """
+    if profile == "auto":
+        return {"auto": AUTO_PROFILE_RULES, "profiles": PREPROCESS_PROFILES, "source_dpi": source_dpi}
+    return PREPROCESS_PROFILES[profile]
+
+def image_statistics(gray: np.ndarray):
+    """Cheap page statistics used to pick a preprocessing profile"""
+    # Immerkaer's fast noise variance estimate
+    laplacian = np.array([[1, -2, 1],
+                          [-2, 4, -2],
+                          [1, -2, 1]], dtype=np.float32)
+    response = cv2.filter2D(gray.astype(np.float32), -1, laplacian)
+    h, w = gray.shape
+    noise_sigma = float(np.abs(response[1:-1, 1:-1]).sum() * np.sqrt(np.pi / 2) / (6 * (w - 2) * (h - 2)))
+
+    low, high = np.percentile(gray, [5, 95])
+    return {"noise_sigma": noise_sigma, "contrast": float(high - low)}
+
+def choose_profile(gray: np.ndarray, source_dpi: Optional[float] = None):
+    """Pick the cheapest profile likely to OCR this page as well as "accurate" """
+    stats = image_statistics(gray)
+    rules = AUTO_PROFILE_RULES
+    if stats["noise_sigma"] > rules["max_noise_sigma"]:
+        return "accurate"
+    if stats["contrast"] < rules["min_contrast"]:
+        return "accurate"
+    if source_dpi is not None and source_dpi < rules["min_source_dpi"]:
+        return "accurate"
+    return "fast"
+
+def page_content(gray: np.ndarray):
+    """Classify a page as "blank", "near_blank" or "text" from its ink density and line layout"""
+    rules = BLANK_PAGE_RULES
+    h, w = gray.shape
+    dy, dx = int(h * rules["margin"]), int(w * rules["margin"])
+    sample = gray[dy:h - dy:rules["step"], dx:w - dx:rules["step"]]
+    if sample.size == 0:
+        return {"content": "blank", "ink_ratio": 0.0, "text_lines": 0}
+
+    paper = np.percentile(sample, 90)
+    ink = sample < paper - rules["ink_delta"]
+    ink_ratio = float(ink.mean())
+
+    # Lines of text are bands of inked rows; a stamp or a rule makes one or two
+    rows = ink.mean(axis=1) > rules["min_line_ink"]
+    text_lines = int(np.count_nonzero(rows[1:] & ~rows[:-1]) + rows[0])
+
+    if ink_ratio < rules["max_blank_ink"]:
+        content = "blank"
+    elif ink_ratio < rules["max_near_blank_ink"] and text_lines <= rules["max_near_blank_lines"]:
+        content = "near_blank"
+    else:
+        content = "text"
+    return {"content": content, "ink_ratio": round(ink_ratio, 4), "text_lines": text_lines}
+
+def as_gray(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+    """Grayscale pixels of an image; 2-D arrays are already grayscale and used as they are"""
+    if isinstance(image, np.ndarray) and image.ndim == 2:
+        return image
+    if isinstance(image, np.ndarray):
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return np.array(image.convert("L"))
+
+def pixmap_gray(pix) -> np.ndarray:
+    """View of a grayscale PyMuPDF pixmap's samples as a 2-D array, without copying.
+
+    The array shares the pixmap's memory, so the pixmap must outlive it.
+    """
+    rows = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width]
+
+def preprocess_image(image: Union[Image.Image, np.ndarray], profile: str = "accurate"):
+    """Preprocess image to improve OCR quality"""
+    params = PREPROCESS_PROFILES[profile]
+    img = as_gray(image)
+    img = cv2.resize(img, None, fx=params["scale"], fy=params["scale"], interpolation=cv2.INTER_LINEAR)
+    if params["denoise"] == "nlmeans":
+        img = cv2.fastNlMeansDenoising(img, h=params["denoise_h"])
+    else:
+        img = cv2.GaussianBlur(img, (params["blur_ksize"], params["blur_ksize"]), 0)
+    kernel = np.array([[0, -1, 0],
+                       [-1, 5,-1],
+                       [0, -1, 0]])
+    img = cv2.filter2D(img, -1, kernel)
+    img = cv2.adaptiveThreshold(img, 255,
+                                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                cv2.THRESH_BINARY,
+                                params["threshold_block"], params["threshold_c"])
+    return Image.fromarray(img)
+
+class OCREngine:
+    """Interface for OCR backends"""
+    name = "base"
+
+    def recognize(self, image: Image.Image, with_confidences: bool = False) -> Tuple[str, List[Dict[str, Any]]]:
+        """Text of a preprocessed page and, if asked for, its words with confidences (0-100)"""
+        raise NotImplementedError
+
+class TesserocrEngine(OCREngine):
+    """Tesseract API kept initialised in this process and reused for every page"""
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG):
+        import tesserocr
+        # TESSDATA_PREFIX points at the traineddata files when they are not in the default location
+        tessdata = os.getenv("TESSDATA_PREFIX")
+        kwargs = {"path": tessdata} if tessdata else {}
+        self.api = tesserocr.PyTessBaseAPI(lang=lang, **kwargs)
+        self.lock = threading.Lock()
+
+    def recognize(self, image, with_confidences=False):
+        with self.lock:
+            self.api.SetImage(image)
+            text = self.api.GetUTF8Text()
+            words = []
+            if with_confidences:
+                words = [{"text": word, "confidence": float(conf)}
+                         for word, conf in self.api.MapWordConfidences() if word.strip()]
+            self.api.Clear()
+        return text, words
+
+class PytesseractEngine(OCREngine):
+    """Runs the tesseract executable once per page"""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    def recognize(self, image, with_confidences=False):
+        text = pytesseract.image_to_string(image, lang=self.lang)
+        if not with_confidences:
+            return text, []
+
+        # A second run for the word boxes; the page text keeps image_to_string's layout
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        words = [{"text": word, "confidence": float(conf)}
+                 for word, conf in zip(data["text"], data["conf"]) if float(conf) >= 0 and word.strip()]
+        return text, words
+
+def engine_name() -> str:
+    """Backend selected by OCR_ENGINE"""
+    if OCR_ENGINE != "auto":
+        return OCR_ENGINE
+    try:
+        import tesserocr  # noqa: F401
+        return "tesserocr"
+    except ImportError:
+        return "pytesseract"
+
+# One engine per process, created on first use
+_engine: Optional[OCREngine] = None
+
+def get_engine() -> OCREngine:
+    """This process's OCR engine, falling back to pytesseract if tesserocr cannot start"""
+    global _engine
+    if _engine is None:
+        if engine_name() == "tesserocr":
+            try:
+                _engine = TesserocrEngine()
+            except Exception as e:
+                print(f"tesserocr unavailable, falling back to pytesseract: {e}")
+                _engine = PytesseractEngine()
+        else:
+            _engine = PytesseractEngine()
+    return _engine
+
+def confidences_enabled() -> bool:
+    """Whether OCR_CONFIDENCES asks for word confidences with this process's engine"""
+    if OCR_CONFIDENCES == "auto":
+        return get_engine().name == "tesserocr"
+    return OCR_CONFIDENCES == "true"
+
+def confidence_summary(words: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Page-level view of word confidences"""
+    if not words:
+        return {"words": 0, "mean_confidence": None, "low_confidence_words": 0}
+    confidences = [w["confidence"] for w in words]
+    return {
+        "words": len(words),
+        "mean_confidence": round(sum(confidences) / len(confidences), 1),
+        "low_confidence_words": sum(1 for c in confidences if c < LOW_CONFIDENCE),
+    }
+
+def recognize_image(image: Union[Image.Image, np.ndarray], profile: str = "accurate",
+                    with_confidences: bool = False,
+                    stages: Optional[List[Tuple[str, float, float]]] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """Preprocess and OCR an image, returning its text and word confidences.
+
+    If stages is given, (stage, start time, seconds) of preprocessing and recognition are appended to it.
+    """
+    try:
+        wall, start = time.time(), time.perf_counter()
+        processed = preprocess_image(image, profile)
+        preprocessed = time.perf_counter()
+        result = get_engine().recognize(processed, with_confidences)
+        if stages is not None:
+            stages.append(("preprocess", wall, preprocessed - start))
+            stages.append(("tesseract", wall + preprocessed - start, time.perf_counter() - preprocessed))
+        return result
+    except Exception as e:
+        return f"[OCR failed: {str(e)}]", []
+
+def extract_text_from_image(image: Union[Image.Image, np.ndarray], profile: str = "accurate"):
+    """Extract text from image using OCR"""
+    return recognize_image(image, profile)[0]
+
+@lru_cache(maxsize=1)
+def engine_version() -> str:
+    """OCR backend and Tesseract version, used to invalidate cached OCR output"""
+    try:
+        if engine_name() == "tesserocr":
+            import tesserocr
+            return f"tesserocr-{tesserocr.tesseract_version().splitlines()[0]}"
+        return f"pytesseract-{pytesseract.get_tesseract_version()}"
+    except Exception:
+        return "unknown"
+
+def ocr_failed(text: str) -> bool:
+    """Whether extract_text_from_image returned an error marker"""
+    return text.startswith("[OCR failed:")
+
+def ocr_page(page_num: int, image: Union[bytes, np.ndarray], profile: str = "accurate", source_dpi: Optional[float] = None):
+    """Worker entry point: OCR a rendered page.
+
+    image is a 2-D grayscale array, or encoded image bytes. Runs inside the
+    OCR process pool, so it takes and returns only picklable values.
+    Returns (page_num, text, profile, confidence summary, work); the
+    profile differs from the requested one when profile is "auto". work
+    holds the worker's pid and thread and the (stage, start time, seconds)
+    of each step.
+    """
+    wall, start = time.time(), time.perf_counter()
+    img = as_gray(Image.open(io.BytesIO(image)) if isinstance(image, bytes) else image)
+    if profile == "auto":
+        profile = choose_profile(img, source_dpi)
+    stages = [("choose_profile", wall, time.perf_counter() - start)]
+    text, words = recognize_image(img, profile, with_confidences=confidences_enabled(), stages=stages)
+    work = {"pid": os.getpid(), "tid": threading.get_ident(), "thread": threading.current_thread().name, "stages": stages}
+    return page_num, text, profile, confidence_summary(words), work
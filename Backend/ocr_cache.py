@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+class OCRCache:
+    """Content-addressed OCR results stored on disk with LRU eviction.
+
+    Entries live in ``<directory>/<key[:2]>/<key>.txt``. A hit touches the
+    file's mtime, so the oldest mtimes are the least recently used entries
+    and are evicted first once the cache grows past ``max_bytes``. Writes
+    go through a temp file and ``os.replace`` so several worker processes
+    can share one directory.
+
+    on_lookup(hit) and on_evict(count), if given, are called after every
+    lookup and eviction, so callers can keep totals across processes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, on_lookup: Optional[Callable[[bool], None]] = None,
+                 on_evict: Optional[Callable[[int], None]] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.on_lookup = on_lookup
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(pixel_hash: str, params: Dict[str, Any], lang: str, engine_version: str) -> str:
+        """Cache key for one rendered page and OCR configuration"""
+        material = json.dumps({
+            "pixels": pixel_hash,
+            "params": params,
+            "lang": lang,
+            "engine": engine_version,
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text for key, or None on a miss"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            if self.on_lookup:
+                self.on_lookup(False)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker since the read; the text is still good
+            pass
+        with self._lock:
+            self.hits += 1
+        if self.on_lookup:
+            self.on_lookup(True)
+        return text
+
+    def put(self, key: str, text: str):
+        """Store text under key and evict old entries if over budget"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".txt"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self):
+        """Drop least recently used entries until usage is back under 90% of the budget"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for path, _, entry_size in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+        self.evictions += evicted
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size_bytes": self._size if self._size is not None else self._scan_size(),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,130 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+# Marks the end of the stream on a stage queue
+_DONE = object()
+
+class PipelineError(Exception):
+    """Raised by Pipeline.run when a stage fails"""
+
+class Pipeline:
+    """Run items through stages connected by bounded queues.
+
+    The source iterable is drained in its own thread, each stage runs in
+    its own pool of threads, and finished items are handed to the sink in
+    the calling thread as soon as they leave the last stage. Because every
+    queue is bounded, a slow stage blocks the ones before it instead of
+    letting work pile up in memory.
+
+    With a monitor, monitor(stage_name, depth) is called each time a stage
+    takes an item, with the number of items still waiting for that stage.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any], int]], queue_size: int = 8,
+                 monitor: Optional[Callable[[str, int], None]] = None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.monitor = monitor
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.error_stage: Optional[str] = None
+
+    def _put(self, q: queue.Queue, item):
+        """Put with periodic checks so a failed pipeline can unwind"""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, stage_name: str, error: BaseException):
+        if self.error is None:
+            self.error = error
+            self.error_stage = stage_name
+        self.stop.set()
+
+    def _run_source(self, name: str, source: Iterable, out_q: queue.Queue, consumers: int):
+        try:
+            for item in source:
+                if not self._put(out_q, item):
+                    return
+        except BaseException as e:
+            self._fail(name, e)
+        finally:
+            for _ in range(consumers):
+                self._put(out_q, _DONE)
+
+    def _run_stage(self, name: str, func: Callable, in_q: queue.Queue, out_q: queue.Queue,
+                   remaining: List[int], lock: threading.Lock, consumers: int):
+        try:
+            while not self.stop.is_set():
+                try:
+                    item = in_q.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                if self.monitor:
+                    self.monitor(name, in_q.qsize())
+                try:
+                    result = func(item)
+                except BaseException as e:
+                    self._fail(name, e)
+                    return
+                if not self._put(out_q, result):
+                    return
+        finally:
+            # The last worker of a stage to finish closes the next queue
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                for _ in range(consumers):
+                    self._put(out_q, _DONE)
+
+    def run(self, source: Iterable, sink: Callable[[Any], None], source_name: str = "source"):
+        """Feed source through all stages, calling sink for every finished item"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = []
+
+        first_workers = self.stages[0][2] if self.stages else 1
+        threads.append(threading.Thread(
+            target=self._run_source, args=(source_name, source, queues[0], first_workers),
+            name=f"pipeline-{source_name}", daemon=True))
+
+        for i, (name, func, workers) in enumerate(self.stages):
+            consumers = self.stages[i + 1][2] if i + 1 < len(self.stages) else 1
+            remaining = [workers]
+            lock = threading.Lock()
+            for w in range(workers):
+                threads.append(threading.Thread(
+                    target=self._run_stage,
+                    args=(name, func, queues[i], queues[i + 1], remaining, lock, consumers),
+                    name=f"pipeline-{name}-{w}", daemon=True))
+
+        for t in threads:
+            t.start()
+
+        out_q = queues[-1]
+        try:
+            while not self.stop.is_set():
+                try:
+                    item = out_q.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                sink(item)
+        except BaseException as e:
+            self._fail("sink", e)
+        finally:
+            self.stop.set()
+            for t in threads:
+                t.join()
+
+        if self.error is not None:
+            raise PipelineError(f"{self.error_stage} stage failed: {self.error}") from self.error
+
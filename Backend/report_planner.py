@@ -0,0 +1,121 @@
+import math
+import re
+from typing import Dict, List, Optional
+
+# Rough tokenizer model: English runs at about four characters per token,
+# while Indic script is close to one token per character
+ASCII_CHARS_PER_TOKEN = 4.0
+NON_ASCII_TOKENS_PER_CHAR = 1.0
+
+# Share of every budget held back for estimation error
+SAFETY_MARGIN = 0.1
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token count for text, without loading a tokenizer"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    return math.ceil(ascii_chars / ASCII_CHARS_PER_TOKEN + non_ascii * NON_ASCII_TOKENS_PER_CHAR)
+
+def input_budget(context_tokens: int, prompt: str, max_new_tokens: int) -> int:
+    """Tokens of document text that fit in one call next to the prompt and the output"""
+    available = context_tokens - max_new_tokens - estimate_tokens(prompt)
+    return max(1, int(available * (1 - SAFETY_MARGIN)))
+
+def format_chunk(chunk: Dict[str, str]) -> str:
+    """Chunk text as sent to the model, with each page under its own label"""
+    return "\n\n".join(f"[{key}]\n{text}" for key, text in chunk.items())
+
+def _split_text(text: str, budget: int) -> List[str]:
+    """Split text that is too large for one call on paragraph, line, then character boundaries"""
+    parts: List[str] = []
+    for separator in ("\n\n", "\n"):
+        pieces = re.split(re.escape(separator), text)
+        if all(estimate_tokens(p) <= budget for p in pieces):
+            current = ""
+            for piece in pieces:
+                candidate = f"{current}{separator}{piece}" if current else piece
+                if current and estimate_tokens(candidate) > budget:
+                    parts.append(current)
+                    current = piece
+                else:
+                    current = candidate
+            if current:
+                parts.append(current)
+            return parts
+
+    # A single huge line; cut it by estimated size
+    step = max(1, len(text) * budget // max(1, estimate_tokens(text)))
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+def _page_cost(key: str, text: str) -> int:
+    return estimate_tokens(format_chunk({key: text})) + 1
+
+def _reuse_plan(pages: Dict[str, str], budget: int, previous: List[List[str]]) -> Optional[List[Dict[str, str]]]:
+    """Chunks with the same page groups as an earlier plan, or None if they no longer fit"""
+    keys = [key for key, text in pages.items() if text and text.strip()]
+    if [key for group in previous for key in group] != keys:
+        return None
+    chunks = []
+    for group in previous:
+        if sum(_page_cost(key, pages[key]) for key in group) > budget:
+            return None
+        chunks.append({key: pages[key] for key in group})
+    return chunks
+
+def plan_chunks(pages: Dict[str, str], budget: int,
+                previous: Optional[List[List[str]]] = None) -> List[Dict[str, str]]:
+    """Pack pages, in order, into as few chunks as fit within budget tokens each.
+
+    Page labels are counted against the budget. A page that does not fit in
+    a chunk on its own is split into parts labelled "Page N (part k)".
+    previous is the page keys of each chunk of an earlier plan; while those
+    groups still fit they are kept, so editing one page changes one chunk
+    instead of shifting every boundary after it.
+    """
+    if previous:
+        reused = _reuse_plan(pages, budget, previous)
+        if reused is not None:
+            return reused
+
+    chunks: List[Dict[str, str]] = []
+    current: Dict[str, str] = {}
+    used = 0
+
+    def flush():
+        nonlocal current, used
+        if current:
+            chunks.append(current)
+        current, used = {}, 0
+
+    for key, text in pages.items():
+        if not text or not text.strip():
+            continue
+        cost = _page_cost(key, text)
+        if cost > budget:
+            flush()
+            parts = _split_text(text, max(1, budget - estimate_tokens(f"[{key} (part 99)]\n") - 1))
+            for k, part in enumerate(parts, start=1):
+                chunks.append({f"{key} (part {k})": part})
+            continue
+        if used + cost > budget:
+            flush()
+        current[key] = text
+        used += cost
+    flush()
+    return chunks
+
+def pack_texts(texts: List[str], budget: int, separator: str = "\n\n") -> List[List[str]]:
+    """Group texts, in order, into as few groups as fit within budget tokens each"""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for text in texts:
+        cost = estimate_tokens(text) + estimate_tokens(separator)
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,146 @@
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Page text kinds that are searchable, by the session page kind they come from
+SEARCH_KINDS = {
+    "extracted_pages": "extracted",
+    "translated_pages": "translated",
+    "edited_pages": "edited",
+}
+
+# Kannada vowel signs, virama and other combining marks; unicode61 would split words at them
+KANNADA_MARKS = "".join(chr(c) for c in [*range(0x0C81, 0x0C84), *range(0x0CBC, 0x0CCE), 0x0CD5, 0x0CD6, 0x0CE2, 0x0CE3])
+
+# Query terms: a quoted phrase or a run of non-space characters
+QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+def build_query(text: str) -> str:
+    """FTS5 query matching texts that contain every term; "quoted phrases" and prefix* terms are kept.
+
+    Every document is one text kind of one page, so all terms must occur in
+    the same kind: a Kannada term from the extracted text and an English one
+    from the translation do not match together.
+    """
+    terms = []
+    for phrase, word in QUERY_TERM.findall(text):
+        term = phrase or word
+        prefix = not phrase and term.endswith("*")
+        term = term.rstrip("*").replace('"', "")
+        # Inside quotes, punctuation such as "12/3" just separates tokens of one phrase
+        if term.strip():
+            terms.append(f'"{term}"' + (" *" if prefix else ""))
+    return " ".join(terms)
+
+class SearchIndex:
+    """Full-text index of page text across all sessions, on SQLite FTS5.
+
+    Each (session, page, kind) is one document. Pages are added as they
+    are published and replaced when edited, so the index never needs a
+    full rebuild. Edited text is only stored while it differs from the
+    translation, which keeps the index from holding every page twice.
+    """
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS page_docs (
+            doc_id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            UNIQUE (session_id, page_number, kind)
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+            text,
+            prefix = '2 3',
+            tokenize = "unicode61 remove_diacritics 2 tokenchars '{KANNADA_MARKS}'"
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def index_page(self, session_id: str, page_number: int, texts: Dict[str, Optional[str]]):
+        """Add or replace a page's texts, keyed by session page kind; empty text removes the entry"""
+        with self._transaction() as conn:
+            for page_kind, text in texts.items():
+                kind = SEARCH_KINDS[page_kind]
+                row = conn.execute(
+                    "SELECT doc_id FROM page_docs WHERE session_id = ? AND page_number = ? AND kind = ?",
+                    (session_id, page_number, kind)
+                ).fetchone()
+                if row:
+                    conn.execute("DELETE FROM page_text WHERE rowid = ?", (row[0],))
+                if not text or not text.strip():
+                    if row:
+                        conn.execute("DELETE FROM page_docs WHERE doc_id = ?", (row[0],))
+                    continue
+                if row:
+                    doc_id = row[0]
+                else:
+                    doc_id = conn.execute(
+                        "INSERT INTO page_docs (session_id, page_number, kind) VALUES (?, ?, ?)",
+                        (session_id, page_number, kind)
+                    ).lastrowid
+                conn.execute("INSERT INTO page_text (rowid, text) VALUES (?, ?)", (doc_id, text))
+
+    def is_indexed(self, session_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM page_docs WHERE session_id = ? LIMIT 1", (session_id,)
+        ).fetchone() is not None
+
+    def search(self, query: str, session_id: Optional[str] = None, kinds: Optional[Iterable[str]] = None,
+               limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Best-ranked pages matching query, each with a snippet per matching kind"""
+        match = build_query(query)
+        if not match:
+            return []
+
+        where, params = ["page_text MATCH ?"], [match]
+        if session_id:
+            where.append("d.session_id = ?")
+            params.append(session_id)
+        if kinds:
+            kinds = list(kinds)
+            where.append(f"d.kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+
+        # A page matches at most once per kind, so this many rows always covers the requested pages
+        rows = self._connection().execute(
+            "SELECT d.session_id, d.page_number, d.kind, snippet(page_text, 0, '[', ']', '…', 16), "
+            "bm25(page_text) "
+            f"FROM page_text JOIN page_docs d ON d.doc_id = page_text.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY rank LIMIT ?",
+            (*params, (offset + limit) * len(SEARCH_KINDS))
+        ).fetchall()
+
+        pages: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for sid, page_number, kind, text, score in rows:
+            page = pages.setdefault((sid, page_number), {
+                "session_id": sid, "page_number": page_number, "score": round(-score, 4), "matches": {}
+            })
+            page["matches"][kind] = text
+        return list(pages.values())[offset:offset + limit]
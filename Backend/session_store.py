@@ -0,0 +1,348 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+class SessionStore:
+    """Interface for storing processing sessions.
+
+    A session has scalar fields (status, progress, ...) and per-page values
+    grouped by kind ("extracted_pages", "translated_pages", "edited_pages",
+    "image_paths", "page_info"). Page values are returned keyed by
+    "Page N" in page order. Every write bumps the session's version so
+    readers can cheaply tell whether anything changed.
+    """
+
+    def create(self, session_id: str, fields: Dict[str, Any]):
+        raise NotImplementedError
+
+    def exists(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, session_id: str, keys: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Scalar fields of a session (all, or only keys), or None if it does not exist"""
+        raise NotImplementedError
+
+    def update(self, session_id: str, fields: Dict[str, Any]):
+        """Set the given scalar fields, leaving the others untouched"""
+        raise NotImplementedError
+
+    def increment(self, session_id: str, key: str, amount: int = 1) -> int:
+        """Atomically add amount to an integer field and return the new value"""
+        raise NotImplementedError
+
+    def compare_and_set(self, session_id: str, key: str, expected: Any, value: Any) -> bool:
+        """Set key to value only if it currently equals expected"""
+        raise NotImplementedError
+
+    def set_page(self, session_id: str, page_number: int, values: Dict[str, Any],
+                 keep_existing: Iterable[str] = ()):
+        """Write several page values at once; kinds in keep_existing are only set if missing"""
+        raise NotImplementedError
+
+    def get_page(self, session_id: str, kind: str, page_number: int) -> Any:
+        raise NotImplementedError
+
+    def get_pages(self, session_id: str, kind: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def page_numbers(self, session_id: str, kind: str) -> List[int]:
+        """Page numbers that have a value of the given kind, in order"""
+        raise NotImplementedError
+
+    def get_page_range(self, session_id: str, kinds: Iterable[str], first: int, last: int) -> Dict[int, Dict[str, Any]]:
+        """Values of several kinds for pages first to last, keyed by page number, in one read"""
+        raise NotImplementedError
+
+    def version(self, session_id: str) -> Optional[int]:
+        raise NotImplementedError
+
+    def find(self, key: str, value: Any) -> List[str]:
+        """Ids of sessions whose field key equals value"""
+        raise NotImplementedError
+
+class MemorySessionStore(SessionStore):
+    """Single-process store for tests and local development"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, session_id, fields):
+        with self.lock:
+            self.sessions[session_id] = {"fields": copy.deepcopy(fields), "pages": {}, "version": 1}
+
+    def exists(self, session_id):
+        with self.lock:
+            return session_id in self.sessions
+
+    def get(self, session_id, keys=None):
+        with self.lock:
+            if session_id not in self.sessions:
+                return None
+            fields = self.sessions[session_id]["fields"]
+            if keys is not None:
+                fields = {k: fields[k] for k in keys if k in fields}
+            return copy.deepcopy(fields)
+
+    def update(self, session_id, fields):
+        with self.lock:
+            session = self.sessions[session_id]
+            session["fields"].update(copy.deepcopy(fields))
+            session["version"] += 1
+
+    def increment(self, session_id, key, amount=1):
+        with self.lock:
+            session = self.sessions[session_id]
+            session["fields"][key] = int(session["fields"].get(key) or 0) + amount
+            session["version"] += 1
+            return session["fields"][key]
+
+    def compare_and_set(self, session_id, key, expected, value):
+        with self.lock:
+            session = self.sessions[session_id]
+            if session["fields"].get(key) != expected:
+                return False
+            session["fields"][key] = value
+            session["version"] += 1
+            return True
+
+    def set_page(self, session_id, page_number, values, keep_existing=()):
+        with self.lock:
+            session = self.sessions[session_id]
+            for kind, value in values.items():
+                pages = session["pages"].setdefault(kind, {})
+                if kind in keep_existing and page_number in pages:
+                    continue
+                pages[page_number] = copy.deepcopy(value)
+            session["version"] += 1
+
+    def get_page(self, session_id, kind, page_number):
+        with self.lock:
+            pages = self.sessions.get(session_id, {}).get("pages", {}).get(kind, {})
+            return copy.deepcopy(pages.get(page_number))
+
+    def get_pages(self, session_id, kind):
+        with self.lock:
+            pages = self.sessions.get(session_id, {}).get("pages", {}).get(kind, {})
+            return {f"Page {n}": copy.deepcopy(pages[n]) for n in sorted(pages)}
+
+    def page_numbers(self, session_id, kind):
+        with self.lock:
+            return sorted(self.sessions.get(session_id, {}).get("pages", {}).get(kind, {}))
+
+    def get_page_range(self, session_id, kinds, first, last):
+        with self.lock:
+            pages = self.sessions.get(session_id, {}).get("pages", {})
+            result: Dict[int, Dict[str, Any]] = {}
+            for kind in kinds:
+                for n, value in pages.get(kind, {}).items():
+                    if first <= n <= last:
+                        result.setdefault(n, {})[kind] = copy.deepcopy(value)
+            return dict(sorted(result.items()))
+
+    def version(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            return session["version"] if session else None
+
+    def find(self, key, value):
+        with self.lock:
+            return [sid for sid, s in self.sessions.items() if s["fields"].get(key) == value]
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite store in WAL mode, shared by every API and worker process.
+
+    Each field and each page value is its own row, so concurrent writers
+    only touch what they change instead of rewriting the whole session.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 1,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS session_fields (
+            session_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (session_id, key)
+        );
+        CREATE TABLE IF NOT EXISTS session_pages (
+            session_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            page_number INTEGER NOT NULL,
+            value TEXT,
+            PRIMARY KEY (session_id, kind, page_number)
+        );
+        CREATE INDEX IF NOT EXISTS session_fields_key_value ON session_fields (key, value);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _touch(self, conn, session_id):
+        conn.execute(
+            "UPDATE sessions SET version = version + 1, updated_at = ? WHERE session_id = ?",
+            (time.time(), session_id)
+        )
+
+    def _write_fields(self, conn, session_id, fields):
+        conn.executemany(
+            "INSERT INTO session_fields (session_id, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (session_id, key) DO UPDATE SET value = excluded.value",
+            [(session_id, k, json.dumps(v, ensure_ascii=False)) for k, v in fields.items()]
+        )
+
+    def create(self, session_id, fields):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM session_fields WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM session_pages WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, version, created_at, updated_at) VALUES (?, 1, ?, ?)",
+                (session_id, now, now)
+            )
+            self._write_fields(conn, session_id, fields)
+
+    def exists(self, session_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row is not None
+
+    def get(self, session_id, keys=None):
+        conn = self._connection()
+        if not self.exists(session_id):
+            return None
+        if keys is None:
+            rows = conn.execute(
+                "SELECT key, value FROM session_fields WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        else:
+            keys = list(keys)
+            placeholders = ",".join("?" * len(keys))
+            rows = conn.execute(
+                f"SELECT key, value FROM session_fields WHERE session_id = ? AND key IN ({placeholders})",
+                [session_id, *keys]
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def update(self, session_id, fields):
+        with self._transaction() as conn:
+            self._write_fields(conn, session_id, fields)
+            self._touch(conn, session_id)
+
+    def increment(self, session_id, key, amount=1):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM session_fields WHERE session_id = ? AND key = ?", (session_id, key)
+            ).fetchone()
+            value = int(json.loads(row[0]) or 0) + amount if row else amount
+            self._write_fields(conn, session_id, {key: value})
+            self._touch(conn, session_id)
+            return value
+
+    def compare_and_set(self, session_id, key, expected, value):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM session_fields WHERE session_id = ? AND key = ?", (session_id, key)
+            ).fetchone()
+            current = json.loads(row[0]) if row else None
+            if current != expected:
+                return False
+            self._write_fields(conn, session_id, {key: value})
+            self._touch(conn, session_id)
+            return True
+
+    def set_page(self, session_id, page_number, values, keep_existing=()):
+        with self._transaction() as conn:
+            for kind, value in values.items():
+                verb = "INSERT OR IGNORE" if kind in keep_existing else "INSERT OR REPLACE"
+                conn.execute(
+                    f"{verb} INTO session_pages (session_id, kind, page_number, value) VALUES (?, ?, ?, ?)",
+                    (session_id, kind, page_number, json.dumps(value, ensure_ascii=False))
+                )
+            self._touch(conn, session_id)
+
+    def get_page(self, session_id, kind, page_number):
+        row = self._connection().execute(
+            "SELECT value FROM session_pages WHERE session_id = ? AND kind = ? AND page_number = ?",
+            (session_id, kind, page_number)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_pages(self, session_id, kind):
+        rows = self._connection().execute(
+            "SELECT page_number, value FROM session_pages WHERE session_id = ? AND kind = ? ORDER BY page_number",
+            (session_id, kind)
+        ).fetchall()
+        return {f"Page {n}": json.loads(value) for n, value in rows}
+
+    def page_numbers(self, session_id, kind):
+        rows = self._connection().execute(
+            "SELECT page_number FROM session_pages WHERE session_id = ? AND kind = ? ORDER BY page_number",
+            (session_id, kind)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_page_range(self, session_id, kinds, first, last):
+        kinds = list(kinds)
+        rows = self._connection().execute(
+            f"SELECT page_number, kind, value FROM session_pages WHERE session_id = ? "
+            f"AND kind IN ({', '.join('?' * len(kinds))}) AND page_number BETWEEN ? AND ? ORDER BY page_number",
+            (session_id, *kinds, first, last)
+        ).fetchall()
+        result: Dict[int, Dict[str, Any]] = {}
+        for n, kind, value in rows:
+            result.setdefault(n, {})[kind] = json.loads(value)
+        return result
+
+    def version(self, session_id):
+        row = self._connection().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def find(self, key, value):
+        rows = self._connection().execute(
+            "SELECT session_id FROM session_fields WHERE key = ? AND value = ?",
+            (key, json.dumps(value, ensure_ascii=False))
+        ).fetchall()
+        return [row[0] for row in rows]
+
+def create_session_store(kind: str, path: str) -> SessionStore:
+    """Build the configured session store"""
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore(path)
+    raise ValueError(f"Unknown session store: {kind}")
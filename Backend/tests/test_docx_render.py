@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from docx import Document
+
+from docx_render import content_hash, render_docx, report_docx_path, report_markdown_path
+
+REPORT = """# Title Report
+
+Survey **123/4** is held by
+*Ramaiah* since 1998.
+
+| Year | Owner |
+|------|-------|
+| 1998 | **Ramaiah** |
+| 1985 | Ningappa |
+
+- Mutation entry 55
+  - Order of the tahsildar
+1. Check the RTC
+
+---
+> Encumbrance certificate pending
+"""
+
+def render(tmp_path, markdown=REPORT):
+    path = str(tmp_path / "report.docx")
+    render_docx(markdown, path)
+    return Document(path)
+
+def test_headings_lists_and_quotes(tmp_path):
+    doc = render(tmp_path)
+    styled = [(p.style.name, p.text) for p in doc.paragraphs]
+
+    assert styled == [
+        ("Heading 1", "Title Report"),
+        ("Normal", "Survey 123/4 is held by Ramaiah since 1998."),
+        ("List Bullet", "Mutation entry 55"),
+        ("List Bullet 2", "Order of the tahsildar"),
+        ("List Number", "Check the RTC"),
+        ("Quote", "Encumbrance certificate pending"),
+    ]
+
+def test_emphasis_becomes_runs(tmp_path):
+    runs = [(run.text, run.bold, run.italic) for run in render(tmp_path).paragraphs[1].runs]
+
+    assert ("123/4", True, None) in runs
+    assert ("Ramaiah", None, True) in runs
+
+def test_tables(tmp_path):
+    table = render(tmp_path).tables[0]
+    cells = [[cell.text for cell in row.cells] for row in table.rows]
+
+    assert cells == [["Year", "Owner"], ["1998", "Ramaiah"], ["1985", "Ningappa"]]
+    assert all(run.bold for cell in table.rows[0].cells for run in cell.paragraphs[0].runs)
+    assert table.style.name == "Table Grid"
+
+def test_report_files_are_written_once_per_text(tmp_path):
+    directory = str(tmp_path / "outputs")
+    path = report_docx_path(REPORT, directory)
+    mtime = os.path.getmtime(path)
+
+    assert os.path.basename(path) == f"{content_hash(REPORT)}.docx"
+    assert report_docx_path(REPORT, directory) == path
+    assert os.path.getmtime(path) == mtime
+    assert report_docx_path(REPORT + "\nAddendum", directory) != path
+
+    with open(report_markdown_path(REPORT, directory), encoding="utf-8") as f:
+        assert f.read() == REPORT
+    assert [name for name in os.listdir(directory) if name.endswith(".tmp")] == []
+
+def test_threads_rendering_the_same_report(tmp_path):
+    path = str(tmp_path / "report.docx")
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: render_docx(REPORT, path), range(16)))
+        markdown_paths = set(pool.map(lambda _: report_markdown_path(REPORT, str(tmp_path)), range(16)))
+
+    assert Document(path).paragraphs[0].text == "Title Report"
+    assert len(markdown_paths) == 1
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
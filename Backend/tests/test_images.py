@@ -0,0 +1,67 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+import pytest
+from PIL import Image
+from starlette.requests import Request
+
+from images import derived_image_path, file_etag, not_modified
+
+@pytest.fixture
+def page_image(tmp_path):
+    path = str(tmp_path / "page_1.png")
+    Image.new("L", (1700, 2200), 255).save(path)
+    return path
+
+def request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_reduced_copy_is_made_once(page_image):
+    path = derived_image_path(page_image, "thumbnail")
+
+    with Image.open(path) as img:
+        assert img.format == "WEBP" and max(img.size) == 240
+    mtime = os.path.getmtime(path)
+    assert derived_image_path(page_image, "thumbnail") == path
+    assert os.path.getmtime(path) == mtime
+
+def test_reduced_copy_follows_a_new_source(page_image):
+    path = derived_image_path(page_image, "preview")
+    old = os.path.getmtime(path) - 10
+    os.utime(path, (old, old))
+
+    derived_image_path(page_image, "preview")
+
+    assert os.path.getmtime(path) > old
+    assert [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")] == []
+
+def test_threads_making_the_same_copy(page_image):
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda _: derived_image_path(page_image, "preview"), range(16)))
+
+    assert len(set(paths)) == 1
+    with Image.open(paths[0]) as img:
+        assert max(img.size) == 1024
+
+def test_etag_match(page_image):
+    etag = file_etag(page_image)
+    mtime = os.path.getmtime(page_image)
+
+    assert not_modified(request(if_none_match=etag), etag, mtime)
+    assert not_modified(request(if_none_match=f'"other", {etag}'), etag, mtime)
+    assert not_modified(request(if_none_match="*"), etag, mtime)
+    assert not not_modified(request(if_none_match='"other"'), etag, mtime)
+    assert not not_modified(request(), etag, mtime)
+
+def test_last_modified_match(page_image):
+    etag = file_etag(page_image)
+    mtime = os.path.getmtime(page_image)
+
+    assert not_modified(request(if_modified_since=formatdate(mtime, usegmt=True)), etag, mtime)
+    assert not not_modified(request(if_modified_since=formatdate(mtime - 60, usegmt=True)), etag, mtime)
+    assert not not_modified(request(if_modified_since="yesterday"), etag, mtime)
+    # An entity tag takes precedence over a date
+    assert not not_modified(request(if_none_match='"other"', if_modified_since=formatdate(mtime, usegmt=True)),
+                            etag, mtime)
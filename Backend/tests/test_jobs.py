@@ -0,0 +1,55 @@
+import pytest
+
+from jobs import JobQueue, QueueFullError
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"), max_queued=3)
+
+def test_claim_takes_most_urgent_job_first(queue):
+    queue.enqueue("a", "process_pdf", {"file_path": "a.pdf"}, priority=10)
+    queue.enqueue("b", "process_pdf", {"file_path": "b.pdf"}, priority=10)
+    queue.enqueue("c", "generate_report", {"client_name": "X"}, priority=0)
+
+    claimed = [queue.claim("w1") for _ in range(3)]
+
+    assert [job["session_id"] for job in claimed] == ["c", "a", "b"]
+    assert claimed[0]["args"] == {"client_name": "X"}
+    assert queue.claim("w1") is None
+
+def test_claimed_job_is_running_until_finished(queue):
+    queue.enqueue("a", "process_pdf", {}, priority=10)
+    job = queue.claim("w1")
+
+    assert queue.depth() == {"queued": 0, "running": 1}
+    queue.finish(job["job_id"], "done")
+    assert queue.depth() == {"queued": 0, "running": 0}
+
+def test_queue_full_rejects_new_jobs(queue):
+    for session_id in ("a", "b", "c"):
+        queue.enqueue(session_id, "process_pdf", {}, priority=10)
+
+    with pytest.raises(QueueFullError):
+        queue.enqueue("d", "process_pdf", {}, priority=10)
+
+    # Claiming makes room again
+    queue.claim("w1")
+    queue.enqueue("d", "process_pdf", {}, priority=10)
+
+def test_position_and_cancel(queue):
+    queue.enqueue("a", "process_pdf", {}, priority=10)
+    queue.enqueue("b", "process_pdf", {}, priority=10)
+    queue.enqueue("c", "generate_report", {}, priority=0)
+
+    assert [queue.position(s) for s in ("c", "a", "b")] == [1, 2, 3]
+    assert queue.cancel("a")
+    assert not queue.cancel("a")
+    assert queue.position("a") is None
+    assert queue.position("b") == 2
+
+def test_session_has_one_live_job(queue):
+    queue.enqueue("a", "process_pdf", {"attempt": 1}, priority=10)
+    queue.enqueue("a", "process_pdf", {"attempt": 2}, priority=10)
+
+    assert queue.depth()["queued"] == 1
+    assert queue.claim("w1")["args"] == {"attempt": 2}
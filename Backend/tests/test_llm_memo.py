@@ -0,0 +1,57 @@
+from llm_memo import OutputMemo
+from session_store import MemorySessionStore
+
+PARAMS = {"max_new_tokens": 2000}
+
+def make_store():
+    store = MemorySessionStore()
+    store.create("s1", {})
+    return store
+
+def test_key_depends_on_everything_that_shapes_the_output():
+    memo = OutputMemo(make_store(), "s1", "granite")
+    key = memo.key("Summarise", PARAMS, "page text")
+
+    assert key == memo.key("Summarise", dict(PARAMS), "page text")
+    assert key != memo.key("Summarise", PARAMS, "edited page text")
+    assert key != memo.key("Summarise", {"max_new_tokens": 1000}, "page text")
+    assert key != memo.key("Report", PARAMS, "page text")
+    assert key != OutputMemo(make_store(), "s1", "llama").key("Summarise", PARAMS, "page text")
+
+def test_outputs_are_reused_by_the_next_generation():
+    store = make_store()
+    first = OutputMemo(store, "s1", "granite")
+    key = first.key("Summarise", PARAMS, "chunk 1")
+    assert first.get(key) is None
+    first.put(key, "summary 1")
+    first.finish()
+
+    second = OutputMemo(store, "s1", "granite")
+
+    assert second.get(key) == "summary 1"
+    assert second.stats() == {"reused": 1, "generated": 0}
+
+def test_outputs_are_saved_before_the_report_finishes():
+    store = make_store()
+    memo = OutputMemo(store, "s1", "granite")
+    memo.put(memo.key("Summarise", PARAMS, "chunk 1"), "summary 1")
+
+    # An interrupted generation still leaves its outputs for the retry
+    assert OutputMemo(store, "s1", "granite").get(memo.key("Summarise", PARAMS, "chunk 1")) == "summary 1"
+
+def test_finish_drops_outputs_of_changed_chunks():
+    store = make_store()
+    first = OutputMemo(store, "s1", "granite")
+    old, kept = first.key("Summarise", PARAMS, "chunk 1"), first.key("Summarise", PARAMS, "chunk 2")
+    first.put(old, "summary 1")
+    first.put(kept, "summary 2")
+    first.finish()
+
+    second = OutputMemo(store, "s1", "granite")
+    second.get(kept)
+    second.put(second.key("Summarise", PARAMS, "chunk 1 edited"), "summary 1b")
+    second.finish()
+
+    outputs = store.get("s1", ["llm_outputs"])["llm_outputs"]
+    assert set(outputs.values()) == {"summary 1b", "summary 2"}
+    assert old not in outputs
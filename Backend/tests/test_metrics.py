@@ -0,0 +1,86 @@
+import pytest
+
+from metrics import Metrics, StageTimer
+from tracing import TraceRecorder, load_trace
+
+@pytest.fixture
+def metrics(tmp_path):
+    return Metrics(str(tmp_path / "metrics.db"), prefix="app_", flush_interval=60)
+
+def test_counters(metrics):
+    metrics.describe("pages_total", "Pages processed")
+    metrics.inc("pages_total", {"source": "ocr"})
+    metrics.inc("pages_total", {"source": "ocr"}, 2)
+    metrics.inc("pages_total", {"source": "text_layer"})
+
+    assert metrics.render().splitlines() == [
+        "# HELP app_pages_total Pages processed",
+        "# TYPE app_pages_total counter",
+        'app_pages_total{source="ocr"} 3',
+        'app_pages_total{source="text_layer"} 1',
+    ]
+
+def test_histogram_buckets_are_cumulative(metrics):
+    for value in (0.2, 3, 700):
+        metrics.observe("request_seconds", value, buckets=(1, 10))
+
+    assert metrics.render().splitlines() == [
+        "# TYPE app_request_seconds histogram",
+        'app_request_seconds_bucket{le="1"} 1',
+        'app_request_seconds_bucket{le="10"} 2',
+        'app_request_seconds_bucket{le="+Inf"} 3',
+        "app_request_seconds_count 3",
+        "app_request_seconds_sum 703.2",
+    ]
+
+def test_processes_share_totals(metrics):
+    other = Metrics(metrics.path, prefix="app_", flush_interval=60)
+    metrics.inc("jobs_total")
+    other.inc("jobs_total")
+
+    # Increments stay in memory until a flush, and render flushes its own
+    assert "app_jobs_total 1" in other.render()
+    metrics.flush()
+    assert "app_jobs_total 2" in other.render()
+
+def test_totals_of_a_counter(metrics):
+    other = Metrics(metrics.path, prefix="app_", flush_interval=60)
+    metrics.inc("cache_lookups_total", {"cache": "ocr", "result": "hit"})
+    other.inc("cache_lookups_total", {"cache": "ocr", "result": "hit"})
+    other.inc("cache_lookups_total", {"cache": "ocr", "result": "miss"})
+    other.flush()
+
+    assert sorted(metrics.totals("cache_lookups_total"), key=lambda t: t[0]["result"]) == [
+        ({"cache": "ocr", "result": "hit"}, 2),
+        ({"cache": "ocr", "result": "miss"}, 1),
+    ]
+    assert metrics.totals("jobs_total") == []
+
+def test_gauges_and_label_escaping(metrics):
+    text = metrics.render([("queue_depth", "Jobs waiting", {"queue": 'a"b\\c'}, 4)])
+
+    assert "# HELP app_queue_depth Jobs waiting" in text
+    assert 'app_queue_depth{queue="a\\"b\\\\c"} 4' in text
+
+def test_stage_timer(metrics):
+    timer = StageTimer(metrics, "process", totals={"ocr": {"seconds": 1.0, "count": 1}})
+    timer.add("ocr", 0.5)
+    with timer.stage("translate"):
+        pass
+
+    assert timer.snapshot()["ocr"] == {"seconds": 1.5, "count": 2}
+    assert timer.snapshot()["translate"]["count"] == 1
+    assert 'app_stage_seconds_count{job="process",stage="translate"} 1' in metrics.render()
+
+def test_stage_timer_records_spans(metrics, tmp_path):
+    trace = TraceRecorder(str(tmp_path / "trace.jsonl"), "worker")
+    timer = StageTimer(metrics, "process", trace=trace)
+    timer.add("ocr", 0.5, 1000.0, page=2)
+    with timer.stage("translate", page=2):
+        pass
+    trace.flush()
+
+    spans = [e for e in load_trace(trace.path)["traceEvents"] if e["ph"] == "X"]
+    assert [(e["name"], e["cat"], e["args"]) for e in spans] == [("ocr", "process", {"page": 2}),
+                                                                  ("translate", "process", {"page": 2})]
+    assert spans[0]["ts"] == 1000000000
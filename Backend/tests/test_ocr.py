@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+import ocr
+from ocr import PREPROCESS_PROFILES, choose_profile, page_content, preprocess_image, profile_cache_params
+
+def page(ink=0, paper=255, noise=0.0, lines=30):
+    """A grayscale page of text-like lines"""
+    gray = np.full((1100, 850), paper, dtype=np.uint8)
+    for n in range(lines):
+        cv2.putText(gray, "Survey No 123/4 RTC extract", (60, 60 + 33 * n), cv2.FONT_HERSHEY_SIMPLEX, 1.0, ink, 3)
+    if noise:
+        rng = np.random.default_rng(0)
+        gray = np.clip(gray + rng.normal(0, noise, gray.shape), 0, 255).astype(np.uint8)
+    return gray
+
+def test_clean_page_uses_fast_profile():
+    assert choose_profile(page()) == "fast"
+    assert choose_profile(page(), source_dpi=300) == "fast"
+
+def test_noisy_page_uses_accurate_profile():
+    assert choose_profile(page(noise=25)) == "accurate"
+
+def test_faded_page_uses_accurate_profile():
+    assert choose_profile(page(ink=180, paper=230)) == "accurate"
+
+def test_low_resolution_source_uses_accurate_profile():
+    assert choose_profile(page(), source_dpi=150) == "accurate"
+
+def test_profiles_produce_a_binary_image():
+    for profile in PREPROCESS_PROFILES:
+        processed = np.array(preprocess_image(Image.fromarray(page()), profile))
+        assert processed.shape == (1650, 1275)
+        assert set(np.unique(processed)) <= {0, 255}
+
+def test_auto_cache_params_cover_every_profile():
+    assert profile_cache_params("fast") == PREPROCESS_PROFILES["fast"]
+    assert profile_cache_params("auto")["profiles"] == PREPROCESS_PROFILES
+
+def test_auto_cache_params_depend_on_source_dpi():
+    # The same pixels can get a different profile from a low-resolution source
+    assert profile_cache_params("auto", 150) != profile_cache_params("auto", 300)
+    assert profile_cache_params("fast", 150) == profile_cache_params("fast", 300)
+
+def test_blank_page():
+    gray = np.full((1100, 850), 245, dtype=np.uint8)
+    # Dark scanner edges are outside the sampled area
+    gray[:, :20] = 0
+    gray[-30:, :] = 0
+
+    assert page_content(gray)["content"] == "blank"
+
+def test_page_with_only_a_stamp_is_near_blank():
+    gray = np.full((1100, 850), 245, dtype=np.uint8)
+    cv2.circle(gray, (600, 900), 60, 40, 4)
+
+    result = page_content(gray)
+    assert result["content"] == "near_blank"
+    assert result["text_lines"] == 1
+
+def test_page_of_text():
+    result = page_content(page())
+
+    assert result["content"] == "text"
+    assert result["text_lines"] >= 20
+
+def test_pytesseract_page_text_comes_from_image_to_string(monkeypatch):
+    runs = []
+    monkeypatch.setattr(ocr.pytesseract, "image_to_string", lambda image, lang: runs.append("string") or "Survey 12\n\nOwner\n")
+    monkeypatch.setattr(ocr.pytesseract, "image_to_data", lambda image, lang, output_type: runs.append("data") or {
+        "text": ["", "Survey", "12", "Owner"], "conf": ["-1", "91.5", "40", "88"]
+    })
+    engine = ocr.PytesseractEngine()
+
+    assert engine.recognize(Image.new("L", (10, 10))) == ("Survey 12\n\nOwner\n", [])
+    assert runs == ["string"]
+
+    text, words = engine.recognize(Image.new("L", (10, 10)), with_confidences=True)
+    assert text == "Survey 12\n\nOwner\n"
+    assert words == [{"text": "Survey", "confidence": 91.5}, {"text": "12", "confidence": 40.0},
+                     {"text": "Owner", "confidence": 88.0}]
+
+def test_confidences_are_opt_in_with_pytesseract(monkeypatch):
+    monkeypatch.setattr(ocr, "_engine", ocr.PytesseractEngine())
+
+    monkeypatch.setattr(ocr, "OCR_CONFIDENCES", "auto")
+    assert not ocr.confidences_enabled()
+    monkeypatch.setattr(ocr, "OCR_CONFIDENCES", "true")
+    assert ocr.confidences_enabled()
+
+    monkeypatch.setattr(ocr, "_engine", type("Tesserocr", (ocr.OCREngine,), {"name": "tesserocr"})())
+    monkeypatch.setattr(ocr, "OCR_CONFIDENCES", "auto")
+    assert ocr.confidences_enabled()
+    monkeypatch.setattr(ocr, "OCR_CONFIDENCES", "false")
+    assert not ocr.confidences_enabled()
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from ocr_cache import OCRCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return OCRCache(str(tmp_path / "ocr"), max_bytes=1000)
+
+def key(n):
+    return OCRCache.make_key(f"pixels-{n}", {"scale": 1.5}, "kan+eng", "5.3.0")
+
+def age(cache, k, seconds_ago):
+    path = cache._path(k)
+    mtime = os.path.getmtime(path) - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+def test_key_covers_every_input():
+    base = OCRCache.make_key("abc", {"scale": 1.5}, "kan+eng", "5.3.0")
+
+    assert base == OCRCache.make_key("abc", {"scale": 1.5}, "kan+eng", "5.3.0")
+    assert len({
+        base,
+        OCRCache.make_key("abd", {"scale": 1.5}, "kan+eng", "5.3.0"),
+        OCRCache.make_key("abc", {"scale": 2.0}, "kan+eng", "5.3.0"),
+        OCRCache.make_key("abc", {"scale": 1.5}, "eng", "5.3.0"),
+        OCRCache.make_key("abc", {"scale": 1.5}, "kan+eng", "5.4.0"),
+    }) == 5
+
+def test_hits_and_misses_are_counted(cache):
+    assert cache.get(key(1)) is None
+    cache.put(key(1), "ಪಹಣಿ text")
+
+    assert cache.get(key(1)) == "ಪಹಣಿ text"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["size_bytes"] == len("ಪಹಣಿ text".encode("utf-8"))
+
+def test_entry_evicted_right_after_reading_is_a_hit(cache, monkeypatch):
+    cache.put(key(1), "text")
+
+    def evicted(path, *args):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr("ocr_cache.os.utime", evicted)
+    assert cache.get(key(1)) == "text"
+    assert cache.stats()["hits"] == 1
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for n in range(4):
+        cache.put(key(n), "x" * 200)
+        age(cache, key(n), 100 - n)
+    # Reading entry 0 makes it the most recently used
+    assert cache.get(key(0)) == "x" * 200
+
+    cache.put(key(4), "x" * 200)
+    cache.put(key(5), "x" * 200)
+
+    assert cache.get(key(1)) is None and cache.get(key(2)) is None
+    assert all(cache.get(key(n)) for n in (0, 3, 4, 5))
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["size_bytes"] <= 900
+
+def test_lookups_and_evictions_are_reported(tmp_path):
+    lookups, evictions = [], []
+    cache = OCRCache(str(tmp_path / "ocr"), max_bytes=500, on_lookup=lookups.append, on_evict=evictions.append)
+    cache.get(key(1))
+    for n in range(3):
+        cache.put(key(n), "x" * 200)
+    cache.get(key(2))
+
+    assert lookups == [False, True]
+    assert evictions == [1]
+
+def test_shared_directory(cache):
+    cache.put(key(1), "text")
+    other = OCRCache(cache.directory, cache.max_bytes)
+
+    assert other.get(key(1)) == "text"
+    assert not [name for _, _, files in os.walk(cache.directory) for name in files if name.endswith(".tmp")]
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = OCRCache(str(tmp_path / "ocr"), max_bytes=0)
+    cache.put(key(1), "text")
+
+    assert cache.get(key(1)) is None
+    assert cache.stats()["misses"] == 0
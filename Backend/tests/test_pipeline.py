@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from pipeline import Pipeline, PipelineError
+
+def test_every_item_reaches_the_sink():
+    def slow_double(n):
+        # Later items finish first, so the sink sees them out of order
+        time.sleep(0.01 * (5 - n % 5))
+        return n * 2
+
+    pipeline = Pipeline([("double", slow_double, 4), ("inc", lambda n: n + 1, 2)], queue_size=2)
+    results = []
+    pipeline.run(range(20), results.append)
+
+    assert sorted(results) == [n * 2 + 1 for n in range(20)]
+
+def test_single_worker_stages_keep_source_order():
+    pipeline = Pipeline([("a", lambda n: n, 1), ("b", lambda n: n, 1)])
+    results = []
+    pipeline.run(range(50), results.append)
+
+    assert results == list(range(50))
+
+def test_stage_error_stops_the_pipeline():
+    def fail_on_three(n):
+        if n == 3:
+            raise ValueError("bad page")
+        return n
+
+    results = []
+    with pytest.raises(PipelineError, match="check stage failed: bad page") as info:
+        Pipeline([("check", fail_on_three, 2)]).run(range(1000), results.append)
+
+    assert isinstance(info.value.__cause__, ValueError)
+    assert len(results) < 1000
+
+def test_source_error_is_reported():
+    def source():
+        yield 1
+        raise OSError("unreadable PDF")
+
+    with pytest.raises(PipelineError, match="render stage failed"):
+        Pipeline([("noop", lambda n: n, 1)]).run(source(), lambda n: None, source_name="render")
+
+def test_monitor_sees_every_item():
+    seen = []
+    Pipeline([("noop", lambda n: n, 1)], monitor=lambda stage, depth: seen.append(stage)).run(range(5), lambda n: None)
+
+    assert seen == ["noop"] * 5
@@ -0,0 +1,57 @@
+from report_planner import estimate_tokens, format_chunk, input_budget, pack_texts, plan_chunks
+
+def pages(count, words=50):
+    return {f"Page {n}": " ".join(f"word{n}" for _ in range(words)) for n in range(1, count + 1)}
+
+def test_kannada_costs_more_than_english():
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("ಕನ್ನಡ") == 5
+
+def test_budget_leaves_room_for_prompt_and_output():
+    budget = input_budget(8192, "x" * 400, 2000)
+
+    assert budget < 8192 - 2000 - 100
+    assert input_budget(100, "x" * 4000, 2000) == 1
+
+def test_chunks_fit_the_budget_and_keep_page_order():
+    doc = pages(20)
+    chunks = plan_chunks(doc, 400)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(format_chunk(chunk)) <= 400 for chunk in chunks)
+    assert [key for chunk in chunks for key in chunk] == list(doc)
+
+def test_blank_pages_are_left_out():
+    doc = {"Page 1": "text", "Page 2": "  ", "Page 3": "more"}
+
+    assert plan_chunks(doc, 400) == [{"Page 1": "text", "Page 3": "more"}]
+
+def test_oversized_page_is_split_into_parts():
+    chunks = plan_chunks({"Page 1": "\n\n".join("paragraph " * 40 for _ in range(10))}, 300)
+
+    assert [list(chunk) for chunk in chunks] == [[f"Page 1 (part {k})"] for k in range(1, len(chunks) + 1)]
+    assert all(estimate_tokens(format_chunk(chunk)) <= 300 for chunk in chunks)
+
+def test_edit_changes_only_its_own_chunk():
+    doc = pages(20)
+    previous = [list(chunk) for chunk in plan_chunks(doc, 400)]
+
+    # A shorter page would let a fresh plan shift every boundary after it
+    edited = {**doc, "Page 2": "short"}
+    chunks = plan_chunks(edited, 400, previous)
+
+    assert [list(chunk) for chunk in chunks] == previous
+    changed = [chunk for chunk in chunks if chunk != {k: doc[k] for k in chunk}]
+    assert len(changed) == 1 and "Page 2" in changed[0]
+
+def test_previous_plan_is_dropped_when_it_no_longer_fits():
+    doc = pages(6)
+    previous = [list(chunk) for chunk in plan_chunks(doc, 400)]
+    grown = {**doc, "Page 1": doc["Page 1"] * 10}
+
+    assert [list(chunk) for chunk in plan_chunks(grown, 400, previous)] != previous
+
+def test_pack_texts():
+    groups = pack_texts(["a" * 400] * 5, 250)
+
+    assert groups == [["a" * 400, "a" * 400]] * 2 + [["a" * 400]]
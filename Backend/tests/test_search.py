@@ -0,0 +1,55 @@
+import pytest
+
+from search import SearchIndex, build_query
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.index_page("s1", 1, {
+        "extracted_pages": "ಪಹಣಿ ಸರ್ವೆ ನಂಬರ್ 123/4",
+        "translated_pages": "RTC survey number 123/4, owner Ramaiah"
+    })
+    index.index_page("s1", 2, {"translated_pages": "Mutation register entry for survey 55"})
+    index.index_page("s2", 1, {"translated_pages": "Sale deed by Ramesh, survey 123/4"})
+    return index
+
+def test_query_terms_are_quoted():
+    assert build_query('owner AND "sale deed" rama*') == '"owner" "AND" "sale deed" "rama" *'
+
+def test_query_syntax_cannot_leak_through():
+    # Quotes, column filters and operators are all searched as plain text
+    assert build_query('text: NEAR( "a" ^b') == '"text:" "NEAR(" "a" "^b"'
+    assert build_query('" *') == ""
+
+def test_every_term_must_match(index):
+    assert {(h["session_id"], h["page_number"]) for h in index.search("survey 123/4")} == {("s1", 1), ("s2", 1)}
+    assert [h["session_id"] for h in index.search("survey ramaiah")] == ["s1"]
+
+def test_terms_must_match_within_one_kind(index):
+    # ಪಹಣಿ is only in the extracted text of s1 page 1, Ramaiah only in its translation
+    assert index.search("ಪಹಣಿ Ramaiah") == []
+
+def test_hits_are_pages_with_a_snippet_per_kind(index):
+    hits = index.search("123/4", session_id="s1")
+
+    assert len(hits) == 1
+    assert set(hits[0]["matches"]) == {"extracted", "translated"}
+    assert "[123/4]" in hits[0]["matches"]["translated"]
+
+def test_kannada_words_and_prefixes(index):
+    assert index.search("ಸರ್ವೆ")[0]["matches"]["extracted"].startswith("ಪಹಣಿ [ಸರ್ವೆ]")
+    assert [h["session_id"] for h in index.search("rame*")] == ["s2"]
+
+def test_reindexing_replaces_text(index):
+    index.index_page("s1", 2, {"edited_pages": "Mutation entry corrected by reviewer"})
+    assert index.search("reviewer")[0]["matches"] == {"edited": "Mutation entry corrected by [reviewer]"}
+
+    index.index_page("s1", 2, {"edited_pages": None})
+    assert index.search("reviewer") == []
+    assert index.is_indexed("s1") and not index.is_indexed("s3")
+
+def test_kind_filter_and_paging(index):
+    assert index.search("123/4", kinds=["extracted"])[0]["matches"] == {"extracted": "ಪಹಣಿ ಸರ್ವೆ ನಂಬರ್ [123/4]"}
+    first, second = index.search("survey", limit=2), index.search("survey", limit=2, offset=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not {(h["session_id"], h["page_number"]) for h in first} & {(h["session_id"], h["page_number"]) for h in second}
@@ -0,0 +1,83 @@
+import pytest
+
+from session_store import MemorySessionStore, SQLiteSessionStore, create_session_store
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return create_session_store(request.param, str(tmp_path / "sessions.db"))
+
+def test_create_store_by_name(tmp_path):
+    assert isinstance(create_session_store("memory", ""), MemorySessionStore)
+    assert isinstance(create_session_store("sqlite", str(tmp_path / "s.db")), SQLiteSessionStore)
+    with pytest.raises(ValueError):
+        create_session_store("redis", "")
+
+def test_fields(store):
+    assert store.get("s1") is None
+    assert not store.exists("s1")
+
+    store.create("s1", {"status": "queued", "progress": 0.0})
+    store.update("s1", {"status": "processing", "message": "Working"})
+
+    assert store.exists("s1")
+    assert store.get("s1", ["status", "progress"]) == {"status": "processing", "progress": 0.0}
+    assert store.get("s1")["message"] == "Working"
+    assert store.find("status", "processing") == ["s1"]
+
+def test_increment_and_compare_and_set(store):
+    store.create("s1", {"processed_pages": 0, "status": "queued"})
+
+    assert store.increment("s1", "processed_pages") == 1
+    assert store.increment("s1", "processed_pages", 2) == 3
+
+    assert store.compare_and_set("s1", "status", "queued", "processing")
+    assert not store.compare_and_set("s1", "status", "queued", "processing")
+    assert store.get("s1", ["status"]) == {"status": "processing"}
+
+def test_version_changes_on_every_write(store):
+    store.create("s1", {})
+    first = store.version("s1")
+    store.update("s1", {"status": "processing"})
+    second = store.version("s1")
+    store.set_page("s1", 1, {"extracted_pages": "text"})
+
+    assert first != second != store.version("s1")
+
+def test_pages_are_returned_in_page_order(store):
+    store.create("s1", {})
+    for n in (10, 2, 1):
+        store.set_page("s1", n, {"extracted_pages": f"raw {n}", "page_info": {"source": "ocr"}})
+
+    assert list(store.get_pages("s1", "extracted_pages")) == ["Page 1", "Page 2", "Page 10"]
+    assert store.page_numbers("s1", "extracted_pages") == [1, 2, 10]
+    assert store.get_page("s1", "page_info", 10) == {"source": "ocr"}
+    assert store.get_page("s1", "page_info", 3) is None
+
+def test_keep_existing_preserves_edits(store):
+    store.create("s1", {})
+    store.set_page("s1", 1, {"translated_pages": "machine", "edited_pages": "reviewer"})
+    store.set_page("s1", 1, {"translated_pages": "machine v2", "edited_pages": "machine v2"},
+                   keep_existing=("edited_pages",))
+    store.set_page("s1", 2, {"edited_pages": "new page"}, keep_existing=("edited_pages",))
+
+    assert store.get_page("s1", "translated_pages", 1) == "machine v2"
+    assert store.get_page("s1", "edited_pages", 1) == "reviewer"
+    assert store.get_page("s1", "edited_pages", 2) == "new page"
+
+def test_page_range(store):
+    store.create("s1", {})
+    for n in range(1, 6):
+        store.set_page("s1", n, {"extracted_pages": f"raw {n}", "translated_pages": f"en {n}"})
+    store.set_page("s1", 7, {"extracted_pages": "raw 7"})
+
+    pages = store.get_page_range("s1", ["extracted_pages", "translated_pages"], 4, 8)
+
+    assert list(pages) == [4, 5, 7]
+    assert pages[4] == {"extracted_pages": "raw 4", "translated_pages": "en 4"}
+    assert pages[7] == {"extracted_pages": "raw 7"}
+
+def test_sqlite_store_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SQLiteSessionStore(path).create("s1", {"status": "queued"})
+
+    assert SQLiteSessionStore(path).get("s1", ["status"]) == {"status": "queued"}
@@ -0,0 +1,57 @@
+import fitz
+
+from text_layer import classify_page
+
+LINE = "Survey number 123/4, extent 2 acres 10 guntas, owner Ramaiah"
+
+def make_page(lines=(), image_rect=None):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    if image_rect is not None:
+        pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 100, 100), False)
+        pix.clear_with(200)
+        page.insert_image(fitz.Rect(image_rect), pixmap=pix)
+    for n, line in enumerate(lines):
+        page.insert_text((50, 60 + 16 * n), line, fontsize=11)
+    return doc, page
+
+def test_born_digital_page_uses_its_text():
+    doc, page = make_page([LINE] * 5)
+    usable, text, info = classify_page(page)
+
+    assert usable and info["reason"] == "text_layer"
+    assert text.count("Ramaiah") == 5
+
+def test_page_without_text_needs_ocr():
+    doc, page = make_page(["p. 3"])
+
+    assert classify_page(page)[2]["reason"] == "no_text_layer"
+
+def test_scan_with_a_hidden_text_layer_needs_ocr():
+    doc, page = make_page([LINE] * 5, image_rect=(0, 0, 595, 842))
+    usable, text, info = classify_page(page)
+
+    assert not usable and text == ""
+    assert info["reason"] == "scanned" and info["image_coverage"] == 1.0
+
+def test_garbled_text_needs_ocr():
+    # Legacy Kannada encodings extract as accented Latin letters
+    doc, page = make_page(["ÀÁÂÃÄÅ ÆÇÈÉ ÊËÌÍ ÎÏÐÑ " * 3] * 3)
+
+    assert classify_page(page)[2]["reason"] == "garbled"
+
+def test_typed_form_around_a_scanned_extract_needs_ocr():
+    # The typed header is real text, but the pasted scan is only readable by OCR
+    doc, page = make_page([LINE] * 3, image_rect=(0, 200, 595, 600))
+    usable, _, info = classify_page(page)
+
+    assert not usable
+    assert info["reason"] == "mixed"
+
+def test_image_strips_add_up():
+    doc, page = make_page([LINE] * 5)
+    for top in range(0, 842, 100):
+        pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 10, 10), False)
+        page.insert_image(fitz.Rect(0, top, 595, top + 90), pixmap=pix)
+
+    assert classify_page(page)[2]["reason"] == "scanned"
@@ -0,0 +1,70 @@
+import json
+import os
+import threading
+
+from tracing import TraceRecorder, load_trace
+
+def events(path):
+    return load_trace(path)["traceEvents"]
+
+def test_spans_carry_process_and_thread(tmp_path):
+    path = str(tmp_path / "traces" / "s1.jsonl")
+    trace = TraceRecorder(path, "api")
+    trace.span("render", "process", 1000.0, 0.25, page=3)
+    trace.flush()
+
+    meta, span = events(path)[0], events(path)[-1]
+    assert meta == {"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0,
+                    "args": {"name": f"api {os.getpid()}"}}
+    assert span == {"name": "render", "cat": "process", "ph": "X", "ts": 1000000000, "dur": 250000,
+                    "pid": os.getpid(), "tid": threading.get_ident(), "args": {"page": 3}}
+
+def test_threads_are_named_once(tmp_path):
+    path = str(tmp_path / "s1.jsonl")
+    trace = TraceRecorder(path, "worker")
+    trace.span("ocr", "process", 1.0, 0.1)
+    trace.span("ocr", "process", 2.0, 0.1)
+    trace.span("tesseract", "process", 1.0, 0.1, pid=4242, tid=7, thread_name="ocr-0", process_name="ocr pool")
+    trace.flush()
+
+    names = [(e["name"], e["pid"], e["args"]["name"]) for e in events(path) if e["ph"] == "M"]
+    assert names == [
+        ("process_name", os.getpid(), f"worker {os.getpid()}"),
+        ("thread_name", os.getpid(), threading.current_thread().name),
+        ("process_name", 4242, "ocr pool 4242"),
+        ("thread_name", 4242, "ocr-0"),
+    ]
+
+def test_async_spans_pair_up(tmp_path):
+    path = str(tmp_path / "s1.jsonl")
+    trace = TraceRecorder(path, "worker")
+    trace.async_span("page 1", "page", 10.0, 2.0, span_id=1, source="ocr")
+    trace.flush()
+
+    begin, end = events(path)[1:]
+    assert (begin["ph"], end["ph"], begin["id"], end["id"]) == ("b", "e", "1", "1")
+    assert end["ts"] - begin["ts"] == 2000000
+
+def test_full_buffer_is_written_and_resumed_jobs_append(tmp_path):
+    path = str(tmp_path / "s1.jsonl")
+    trace = TraceRecorder(path, "worker", flush_every=3)
+    for n in range(3):
+        trace.span("translate", "process", n, 0.1)
+    # The process and thread names count towards the batch
+    assert len(events(path)) == 3
+    trace.flush()
+    assert len(events(path)) == 5
+
+    resumed = TraceRecorder(path, "worker")
+    resumed.span("report", "report", 10, 1)
+    resumed.flush()
+    assert [e["name"] for e in events(path)][-1] == "report"
+
+def test_cut_off_line_is_skipped(tmp_path):
+    path = str(tmp_path / "s1.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "ocr", "ph": "X"}) + '\n{"name": "transl')
+
+    trace = load_trace(path)
+    assert trace["traceEvents"] == [{"name": "ocr", "ph": "X"}]
+    assert trace["displayTimeUnit"] == "ms"
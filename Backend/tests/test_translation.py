@@ -0,0 +1,78 @@
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from translation import LocalTranslationProvider, TranslationService, create_provider, split_paragraphs
+
+class UpperProvider(LocalTranslationProvider):
+    def translate_batch(self, texts, src, dest):
+        super().translate_batch(texts, src, dest)
+        return [text.upper() for text in texts]
+
+def service(provider, **kwargs):
+    return TranslationService(provider, rate_limit=0, batch_wait=0.01, **kwargs)
+
+def test_translates_page_paragraph_by_paragraph():
+    result = service(UpperProvider()).translate("first para\n\n\nsecond\npara")
+
+    assert result == "FIRST PARA\n\nSECOND\nPARA"
+
+def test_repeated_paragraphs_are_translated_once():
+    provider = UpperProvider()
+    lookups = []
+    translator = service(provider, on_lookup=lookups.append)
+
+    translator.translate("header\n\nbody one")
+    translator.translate("header\n\nbody two")
+
+    stats = translator.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+    assert lookups == [False, False, True, False]
+    # Whitespace differences share a cache entry
+    assert translator.translate("body   one") == "BODY ONE"
+    assert translator.stats()["hits"] == 2
+
+def test_paragraphs_of_concurrent_pages_share_a_request():
+    provider = UpperProvider()
+    translator = TranslationService(provider, rate_limit=0, batch_wait=0.2)
+
+    assert translator.translate("\n\n".join(f"paragraph {n}" for n in range(10))).count("PARAGRAPH") == 10
+    assert provider.requests == 1
+
+def test_provider_errors_fail_the_page():
+    class Broken(LocalTranslationProvider):
+        def translate_batch(self, texts, src, dest):
+            raise ConnectionError("offline")
+
+    outcomes = []
+    translator = service(Broken(), retries=0, on_request=lambda seconds, ok: outcomes.append(ok))
+
+    with pytest.raises(ConnectionError, match="offline"):
+        translator.translate("one\n\ntwo")
+    assert outcomes == [False]
+    assert translator.stats()["failures"] == 1
+
+def test_short_provider_response_fails_every_paragraph():
+    class Short(LocalTranslationProvider):
+        def translate_batch(self, texts, src, dest):
+            return texts[:1]
+
+    translator = service(Short(), retries=0, timeout=5)
+
+    with pytest.raises(ValueError, match="1 translations for 3 texts"):
+        translator.translate("a\n\nb\n\nc")
+    assert not translator.inflight
+
+def test_slow_provider_times_out():
+    translator = service(LocalTranslationProvider(latency=1), timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        translator.translate("one")
+
+def test_create_provider():
+    assert isinstance(create_provider("local"), LocalTranslationProvider)
+    with pytest.raises(ValueError):
+        create_provider("babelfish")
+
+def test_split_paragraphs_drops_blank_ones():
+    assert split_paragraphs("a\n\n \n\nb\nc\n\n") == ["a", "b\nc"]
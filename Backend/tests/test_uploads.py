@@ -0,0 +1,104 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+import uploads as uploads_module
+from uploads import ChunkedUploads, UploadError, save_stream
+
+DATA = bytes(range(256)) * 40
+
+@pytest.fixture
+def uploads(tmp_path):
+    return ChunkedUploads(str(tmp_path / "partial"), max_bytes=len(DATA) * 2, chunk_size=4096)
+
+def test_upload_in_parts(uploads, tmp_path):
+    upload_id = uploads.create("deed.pdf", len(DATA), hashlib.sha256(DATA).hexdigest())["upload_id"]
+    offset = 0
+    for start in range(0, len(DATA), 3000):
+        offset = uploads.append(upload_id, offset, DATA[start:start + 3000])
+
+    path, filename, digest = uploads.complete(upload_id, str(tmp_path / "deed.pdf"))
+
+    assert filename == "deed.pdf"
+    assert digest == hashlib.sha256(DATA).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+
+def test_resume_in_another_process(uploads, tmp_path):
+    upload_id = uploads.create("deed.pdf", len(DATA))["upload_id"]
+    uploads.append(upload_id, 0, DATA[:5000])
+
+    # A fresh instance has no running hash and rebuilds it from the stored prefix
+    resumed = ChunkedUploads(uploads.directory, uploads.max_bytes, uploads.chunk_size)
+    offset = resumed.status(upload_id)["offset"]
+    resumed.append(upload_id, offset, DATA[offset:])
+
+    assert resumed.complete(upload_id, str(tmp_path / "out.pdf"))[2] == hashlib.sha256(DATA).hexdigest()
+
+def test_offset_mismatch_is_rejected(uploads):
+    upload_id = uploads.create("deed.pdf", len(DATA))["upload_id"]
+    uploads.append(upload_id, 0, DATA[:100])
+
+    with pytest.raises(UploadError, match="upload is at 100"):
+        uploads.append(upload_id, 0, DATA[:100])
+    with pytest.raises(UploadError, match="past the declared upload size"):
+        uploads.append(upload_id, 100, DATA * 2)
+    assert uploads.status(upload_id)["offset"] == 100
+
+@pytest.mark.skipif(uploads_module.fcntl is None, reason="needs flock")
+def test_part_sent_to_two_processes_is_appended_once(uploads):
+    upload_id = uploads.create("deed.pdf", len(DATA))["upload_id"]
+    # Separate instances share nothing in memory, like two API processes
+    instances = [ChunkedUploads(uploads.directory, uploads.max_bytes, uploads.chunk_size) for _ in range(4)]
+    start = threading.Barrier(len(instances))
+    outcomes = []
+
+    def send(instance):
+        start.wait()
+        try:
+            outcomes.append(instance.append(upload_id, 0, DATA[:5000]))
+        except UploadError:
+            outcomes.append("rejected")
+
+    threads = [threading.Thread(target=send, args=(instance,)) for instance in instances]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes, key=str) == [5000] + ["rejected"] * 3
+    assert uploads.status(upload_id)["offset"] == 5000
+
+def test_incomplete_and_corrupted_uploads(uploads, tmp_path):
+    upload_id = uploads.create("deed.pdf", len(DATA), "0" * 64)["upload_id"]
+    uploads.append(upload_id, 0, DATA[:10])
+    with pytest.raises(UploadError, match="incomplete"):
+        uploads.complete(upload_id, str(tmp_path / "out.pdf"))
+
+    uploads.append(upload_id, 10, DATA[10:])
+    with pytest.raises(UploadError, match="Checksum mismatch"):
+        uploads.complete(upload_id, str(tmp_path / "out.pdf"))
+    with pytest.raises(KeyError):
+        uploads.status(upload_id)
+
+def test_size_limit(uploads):
+    with pytest.raises(UploadError, match="limit"):
+        uploads.create("huge.pdf", uploads.max_bytes + 1)
+
+def test_upload_ids_cannot_traverse_paths(uploads):
+    for upload_id in ("../../etc/passwd", "..", "a/b"):
+        with pytest.raises(UploadError, match="Invalid upload id"):
+            uploads.status(upload_id)
+    # Client-supplied names are reduced to their base name
+    assert uploads.create("../../evil.pdf", 10)["filename"] == "evil.pdf"
+
+def test_save_stream_enforces_limit(tmp_path):
+    path = str(tmp_path / "file.pdf")
+    assert save_stream(io.BytesIO(DATA), path, len(DATA)) == (len(DATA), hashlib.sha256(DATA).hexdigest())
+
+    with pytest.raises(UploadError):
+        save_stream(io.BytesIO(DATA), path, len(DATA) - 1)
+    assert not os.path.exists(path)
@@ -0,0 +1,153 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from watsonx import WatsonXClient, WatsonXError
+
+class MockWatsonX(BaseHTTPRequestHandler):
+    """IAM and generation endpoints; the server's settings control failures"""
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.calls.append(self.path)
+            fail = server.failures > 0
+            if fail:
+                server.failures -= 1
+
+        if self.path == "/token":
+            self._json(200, {"access_token": f"token-{len(server.calls)}", "expires_in": 3600})
+            return
+        if self.headers.get("Authorization", "").split()[-1] in server.revoked:
+            self._json(401, {"errors": ["expired"]})
+            return
+        if fail:
+            self._json(503, {"errors": ["busy"]})
+            return
+
+        prompt = json.loads(body)["input"]
+        if prompt == "bad":
+            self._json(400, {"errors": ["invalid input"]})
+            return
+        if self.path == "/generate":
+            self._json(200, {"results": [{"generated_text": prompt.upper()}]})
+            return
+
+        # Streaming endpoint: one server-sent event per word
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for word in prompt.upper().split():
+            event = {"results": [{"generated_text": word + " "}]}
+            self.wfile.write(f"id: 1\nevent: message\ndata: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockWatsonX)
+    server.lock = threading.Lock()
+    server.calls = []
+    server.failures = 0
+    server.revoked = set()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def client_for(server, **kwargs):
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return WatsonXClient("key", "project", "model", f"{base}/token", f"{base}/generate",
+                         stream_url=f"{base}/stream", **kwargs)
+
+def test_token_is_fetched_once(server):
+    client = client_for(server)
+
+    assert client.generate("one") == "ONE"
+    assert client.generate("two") == "TWO"
+    assert server.calls == ["/token", "/generate", "/generate"]
+
+def test_revoked_token_is_refreshed(server):
+    client = client_for(server)
+    client.generate("one")
+    server.revoked.add(client.token)
+
+    assert client.generate("two") == "TWO"
+    assert server.calls.count("/token") == 2
+
+def test_transient_errors_are_retried(server, monkeypatch):
+    monkeypatch.setattr(WatsonXClient, "_backoff", lambda self, attempt, response=None: 0)
+    outcomes = []
+    client = client_for(server, retries=2, on_request=lambda seconds, ok: outcomes.append(ok))
+    client.access_token()
+    server.failures = 2
+
+    assert client.generate("busy") == "BUSY"
+    assert client.stats()["retried"] == 2
+    assert outcomes == [True, False, False, True]
+
+    server.failures = 3
+    with pytest.raises(WatsonXError, match="HTTP 503"):
+        client.generate("busy")
+
+def test_client_errors_are_not_retried(server):
+    client = client_for(server)
+
+    with pytest.raises(WatsonXError, match="HTTP 400"):
+        client.generate("bad")
+    assert server.calls == ["/token", "/generate"]
+
+def test_stream_reports_text_so_far(server):
+    partials = []
+    text = client_for(server).generate_stream("land title report", on_text=partials.append)
+
+    assert text == "LAND TITLE REPORT "
+    assert partials == ["LAND ", "LAND TITLE ", "LAND TITLE REPORT "]
+
+def test_stream_without_stream_url_reports_the_whole_text(server):
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    client = WatsonXClient("key", "project", "model", f"{base}/token", f"{base}/generate")
+    partials = []
+
+    assert client.generate_stream("land title", on_text=partials.append) == "LAND TITLE"
+    assert partials == ["LAND TITLE"]
+    assert "/stream" not in server.calls
+
+def test_generate_many_keeps_prompt_order(server):
+    client = client_for(server, concurrency=3)
+    started, finished = [], {}
+
+    results = client.generate_many([f"chunk {i}" for i in range(6)], on_start=started.append,
+                                   on_result=finished.__setitem__)
+
+    assert results == [f"CHUNK {i}" for i in range(6)]
+    assert sorted(started) == list(range(6))
+    assert finished == dict(enumerate(results))
+
+def test_generate_many_streams_with_on_partial(server):
+    partials = {}
+    results = client_for(server).generate_many(["first chunk", "second chunk"],
+                                               on_partial=lambda i, text: partials.setdefault(i, []).append(text))
+
+    assert results == ["FIRST CHUNK ", "SECOND CHUNK "]
+    assert partials == {0: ["FIRST ", "FIRST CHUNK "], 1: ["SECOND ", "SECOND CHUNK "]}
+
+def test_generate_many_fallback(server):
+    results = client_for(server).generate_many(["one", "bad", "three"], fallback=lambda i, e: f"[prompt {i} failed]")
+
+    assert results == ["ONE", "[prompt 1 failed]", "THREE"]
+    with pytest.raises(WatsonXError):
+        client_for(server).generate_many(["one", "bad"])
@@ -0,0 +1,82 @@
+import re
+import fitz  # PyMuPDF
+from typing import Any, Dict, Tuple
+
+# Minimum number of non-space characters for a text layer to be worth using
+MIN_TEXT_CHARS = 40
+# Largest share of suspicious characters tolerated in a usable text layer
+MAX_BAD_CHAR_RATIO = 0.05
+# Pages mostly covered by images are scans, even if they carry a text layer
+MAX_IMAGE_COVERAGE = 0.8
+# Pages with this much image and little text mix typed text with scanned content, which only OCR reads
+MIXED_IMAGE_COVERAGE = 0.3
+MIXED_MAX_TEXT_CHARS = 1000
+
+# Legacy (non-Unicode) Kannada fonts whose text extracts as Latin gibberish
+LEGACY_FONT_PATTERN = re.compile(r"nudi|baraha|brh|kedage|mallige|sampige|hubballi|akshar", re.IGNORECASE)
+
+def _is_bad_char(ch: str) -> bool:
+    """Characters that indicate a broken glyph-to-Unicode mapping"""
+    code = ord(ch)
+    if ch == "�":
+        return True
+    # Private use area: glyphs with no Unicode mapping
+    if 0xE000 <= code <= 0xF8FF:
+        return True
+    # Control characters other than whitespace
+    if code < 32 and ch not in "\n\r\t":
+        return True
+    # Accented Latin letters are how legacy Kannada encodings usually extract
+    if 0x00C0 <= code <= 0x024F:
+        return True
+    return False
+
+def classify_page(page) -> Tuple[bool, str, Dict[str, Any]]:
+    """Decide whether a page's embedded text can be used instead of OCR.
+
+    Returns (usable, text, info) where info records the measurements and
+    the reason for the decision.
+    """
+    page_area = abs(page.rect.width * page.rect.height) or 1.0
+
+    # Several images can share a page, such as a scanned extract split into strips
+    image_area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page.rect
+        image_area += abs(bbox.width * bbox.height)
+    image_coverage = min(1.0, image_area / page_area)
+
+    glyph_chars = 0
+    legacy_chars = 0
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                span_text = span["text"]
+                glyph_chars += len(span_text.strip())
+                if LEGACY_FONT_PATTERN.search(span["font"]):
+                    legacy_chars += len(span_text.strip())
+    text = page.get_text("text")
+
+    chars = [ch for ch in text if not ch.isspace()]
+    bad_chars = sum(1 for ch in chars if _is_bad_char(ch))
+    info = {
+        "text_chars": len(chars),
+        "bad_char_ratio": round(bad_chars / len(chars), 4) if chars else 0.0,
+        "legacy_font_ratio": round(legacy_chars / glyph_chars, 4) if glyph_chars else 0.0,
+        "image_coverage": round(image_coverage, 4),
+    }
+
+    if len(chars) < MIN_TEXT_CHARS:
+        info["reason"] = "no_text_layer"
+    elif image_coverage >= MAX_IMAGE_COVERAGE:
+        info["reason"] = "scanned"
+    elif image_coverage >= MIXED_IMAGE_COVERAGE and len(chars) < MIXED_MAX_TEXT_CHARS:
+        info["reason"] = "mixed"
+    elif info["legacy_font_ratio"] > 0.5:
+        info["reason"] = "legacy_font"
+    elif info["bad_char_ratio"] > MAX_BAD_CHAR_RATIO:
+        info["reason"] = "garbled"
+    else:
+        info["reason"] = "text_layer"
+        return True, text, info
+    return False, "", info
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+class TraceRecorder:
+    """Spans of one session's jobs in Chrome trace-event format.
+
+    Events are appended to a JSON-lines file in batches, so a trace of a
+    long job can be downloaded while the job is still running and a
+    resumed job adds to the trace of the run before it. Spans carry the
+    process and thread that did the work; the first span seen from each
+    thread also records the thread's name.
+    """
+
+    def __init__(self, path: str, process_name: str, flush_every: int = 100):
+        self.path = path
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.buffer: List[Dict[str, Any]] = []
+        self.named = set()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._name("process_name", os.getpid(), 0, f"{process_name} {os.getpid()}")
+
+    def _name(self, kind: str, pid: int, tid: int, name: str):
+        # Caller holds the lock, or is the constructor
+        if (kind, pid, tid) in self.named:
+            return
+        self.named.add((kind, pid, tid))
+        self.buffer.append({"name": kind, "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+
+    def span(self, name: str, category: str, start: float, seconds: float, pid: Optional[int] = None,
+             tid: Optional[int] = None, thread_name: Optional[str] = None, process_name: Optional[str] = None,
+             **args):
+        """Record a complete span; start is a time.time() timestamp, and pid/tid default to the calling thread"""
+        if pid is None:
+            pid, tid = os.getpid(), threading.get_ident()
+            thread_name = threading.current_thread().name
+        event = {"name": name, "cat": category, "ph": "X", "ts": round(start * 1e6),
+                 "dur": max(1, round(seconds * 1e6)), "pid": pid, "tid": tid}
+        if args:
+            event["args"] = {k: v for k, v in args.items() if v is not None}
+        with self.lock:
+            if process_name:
+                self._name("process_name", pid, 0, f"{process_name} {pid}")
+            if thread_name:
+                self._name("thread_name", pid, tid, thread_name)
+            self.buffer.append(event)
+            full = len(self.buffer) >= self.flush_every
+        if full:
+            self.flush()
+
+    def async_span(self, name: str, category: str, start: float, seconds: float, span_id: Any, **args):
+        """Record a span that overlaps others freely, such as a page travelling through the pipeline"""
+        pid = os.getpid()
+        begin = {"name": name, "cat": category, "ph": "b", "id": str(span_id), "ts": round(start * 1e6),
+                 "pid": pid, "tid": 0, "args": args}
+        end = {**begin, "ph": "e", "ts": round((start + seconds) * 1e6), "args": {}}
+        with self.lock:
+            self.buffer.extend((begin, end))
+            full = len(self.buffer) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Append buffered events to the trace file"""
+        with self.lock:
+            events, self.buffer = self.buffer, []
+            if not events:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e) + "\n" for e in events))
+
+def load_trace(path: str) -> Dict[str, Any]:
+    """A trace file as a Chrome trace-event JSON object"""
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash mid-write
+                continue
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"exported_at": time.time()}}
@@ -0,0 +1,252 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Placed between texts when several are sent in one provider request
+BATCH_SEPARATOR = "\n\n⁂\n\n"
+
+class TranslationProvider:
+    """Interface for translation backends"""
+    name = "base"
+
+    def translate_batch(self, texts: List[str], src: str, dest: str) -> List[str]:
+        """Translate texts in a single request, returning results in order"""
+        raise NotImplementedError
+
+class GoogleTranslateProvider(TranslationProvider):
+    """googletrans backend sharing one pooled client across requests"""
+    name = "google"
+
+    def __init__(self):
+        from googletrans import Translator
+        self.translator = Translator()
+
+    def translate_batch(self, texts: List[str], src: str, dest: str) -> List[str]:
+        if len(texts) == 1:
+            return [self.translator.translate(texts[0], src=src, dest=dest).text]
+
+        joined = self.translator.translate(BATCH_SEPARATOR.join(texts), src=src, dest=dest).text
+        parts = [part.strip() for part in joined.split("⁂")]
+        if len(parts) == len(texts):
+            return parts
+
+        # The separator did not survive translation; fall back to one request per text
+        return [self.translator.translate(text, src=src, dest=dest).text for text in texts]
+
+class LocalTranslationProvider(TranslationProvider):
+    """Offline stand-in that returns the source text, for tests and benchmarks"""
+    name = "local"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+
+    def translate_batch(self, texts: List[str], src: str, dest: str) -> List[str]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return list(texts)
+
+def create_provider(name: str) -> TranslationProvider:
+    """Build a provider by name"""
+    if name == "local":
+        return LocalTranslationProvider()
+    if name == "google":
+        return GoogleTranslateProvider()
+    raise ValueError(f"Unknown translation provider: {name}")
+
+class RateLimiter:
+    """Token bucket limiting provider requests per second"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies share a cache entry"""
+    return re.sub(r"\s+", " ", text).strip()
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split page text on blank lines"""
+    return [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+class TranslationService:
+    """Batched, cached and rate-limited translation.
+
+    Callers translate one page at a time from any number of threads. Each
+    page is split into paragraphs, and paragraphs that are not cached are
+    queued. A dispatcher thread groups queued paragraphs from all callers
+    into requests of up to ``batch_chars`` characters and sends them
+    concurrently through the provider. Paragraphs already in flight are
+    shared, so boilerplate repeated on every page is translated once.
+
+    on_request(seconds, ok), if given, is called after every provider call,
+    and on_lookup(hit) after every paragraph is looked up in the cache.
+    A page whose translation takes longer than ``timeout`` seconds fails.
+    """
+
+    def __init__(self, provider: TranslationProvider, cache_size: int = 20000,
+                 batch_chars: int = 4000, batch_wait: float = 0.05,
+                 concurrency: int = 4, rate_limit: float = 5.0, retries: int = 3, timeout: float = 300,
+                 on_request: Optional[Callable[[float, bool], None]] = None,
+                 on_lookup: Optional[Callable[[bool], None]] = None):
+        self.provider = provider
+        self.cache_size = cache_size
+        self.batch_chars = batch_chars
+        self.batch_wait = batch_wait
+        self.retries = retries
+        self.timeout = timeout
+        self.on_request = on_request
+        self.on_lookup = on_lookup
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="translate")
+
+        self.cache: "OrderedDict[str, str]" = OrderedDict()
+        self.inflight: Dict[str, Future] = {}
+        self.pending: List[Tuple[str, str, str, str]] = []
+        self.cond = threading.Condition()
+        self.dispatcher: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.failures = 0
+
+    @staticmethod
+    def cache_key(text: str, src: str, dest: str) -> str:
+        return hashlib.sha256(f"{src}:{dest}:{text}".encode("utf-8")).hexdigest()
+
+    def translate(self, text: str, src: str = 'kn', dest: str = 'en') -> str:
+        """Translate one page of text"""
+        futures = [self._request(p.strip(), src, dest) for p in split_paragraphs(text)]
+        deadline = time.monotonic() + self.timeout
+        return "\n\n".join(f.result(timeout=max(0, deadline - time.monotonic())) for f in futures)
+
+    def _request(self, text: str, src: str, dest: str) -> Future:
+        # Line breaks are kept in what is sent, but not in the cache key
+        key = self.cache_key(normalize_text(text), src, dest)
+        with self.cond:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                hit, future = True, Future()
+                future.set_result(self.cache[key])
+            elif key in self.inflight:
+                self.hits += 1
+                hit, future = True, self.inflight[key]
+            else:
+                self.misses += 1
+                hit, future = False, Future()
+                self.inflight[key] = future
+                self.pending.append((key, text, src, dest))
+                if self.dispatcher is None:
+                    self.dispatcher = threading.Thread(target=self._dispatch, name="translate-dispatcher", daemon=True)
+                    self.dispatcher.start()
+                self.cond.notify()
+        if self.on_lookup:
+            self.on_lookup(hit)
+        return future
+
+    def _dispatch(self):
+        """Group pending paragraphs into batches and hand them to the executor"""
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                # Give other pages a moment to add their paragraphs to this batch
+                deadline = time.monotonic() + self.batch_wait
+                while sum(len(p[1]) for p in self.pending) < self.batch_chars:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+
+                src, dest = self.pending[0][2], self.pending[0][3]
+                batch, rest, size = [], [], 0
+                for item in self.pending:
+                    fits = not batch or size + len(item[1]) <= self.batch_chars
+                    if fits and (item[2], item[3]) == (src, dest):
+                        batch.append(item)
+                        size += len(item[1])
+                    else:
+                        rest.append(item)
+                self.pending = rest
+
+            self.executor.submit(self._send, batch, src, dest)
+
+    def _send(self, batch: List[Tuple[str, str, str, str]], src: str, dest: str):
+        texts = [item[1] for item in batch]
+        results, error = None, None
+        try:
+            for attempt in range(self.retries + 1):
+                self.rate_limiter.acquire()
+                with self.cond:
+                    self.requests += 1
+                start = time.perf_counter()
+                try:
+                    results = self.provider.translate_batch(texts, src, dest)
+                    if len(results) != len(texts):
+                        raise ValueError(f"provider returned {len(results)} translations for {len(texts)} texts")
+                    if self.on_request:
+                        self.on_request(time.perf_counter() - start, True)
+                    break
+                except Exception:
+                    results = None
+                    if self.on_request:
+                        self.on_request(time.perf_counter() - start, False)
+                    if attempt == self.retries:
+                        raise
+                    time.sleep((2 ** attempt) * 0.5 + random.uniform(0, 0.5))
+        except Exception as e:
+            error = e
+        finally:
+            # Every waiting page gets an answer, whatever went wrong
+            with self.cond:
+                if results is None:
+                    self.failures += 1
+                for i, (key, _, _, _) in enumerate(batch):
+                    future = self.inflight.pop(key, None)
+                    if future is None or future.done():
+                        continue
+                    if results is None:
+                        future.set_exception(error or RuntimeError("translation request was abandoned"))
+                        continue
+                    self.cache[key] = results[i]
+                    self.cache.move_to_end(key)
+                    future.set_result(results[i])
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache and request counters"""
+        with self.cond:
+            return {
+                "provider": self.provider.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "requests": self.requests,
+                "failures": self.failures,
+                "cached": len(self.cache),
+            }
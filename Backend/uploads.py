@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: parts of one upload are only serialised within a process
+    fcntl = None
+
+class UploadError(Exception):
+    """Raised when an upload request does not fit the upload's state"""
+
+class ChunkedUploads:
+    """Resumable uploads assembled from parts on disk.
+
+    A client creates an upload with the total size, then sends parts in
+    order, each starting at the offset the server reports. The content is
+    hashed while it streams in; if a part arrives at a process that did not
+    see the earlier ones (after a restart), the stored prefix is hashed
+    once to catch up. State lives next to the data, so any API process can
+    continue an upload. Where flock is available the part file is locked
+    while a part is written, so a retried part sent to two processes at once
+    is only appended once.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, chunk_size: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        # upload_id -> (bytes hashed, running hash)
+        self.hashers: Dict[str, Tuple[int, Any]] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, upload_id: str) -> Tuple[str, str]:
+        if not upload_id.isalnum():
+            raise UploadError("Invalid upload id")
+        base = os.path.join(self.directory, upload_id)
+        return f"{base}.json", f"{base}.part"
+
+    def _meta(self, upload_id: str) -> Dict[str, Any]:
+        meta_path, _ = self._paths(upload_id)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        """Hold an upload against other threads and, where flock exists, other processes"""
+        meta_path, part_path = self._paths(upload_id)
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            try:
+                f = open(part_path, "rb")
+            except FileNotFoundError:
+                raise KeyError(upload_id)
+            with f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                # Another process may have completed or discarded the upload while we waited
+                if not os.path.exists(meta_path):
+                    raise KeyError(upload_id)
+                yield
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Start an upload of size bytes; sha256, if given, is checked on completion"""
+        if size <= 0:
+            raise UploadError("Upload size must be positive")
+        if size > self.max_bytes:
+            raise UploadError(f"File is larger than the {self.max_bytes // (1024 * 1024)} MB limit")
+
+        upload_id = uuid.uuid4().hex
+        meta = {"upload_id": upload_id, "filename": os.path.basename(filename), "size": size,
+                "sha256": sha256.lower() if sha256 else None, "created_at": time.time()}
+        meta_path, part_path = self._paths(upload_id)
+        open(part_path, "wb").close()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Upload metadata plus the offset the next part must start at"""
+        meta = self._meta(upload_id)
+        _, part_path = self._paths(upload_id)
+        return {**meta, "offset": os.path.getsize(part_path), "chunk_size": self.chunk_size}
+
+    def _hasher(self, upload_id: str, offset: int, part_path: str):
+        hashed, hasher = self.hashers.get(upload_id, (0, None))
+        if hasher is None or hashed != offset:
+            hasher = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+        return hasher
+
+    def append(self, upload_id: str, offset: int, data: bytes) -> int:
+        """Write one part at offset and return the new offset"""
+        meta = self._meta(upload_id)
+        _, part_path = self._paths(upload_id)
+        with self._locked(upload_id):
+            current = os.path.getsize(part_path)
+            if offset != current:
+                raise UploadError(f"Part starts at {offset}, but the upload is at {current}")
+            if current + len(data) > meta["size"]:
+                raise UploadError("Part goes past the declared upload size")
+
+            hasher = self._hasher(upload_id, current, part_path)
+            with open(part_path, "ab") as f:
+                f.write(data)
+            hasher.update(data)
+            self.hashers[upload_id] = (current + len(data), hasher)
+            return current + len(data)
+
+    def complete(self, upload_id: str, destination: str) -> Tuple[str, str, str]:
+        """Move a fully received upload to destination; returns (path, filename, sha256)"""
+        meta = self._meta(upload_id)
+        meta_path, part_path = self._paths(upload_id)
+        with self._locked(upload_id):
+            size = os.path.getsize(part_path)
+            if size != meta["size"]:
+                raise UploadError(f"Upload is incomplete: {size} of {meta['size']} bytes received")
+            digest = self._hasher(upload_id, size, part_path).hexdigest()
+            if meta["sha256"] and meta["sha256"] != digest:
+                self.discard(upload_id)
+                raise UploadError("Checksum mismatch; the upload was corrupted and has been discarded")
+            os.replace(part_path, destination)
+            os.remove(meta_path)
+            self.hashers.pop(upload_id, None)
+        return destination, meta["filename"], digest
+
+    def discard(self, upload_id: str):
+        for path in self._paths(upload_id):
+            if os.path.exists(path):
+                os.remove(path)
+        self.hashers.pop(upload_id, None)
+
+def save_stream(source: BinaryIO, destination: str, max_bytes: int) -> Tuple[int, str]:
+    """Copy a file object to disk, hashing it on the way; returns (size, sha256)"""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(destination, "wb") as buffer:
+        for block in iter(lambda: source.read(1024 * 1024), b""):
+            size += len(block)
+            if size > max_bytes:
+                buffer.close()
+                os.remove(destination)
+                raise UploadError(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit")
+            hasher.update(block)
+            buffer.write(block)
+    return size, hasher.hexdigest()
@@ -0,0 +1,249 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class WatsonXError(Exception):
+    """Raised when a WatsonX request fails after all retries"""
+
+class WatsonXClient:
+    """Pooled WatsonX text generation client.
+
+    The IAM token is cached until shortly before it expires, every request
+    goes through one pooled HTTP session, and generate_many sends prompts
+    concurrently, at most ``concurrency`` at a time per process. Failed
+    requests are retried with jittered exponential backoff. The IAM and
+    generation URLs are configurable so the client can be pointed at a
+    local mock server.
+
+    With a stream_url, generate_stream uses the streaming generation
+    endpoint and reports the text generated so far as tokens arrive.
+
+    on_request(seconds, ok), if given, is called after every HTTP attempt.
+    """
+
+    def __init__(self, api_key: Optional[str], project_id: Optional[str], model_id: str,
+                 iam_url: str, generation_url: str, concurrency: int = 4,
+                 timeout: float = 300, retries: int = 3, token_margin: float = 300,
+                 stream_url: Optional[str] = None,
+                 on_request: Optional[Callable[[float, bool], None]] = None):
+        self.api_key = api_key
+        self.project_id = project_id
+        self.model_id = model_id
+        self.iam_url = iam_url
+        self.generation_url = generation_url
+        self.stream_url = stream_url
+        self.timeout = timeout
+        self.retries = retries
+        self.token_margin = token_margin
+        self.on_request = on_request
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=concurrency + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="watsonx")
+
+        self.token: Optional[str] = None
+        self.token_expires = 0.0
+        self.token_lock = threading.Lock()
+        self.lock = threading.Lock()
+
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.token_refreshes = 0
+
+    def access_token(self) -> str:
+        """Cached IAM token, refreshed when it is about to expire"""
+        with self.token_lock:
+            if self.token and time.time() < self.token_expires:
+                return self.token
+
+            response = self._post(self.iam_url, headers={"Content-Type": "application/x-www-form-urlencoded"}, data={
+                "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
+                "apikey": self.api_key
+            })
+            body = response.json()
+            expires_in = float(body.get("expires_in", 3600))
+            self.token = body["access_token"]
+            # Short-lived tokens are refreshed at the latest halfway through their life
+            self.token_expires = time.time() + max(0.0, expires_in - min(self.token_margin, expires_in / 2))
+            self.token_refreshes += 1
+            return self.token
+
+    def invalidate_token(self):
+        with self.token_lock:
+            self.token = None
+            self.token_expires = 0.0
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(60.0, float(retry_after))
+            except ValueError:
+                pass
+        return (2 ** attempt) * 0.5 + random.uniform(0, 0.5)
+
+    def _post(self, url: str, authorized: bool = False, **kwargs) -> requests.Response:
+        """POST with retries on connection errors, timeouts, 429 and 5xx"""
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            if authorized:
+                kwargs["headers"]["Authorization"] = f"Bearer {self.access_token()}"
+            with self.lock:
+                self.requests += 1
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.on_request:
+                    self.on_request(time.perf_counter() - start, False)
+                if last:
+                    raise WatsonXError(f"Request to {url} failed: {e}") from e
+                wait = self._backoff(attempt)
+            else:
+                if self.on_request:
+                    self.on_request(time.perf_counter() - start, response.status_code < 400)
+                if response.status_code < 400:
+                    return response
+                if authorized and response.status_code == 401 and not last:
+                    # The token was revoked or expired early; fetch a new one
+                    self.invalidate_token()
+                    wait = 0.0
+                elif response.status_code in RETRY_STATUSES and not last:
+                    wait = self._backoff(attempt, response)
+                else:
+                    raise WatsonXError(f"HTTP {response.status_code} from {url}: {response.text[:500]}")
+            with self.lock:
+                self.retried += 1
+            time.sleep(wait)
+
+    def _payload(self, prompt: str, parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "input": prompt,
+            "parameters": parameters or {},
+            "model_id": self.model_id,
+            "project_id": self.project_id
+        }
+
+    def generate(self, prompt: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+        """Generate text for one prompt"""
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        try:
+            response = self._post(self.generation_url, authorized=True, headers=headers,
+                                  json=self._payload(prompt, parameters))
+            try:
+                return response.json()["results"][0]["generated_text"]
+            except (ValueError, KeyError, IndexError) as e:
+                raise WatsonXError(f"Unexpected WatsonX response: {str(e)} - Raw: {response.text[:500]}") from e
+        except WatsonXError:
+            with self.lock:
+                self.failures += 1
+            raise
+
+    def generate_stream(self, prompt: str, parameters: Optional[Dict[str, Any]] = None,
+                        on_text: Optional[Callable[[str], None]] = None) -> str:
+        """Generate text for one prompt, calling on_text with all text generated so far as it arrives.
+
+        A stream that breaks off is restarted from the beginning, so the
+        text passed to on_text can occasionally start over.
+        """
+        if not self.stream_url:
+            text = self.generate(prompt, parameters)
+            if on_text:
+                on_text(text)
+            return text
+
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._post(self.stream_url, authorized=True, headers=headers,
+                                      json=self._payload(prompt, parameters), stream=True)
+                parts: List[str] = []
+                with response:
+                    for line in response.iter_lines(decode_unicode=True):
+                        # Server-sent events: only the data lines carry generated text
+                        if not line or not line.startswith("data:"):
+                            continue
+                        event = json.loads(line[5:].strip())
+                        if "errors" in event:
+                            raise WatsonXError(f"WatsonX stream error: {event['errors']}")
+                        delta = "".join(r.get("generated_text", "") for r in event.get("results", []))
+                        if delta:
+                            parts.append(delta)
+                            if on_text:
+                                on_text("".join(parts))
+                return "".join(parts)
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.retries:
+                    with self.lock:
+                        self.failures += 1
+                    raise WatsonXError(f"WatsonX stream failed: {e}") from e
+                with self.lock:
+                    self.retried += 1
+                time.sleep(self._backoff(attempt))
+            except WatsonXError:
+                with self.lock:
+                    self.failures += 1
+                raise
+
+    def generate_many(self, prompts: List[str], parameters: Optional[Dict[str, Any]] = None,
+                      on_result: Optional[Callable[[int, str], None]] = None,
+                      fallback: Optional[Callable[[int, Exception], str]] = None,
+                      on_partial: Optional[Callable[[int, str], None]] = None,
+                      on_start: Optional[Callable[[int], None]] = None) -> List[str]:
+        """Generate text for several prompts concurrently, returning results in order.
+
+        on_result(index, text) is called as each prompt finishes; if it
+        raises, prompts that have not started are cancelled. A failed prompt
+        raises unless fallback is given, in which case its result is
+        fallback(index, error). With on_partial, prompts are streamed and
+        on_partial(index, text_so_far) is called as tokens arrive. on_start(index)
+        is called on the worker thread as each prompt is sent.
+        """
+        def run(i, prompt):
+            if on_start:
+                on_start(i)
+            if on_partial is None:
+                return self.generate(prompt, parameters)
+            return self.generate_stream(prompt, parameters, lambda text: on_partial(i, text))
+
+        futures = {self.executor.submit(run, i, prompt): i for i, prompt in enumerate(prompts)}
+        results: List[Optional[str]] = [None] * len(prompts)
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    if fallback is None:
+                        raise
+                    results[i] = fallback(i, e)
+                if on_result:
+                    on_result(i, results[i])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counters"""
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "retried": self.retried,
+                "failures": self.failures,
+                "token_refreshes": self.token_refreshes,
+                "token_valid_for": max(0, round(self.token_expires - time.time())) if self.token else 0,
+            }
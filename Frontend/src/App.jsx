@@ -34,6 +34,7 @@ import {
   MenuItem,
   FormHelperText,
   Divider,
+  Chip,
 } from '@mui/material';
 import {
   CloudUpload as CloudUploadIcon,
@@ -191,6 +192,10 @@ const theme = createTheme({
 });
 
 // API base URL
+// Pages fetched per request while reviewing, and how close to the end of a window the next one is prefetched
+const PAGE_WINDOW = 20;
+const PREFETCH_MARGIN = 5;
+
 const API_BASE_URL = process.env.NODE_ENV === 'production' 
   ? '' // Empty string for production since we'll use relative paths when deployed together
   : 'http://localhost:8000';
@@ -689,7 +694,8 @@ function App() {
   // State variables
   const [activeStep, setActiveStep] = useState(0);
   const [sessionId, setSessionId] = useState('');
-  const [file, setFile] = useState(null);
+  const [files, setFiles] = useState([]);
+  const [uploadProgress, setUploadProgress] = useState(0);
   const [uploading, setUploading] = useState(false);
   const [processingStatus, setProcessingStatus] = useState({
     status: '',
@@ -709,6 +715,7 @@ function App() {
   const [pageImage, setPageImage] = useState('');
   const [tabValue, setTabValue] = useState(0);
   const [reportResult, setReportResult] = useState('');
+  const [partialReport, setPartialReport] = useState('');
   const [editableReport, setEditableReport] = useState('');
   const [isEditingReport, setIsEditingReport] = useState(false);
   const [clientName, setClientName] = useState('');
@@ -726,29 +733,97 @@ function App() {
   const [pageInput, setPageInput] = useState('');
   const [rotation, setRotation] = useState(0);
   const [textTabValue, setTextTabValue] = useState(0);
+  const reviewStartedRef = useRef(false);
+  const eventSourceRef = useRef(null);
+  // Review data of pages fetched so far, by page number
+  const pageCacheRef = useRef(new Map());
   
   // Handle file upload
   const handleFileChange = (event) => {
-    setFile(event.target.files[0]);
+    setFiles(Array.from(event.target.files));
+  };
+  
+  // Upload one PDF in parts, resuming after network errors and page reloads
+  const uploadResumable = async (pdf) => {
+    const resumeKey = `upload:${pdf.name}:${pdf.size}:${pdf.lastModified}`;
+    let upload = null;
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+      try {
+        upload = (await axios.get(`${API_BASE_URL}/uploads/${savedId}`)).data;
+      } catch (error) {
+        localStorage.removeItem(resumeKey);
+      }
+    }
+    if (!upload) {
+      upload = (await axios.post(`${API_BASE_URL}/uploads`, { filename: pdf.name, size: pdf.size })).data;
+      localStorage.setItem(resumeKey, upload.upload_id);
+    }
+    
+    let offset = upload.offset;
+    let failures = 0;
+    while (offset < pdf.size) {
+      try {
+        const response = await axios.put(
+          `${API_BASE_URL}/uploads/${upload.upload_id}`,
+          pdf.slice(offset, offset + upload.chunk_size),
+          { params: { offset }, headers: { 'Content-Type': 'application/octet-stream' } }
+        );
+        offset = response.data.offset;
+        failures = 0;
+        setUploadProgress(Math.round((100 * offset) / pdf.size));
+      } catch (error) {
+        failures += 1;
+        if (failures > 5) {
+          throw error;
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        // Continue from wherever the server got to
+        try {
+          offset = (await axios.get(`${API_BASE_URL}/uploads/${upload.upload_id}`)).data.offset;
+        } catch (statusError) {
+          console.error('Error checking upload progress:', statusError);
+        }
+      }
+    }
+    
+    const response = await axios.post(`${API_BASE_URL}/uploads/${upload.upload_id}/complete`, new FormData());
+    localStorage.removeItem(resumeKey);
+    return response;
   };
   
-  // Upload file and start processing
+  // Upload file(s) and start processing; several PDFs or a ZIP become one bulk session
   const handleUpload = async () => {
-    if (!file) {
+    if (files.length === 0) {
       showAlert('Please select a file to upload', 'error');
       return;
     }
     
     setUploading(true);
     
-    const formData = new FormData();
-    formData.append('file', file);
+    setUploadProgress(0);
+    
+    const isBulk = files.length > 1 || files[0].name.toLowerCase().endsWith('.zip');
     
     try {
-      const response = await axios.post(`${API_BASE_URL}/upload`, formData);
+      let response;
+      if (isBulk) {
+        const formData = new FormData();
+        files.forEach(f => formData.append('files', f));
+        response = await axios.post(`${API_BASE_URL}/upload/bulk`, formData);
+      } else {
+        response = await uploadResumable(files[0]);
+      }
       setSessionId(response.data.session_id);
-      showAlert('File uploaded successfully', 'success');
-      startStatusPolling(response.data.session_id);
+      reviewStartedRef.current = false;
+      if (isBulk && response.data.skipped.length > 0) {
+        showAlert(`${response.data.message} Skipped unreadable files: ${response.data.skipped.join(', ')}`, 'warning');
+      } else if (response.data.reused_from) {
+        showAlert(response.data.message, 'info');
+      } else {
+        showAlert(isBulk ? response.data.message : 'File uploaded successfully', 'success');
+      }
+      startStatusStream(response.data.session_id);
     } catch (error) {
       console.error('Error uploading file:', error);
       showAlert('Error uploading file: ' + (error.response?.data?.detail || error.message), 'error');
@@ -757,6 +832,92 @@ function App() {
     }
   };
   
+  // Apply a status update from the event stream or the polling fallback; returns true once the job is finished
+  const handleStatusUpdate = (id, status, reportText) => {
+    setProcessingStatus({
+      status: status.status,
+      message: status.queue_position
+        ? `${status.message} (position ${status.queue_position} in queue)`
+        : status.message,
+      progress: status.progress,
+      currentStage: status.current_stage,
+      totalPages: status.total_pages,
+      processedPages: status.processed_pages
+    });
+    
+    // Move to next step if processing is complete
+    if (status.status === 'ready_for_review') {
+      if (!reviewStartedRef.current) {
+        startReview(id);
+      }
+      return true;
+    } else if (status.status === 'completed' || status.status === 'completed_with_warning') {
+      if (reportText !== undefined) {
+        setReportResult(reportText);
+        setEditableReport(reportText);
+      } else {
+        fetchReportResult(id);
+      }
+      setActiveStep(3); // Move to Edit & Download Results step
+      return true;
+    } else if (status.status === 'error') {
+      showAlert(`Error: ${status.message}`, 'error');
+      return true;
+    } else if (status.status === 'cancelled') {
+      showAlert('Processing was cancelled', 'warning');
+      return true;
+    }
+    return false;
+  };
+  
+  // Close the status event stream, if one is open
+  const stopStatusStream = () => {
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close();
+      eventSourceRef.current = null;
+    }
+  };
+  
+  // Follow processing status over server-sent events, falling back to polling
+  const startStatusStream = (id) => {
+    stopStatusStream();
+    if (pollingInterval) {
+      clearInterval(pollingInterval);
+      setPollingInterval(null);
+    }
+    
+    if (!window.EventSource) {
+      startStatusPolling(id);
+      return;
+    }
+    
+    const source = new EventSource(`${API_BASE_URL}/events/${id}`);
+    eventSourceRef.current = source;
+    let reportText;
+    
+    // The report body arrives once, just before the final progress event
+    // Report text as it is written; offset 0 means the text started over
+    source.addEventListener('report_delta', (event) => {
+      const delta = JSON.parse(event.data);
+      setPartialReport(prev => delta.offset === 0 ? delta.text : prev.slice(0, delta.offset) + delta.text);
+    });
+    
+    source.addEventListener('report', (event) => {
+      reportText = JSON.parse(event.data).final_output || 'Report generated successfully!';
+    });
+    
+    source.addEventListener('progress', (event) => {
+      if (handleStatusUpdate(id, JSON.parse(event.data), reportText)) {
+        stopStatusStream();
+      }
+    });
+    
+    source.onerror = () => {
+      stopStatusStream();
+      startStatusPolling(id);
+    };
+  };
+  
   // Poll for processing status
   const startStatusPolling = (id) => {
     // Clear any existing interval
@@ -767,33 +928,13 @@ function App() {
     // Start new polling
     const interval = setInterval(async () => {
       try {
-        const response = await axios.get(`${API_BASE_URL}/status/${id}`);
-        const status = response.data;
-        
-        setProcessingStatus({
-          status: status.status,
-          message: status.message,
-          progress: status.progress,
-          currentStage: status.current_stage,
-          totalPages: status.total_pages,
-          processedPages: status.processed_pages
+        const response = await axios.get(`${API_BASE_URL}/status/${id}`, {
+          params: { include_report: false }
         });
         
-        // Move to next step if processing is complete
-        if (status.status === 'ready_for_review') {
-          clearInterval(interval);
-          setPollingInterval(null);
-          loadPageData(id, 1);
-          setActiveStep(1); // Move to Quality Check step
-        } else if (status.status === 'completed' || status.status === 'completed_with_warning') {
-          clearInterval(interval);
-          setPollingInterval(null);
-          fetchReportResult(id);
-          setActiveStep(3); // Move to Edit & Download Results step
-        } else if (status.status === 'error') {
+        if (handleStatusUpdate(id, response.data)) {
           clearInterval(interval);
           setPollingInterval(null);
-          showAlert(`Error: ${status.message}`, 'error');
         }
       } catch (error) {
         console.error('Error fetching status:', error);
@@ -806,23 +947,54 @@ function App() {
     setPollingInterval(interval);
   };
   
+  // Open the Quality Check step; pages can be reviewed while later pages are still processing
+  const startReview = (id) => {
+    reviewStartedRef.current = true;
+    pageCacheRef.current.clear();
+    loadPageData(id, 1);
+    setActiveStep(1); // Move to Quality Check step
+  };
+  
+  // Fetch the window of pages containing pageNum in one request
+  const fetchPageWindow = async (id, pageNum) => {
+    const start = Math.floor((pageNum - 1) / PAGE_WINDOW) * PAGE_WINDOW + 1;
+    const response = await axios.get(`${API_BASE_URL}/pages/${id}`, {
+      params: { start, end: start + PAGE_WINDOW - 1, fields: 'raw_text,translated_text,image,info' }
+    });
+    response.data.pages.forEach((page) => pageCacheRef.current.set(page.page_number, page));
+    return response.data;
+  };
+  
   // Load page data for review
   const loadPageData = async (id, pageNum) => {
     try {
-      // Fetch page data
-      const pageResponse = await axios.get(`${API_BASE_URL}/pages/${id}/${pageNum}`);
-      const imageResponse = await axios.get(`${API_BASE_URL}/image/${id}/${pageNum}`);
+      // Pages still processing are not cached yet, so their window is fetched again
+      if (!pageCacheRef.current.has(pageNum)) {
+        await fetchPageWindow(id, pageNum);
+      }
+      const page = pageCacheRef.current.get(pageNum);
+      if (!page) {
+        throw new Error(`Page ${pageNum} is not ready yet`);
+      }
       
       setRotation(0); // Reset rotation when changing pages
       setPageData({
-        rawText: pageResponse.data.raw_text,
-        translatedText: pageResponse.data.translated_text,
-        editedText: pageResponse.data.translated_text,
-        formData: pageResponse.data.form_data,
+        rawText: page.raw_text,
+        translatedText: page.translated_text,
+        editedText: page.translated_text,
+        formData: page.form_data,
+        content: page.info?.content,
       });
       
-      setPageImage(imageResponse.data.image);
+      // Images are streamed (and browser-cached) straight from the image endpoint
+      setPageImage(`${API_BASE_URL}${page.image ? page.image.url : `/image/${id}/${pageNum}`}`);
       setCurrentPage(pageNum);
+      
+      // Fetch the next window before the reviewer reaches it
+      const nextWindow = (Math.floor((pageNum - 1) / PAGE_WINDOW) + 1) * PAGE_WINDOW + 1;
+      if (nextWindow - pageNum <= PREFETCH_MARGIN && !pageCacheRef.current.has(nextWindow)) {
+        fetchPageWindow(id, nextWindow).catch(() => {});
+      }
     } catch (error) {
       console.error('Error loading page data:', error);
       showAlert('Error loading page data', 'error');
@@ -837,6 +1009,15 @@ function App() {
         edited_text: tabValue === 0 ? pageData.translatedText : pageData.rawText
       });
       
+      // Keep the cached copy in line with what was saved
+      const cached = pageCacheRef.current.get(currentPage);
+      if (cached) {
+        pageCacheRef.current.set(currentPage, {
+          ...cached,
+          ...(tabValue === 0 ? { translated_text: pageData.translatedText } : { raw_text: pageData.rawText })
+        });
+      }
+      
       showAlert('Page updated successfully', 'success');
     } catch (error) {
       console.error('Error updating page:', error);
@@ -853,7 +1034,8 @@ function App() {
       });
       
       showAlert('Report generation started', 'info');
-      startStatusPolling(sessionId);
+      setPartialReport('');
+      startStatusStream(sessionId);
       setActiveStep(2); // Move to Generate Report step
     } catch (error) {
       console.error('Error starting report generation:', error);
@@ -950,7 +1132,8 @@ function App() {
   const handleReset = () => {
     setActiveStep(0);
     setSessionId('');
-    setFile(null);
+    pageCacheRef.current.clear();
+    setFiles([]);
     setProcessingStatus({
       status: '',
       message: '',
@@ -969,6 +1152,7 @@ function App() {
     setPageImage('');
     setTabValue(0);
     setReportResult('');
+    setPartialReport('');
     setEditableReport('');
     setIsEditingReport(false);
     setClientName('');
@@ -977,6 +1161,7 @@ function App() {
       clearInterval(pollingInterval);
       setPollingInterval(null);
     }
+    stopStatusStream();
     setRotation(0);
     setZoomLevel(1);
     setImagePosition({ x: 0, y: 0 });
@@ -991,6 +1176,11 @@ function App() {
     };
   }, [pollingInterval]);
   
+  // Close the event stream on unmount
+  useEffect(() => {
+    return () => stopStatusStream();
+  }, []);
+  
   // Handle zoom in
   const handleZoomIn = () => {
     setZoomLevel(prev => Math.min(prev + 0.25, 3));
@@ -1089,10 +1279,11 @@ function App() {
               }}
             >
               <input
-                accept="application/pdf"
+                accept="application/pdf,.zip,application/zip"
                 style={{ display: 'none' }}
                 id="raised-button-file"
                 type="file"
+                multiple
                 onChange={handleFileChange}
               />
               <label htmlFor="raised-button-file">
@@ -1108,11 +1299,11 @@ function App() {
                     background: 'linear-gradient(45deg, #2C3E50 30%, #34495E 90%)',
                   }}
                 >
-                  Select PDF File
+                  Select PDF Files or ZIP
                 </Button>
               </label>
 
-              {file && (
+              {files.length > 0 && (
                 <Typography 
                   variant="body1" 
                   sx={{ 
@@ -1123,7 +1314,9 @@ function App() {
                     boxShadow: '0 2px 8px rgba(0,0,0,0.05)',
                   }}
                 >
-                  Selected file: {file.name}
+                  {files.length === 1
+                    ? `Selected file: ${files[0].name}`
+                    : `Selected ${files.length} files: ${files.map(f => f.name).join(', ')}`}
                 </Typography>
               )}
 
@@ -1132,7 +1325,7 @@ function App() {
                   variant="contained"
                   color="primary"
                   onClick={handleUpload}
-                  disabled={!file || uploading}
+                  disabled={files.length === 0 || uploading}
                   sx={{
                     minWidth: 200,
                     py: 1.5,
@@ -1141,7 +1334,9 @@ function App() {
                   }}
                 >
                   {uploading ? (
-                    <CircularProgress size={24} color="inherit" />
+                    uploadProgress > 0 && uploadProgress < 100
+                      ? `Uploading ${uploadProgress}%`
+                      : <CircularProgress size={24} color="inherit" />
                   ) : (
                     'Upload & Process'
                   )}
@@ -1169,6 +1364,16 @@ function App() {
                   <Typography variant="body2" color="text.secondary" sx={{ mt: 1 }}>
                     {processingStatus.processedPages} / {processingStatus.totalPages} pages processed
                   </Typography>
+                  {processingStatus.status === 'processing' && processingStatus.processedPages > 0 && (
+                    <Button
+                      variant="outlined"
+                      color="primary"
+                      onClick={() => startReview(sessionId)}
+                      sx={{ mt: 2 }}
+                    >
+                      Start Reviewing Processed Pages
+                    </Button>
+                  )}
                 </Box>
               )}
             </Paper>
@@ -1298,6 +1503,13 @@ function App() {
                       }}
                     >
                       PDF Page
+                      {pageData.content && pageData.content !== 'text' && (
+                        <Chip
+                          size="small"
+                          label={pageData.content === 'blank' ? 'Blank page: OCR skipped' : 'Near-blank page: OCR skipped'}
+                          sx={{ ml: 1 }}
+                        />
+                      )}
                     </Typography>
                     <Box sx={{ display: 'flex', gap: 1 }}>
                       <Button
@@ -1358,7 +1570,7 @@ function App() {
                     {pageImage ? (
                       <img 
                         ref={imageRef}
-                        src={`data:image/png;base64,${pageImage}`} 
+                        src={zoomLevel > 1 ? `${pageImage}?size=full` : `${pageImage}?size=preview`} 
                         alt={`Page ${currentPage}`}
                         style={{ 
                           width: '100%',
@@ -1746,6 +1958,26 @@ function App() {
                   >
                     {processingStatus.message}
                   </Typography>
+                  
+                  {partialReport && (
+                    <Paper
+                      elevation={0}
+                      sx={{
+                        p: 3,
+                        mt: 3,
+                        maxHeight: '500px',
+                        overflow: 'auto',
+                        backgroundColor: '#f8f9fa',
+                        borderRadius: 3,
+                        textAlign: 'left',
+                      }}
+                      className="markdown-container"
+                    >
+                      <Markdown>
+                        {partialReport}
+                      </Markdown>
+                    </Paper>
+                  )}
                 </Box>
               )}
             </Paper>